@@ -101,12 +101,144 @@ CREATE TABLE restaurante.DetallesOrden (
 GO
 
 
+---------------------------------------------------------
+-- 7. ROLLUPS DE VENTAS (REPORTES)
+---------------------------------------------------------
+-- Se actualizan al cerrar cada orden y con el job de catch-up;
+-- RollupOrdenesAplicadas evita aplicar una orden dos veces.
+CREATE TABLE restaurante.VentasPorHora (
+    Hora DATETIME2 NOT NULL PRIMARY KEY,  -- hora de cierre (UTC) truncada
+    Ordenes INT NOT NULL DEFAULT (0),
+    Ingresos DECIMAL(14,2) NOT NULL DEFAULT (0),
+    Articulos INT NOT NULL DEFAULT (0),
+    SegundosOcupacion BIGINT NOT NULL DEFAULT (0)
+);
+GO
+
+CREATE TABLE restaurante.VentasPorProductoDia (
+    Fecha DATE NOT NULL,
+    ProductoId INT NOT NULL,
+    Cantidad INT NOT NULL DEFAULT (0),
+    Ingresos DECIMAL(14,2) NOT NULL DEFAULT (0),
+    CONSTRAINT PK_VentasPorProductoDia PRIMARY KEY (Fecha, ProductoId),
+    CONSTRAINT FK_VentasPorProductoDia_Productos FOREIGN KEY (ProductoId)
+        REFERENCES restaurante.MenuProductos (ProductoId)
+);
+GO
+
+CREATE TABLE restaurante.VentasPorMeseroDia (
+    Fecha DATE NOT NULL,
+    MeseroId INT NOT NULL,
+    Ordenes INT NOT NULL DEFAULT (0),
+    Ingresos DECIMAL(14,2) NOT NULL DEFAULT (0),
+    Articulos INT NOT NULL DEFAULT (0),
+    SegundosOcupacion BIGINT NOT NULL DEFAULT (0),
+    CONSTRAINT PK_VentasPorMeseroDia PRIMARY KEY (Fecha, MeseroId),
+    CONSTRAINT FK_VentasPorMeseroDia_Meseros FOREIGN KEY (MeseroId)
+        REFERENCES restaurante.Meseros (MeseroId)
+);
+GO
+
+CREATE TABLE restaurante.RollupOrdenesAplicadas (
+    OrdenId INT NOT NULL PRIMARY KEY,
+    FechaAplicacion DATETIME2 NOT NULL DEFAULT (SYSUTCDATETIME())
+);
+GO
+
+
+---------------------------------------------------------
+-- 8. VERSIONES DE TABLAS (INVALIDACIÓN DE CACHÉS)
+---------------------------------------------------------
+-- Cada escritura en estas tablas incrementa su versión dentro de la misma
+-- transacción; cada worker de la API las consulta para invalidar sus cachés.
+CREATE TABLE restaurante.VersionesTablas (
+    Tabla NVARCHAR(50) NOT NULL PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT (0),
+    FechaCambio DATETIME2 NOT NULL DEFAULT (SYSUTCDATETIME())
+);
+GO
+
+INSERT INTO restaurante.VersionesTablas (Tabla) VALUES
+('Categorias'),
+('MenuProductos'),
+('Mesas');
+GO
+
+
+---------------------------------------------------------
+-- 9. CLAVES DE IDEMPOTENCIA
+---------------------------------------------------------
+-- Respuesta de cada POST enviado con Idempotency-Key; los reintentos con la
+-- misma clave la reciben sin crear registros duplicados.
+CREATE TABLE restaurante.ClavesIdempotencia (
+    Clave NVARCHAR(100) NOT NULL PRIMARY KEY,
+    Huella CHAR(64) NOT NULL,
+    Estado NVARCHAR(20) NOT NULL,
+    CodigoEstado INT NULL,
+    Respuesta NVARCHAR(MAX) NULL,
+    FechaCreacion DATETIME2 NOT NULL DEFAULT (SYSUTCDATETIME()),
+    FechaExpiracion DATETIME2 NOT NULL
+);
+GO
+
+
+---------------------------------------------------------
+-- 10. ARCHIVO DE ÓRDENES
+---------------------------------------------------------
+-- El job de archivo mueve aquí las órdenes cerradas antiguas (y sus detalles)
+-- para que Ordenes y DetallesOrden solo guarden historia reciente. Solo lectura;
+-- comprimidas por página porque casi nunca se consultan. Conservan las claves
+-- foráneas de las tablas activas: una mesa, mesero o producto con órdenes
+-- archivadas no se puede eliminar.
+CREATE TABLE restaurante.OrdenesArchivo (
+    OrdenId INT NOT NULL PRIMARY KEY,
+    MesaId INT NOT NULL,
+    MeseroId INT NOT NULL,
+    FechaCreacion DATETIME2 NOT NULL,
+    FechaCierre DATETIME2 NULL,
+    Total DECIMAL(12,2) NULL,
+    Estado NVARCHAR(30) NOT NULL,
+    Comentarios NVARCHAR(500) NULL,
+    FechaArchivo DATETIME2 NOT NULL DEFAULT (SYSUTCDATETIME()),
+    CONSTRAINT FK_OrdenesArchivo_Mesas FOREIGN KEY (MesaId)
+        REFERENCES restaurante.Mesas (MesaId)
+        ON DELETE NO ACTION,
+    CONSTRAINT FK_OrdenesArchivo_Meseros FOREIGN KEY (MeseroId)
+        REFERENCES restaurante.Meseros (MeseroId)
+        ON DELETE NO ACTION
+) WITH (DATA_COMPRESSION = PAGE);
+GO
+
+CREATE TABLE restaurante.DetallesOrdenArchivo (
+    DetalleId INT NOT NULL PRIMARY KEY,
+    OrdenId INT NOT NULL,
+    ProductoId INT NOT NULL,
+    Cantidad INT NOT NULL,
+    PrecioUnitario DECIMAL(10,2) NOT NULL,
+    Subtotal DECIMAL(12,2) NULL,
+    Estado NVARCHAR(30) NOT NULL,
+    CONSTRAINT FK_DetallesOrdenArchivo_OrdenesArchivo FOREIGN KEY (OrdenId)
+        REFERENCES restaurante.OrdenesArchivo (OrdenId)
+        ON DELETE CASCADE,
+    CONSTRAINT FK_DetallesOrdenArchivo_Productos FOREIGN KEY (ProductoId)
+        REFERENCES restaurante.MenuProductos (ProductoId)
+        ON DELETE NO ACTION
+) WITH (DATA_COMPRESSION = PAGE);
+GO
+
+CREATE INDEX IX_DetallesOrdenArchivo_Orden ON restaurante.DetallesOrdenArchivo (OrdenId) WITH (DATA_COMPRESSION = PAGE);
+GO
+
+
 ---------------------------------------------------------
 -- ÍNDICES RECOMENDADOS
 ---------------------------------------------------------
 CREATE INDEX IX_MenuProductos_Categoria ON restaurante.MenuProductos (CategoriaId);
 CREATE INDEX IX_Ordenes_Mesa_Fecha ON restaurante.Ordenes (MesaId, FechaCreacion);
 CREATE INDEX IX_DetallesOrden_Orden ON restaurante.DetallesOrden (OrdenId);
+CREATE INDEX IX_DetallesOrden_Estado_Orden ON restaurante.DetallesOrden (Estado, OrdenId) INCLUDE (ProductoId, Cantidad);
+CREATE INDEX IX_Ordenes_Estado_FechaCierre ON restaurante.Ordenes (Estado, FechaCierre);
+CREATE INDEX IX_ClavesIdempotencia_FechaExpiracion ON restaurante.ClavesIdempotencia (FechaExpiracion);
 GO
 
 
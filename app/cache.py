@@ -0,0 +1,103 @@
+"""
+In-process caching for rarely changing data (menu catalog), for the
+responses of completed Idempotency-Key requests and for compressed bodies of
+responses with an ETag.
+
+TTLCache is a bounded LRU map whose entries also expire after a TTL, with
+hit/miss counters. Every cache created here is registered so its stats can
+be reported by the health endpoints.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "2048"))
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_CACHE_MAXSIZE = int(os.getenv("IDEMPOTENCY_CACHE_MAXSIZE", "10000"))
+COMPRESSED_CACHE_MAXSIZE = int(os.getenv("COMPRESSED_CACHE_MAXSIZE", "256"))
+
+# Sentinel so that None (e.g. "product does not exist") can be cached too
+MISSING = object()
+
+# All caches, for stats reporting
+registry = []
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped by clear(); lets a reader drop a value loaded before an invalidation
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key, value, generation=None):
+        """
+        Store value under key, evicting the least recently used entry if full.
+        If generation is given (read before loading the value) and the cache was
+        cleared since, the value may predate that invalidation and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a single entry."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self):
+        """Return size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Menu catalog (MenuProductos and Categorias), invalidated by the catalog write functions
+catalog_cache = TTLCache("catalog", maxsize=CATALOG_CACHE_MAXSIZE, ttl=CATALOG_CACHE_TTL)
+
+# Completed idempotent responses, in front of the ClavesIdempotencia table
+idempotency_cache = TTLCache("idempotency", maxsize=IDEMPOTENCY_CACHE_MAXSIZE, ttl=IDEMPOTENCY_TTL_SECONDS)
+
+# Compressed bodies of ETag responses, keyed by (ETag, encoding): each version is compressed once
+compressed_cache = TTLCache("compressed", maxsize=COMPRESSED_CACHE_MAXSIZE, ttl=CATALOG_CACHE_TTL)
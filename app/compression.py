@@ -0,0 +1,195 @@
+"""
+Negotiated response compression (gzip, and brotli when the optional brotli
+package is installed).
+
+CompressionMiddleware picks the encoding from Accept-Encoding and compresses
+complete responses of a compressible type above COMPRESSION_MIN_SIZE bytes.
+Streamed exports are compressed chunk by chunk as they are sent; Server-Sent
+Events are never compressed, so events are not held back. Responses
+with an ETag (catalog and mesas) are compressed once per version: the
+compressed body is kept in cache.compressed_cache under (ETag, encoding), and
+the compressed representation gets its own ETag with an encoding suffix.
+"""
+import gzip
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+import http_cache
+from cache import MISSING, compressed_cache
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies are sent as is: compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Long-lived streams whose chunks must reach the client immediately
+UNCOMPRESSED_STREAM_TYPES = ("text/event-stream",)
+# Preferred first when the client accepts several with the same q-value
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Choose the supported encoding with the highest q-value in Accept-Encoding, or None."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body with the given encoding (mtime fixed so equal bodies compress equally)."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor for streamed bodies; each chunk is flushed so it can be decoded on arrival."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def is_compressible(headers: MutableHeaders) -> bool:
+    """Check whether a response may be compressed: a text-like type not already encoded."""
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware that compresses complete responses with the encoding
+    negotiated from Accept-Encoding, reusing the compressed body of responses
+    whose ETag (version) was already compressed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match")
+        start_message = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # Echo the ETag the client holds, which may be a compressed representation's
+                    headers = MutableHeaders(scope=message)
+                    etag = headers.get("etag")
+                    if etag and if_none_match:
+                        for tag in http_cache.if_none_match_tags(if_none_match):
+                            if http_cache.identity_etag(tag) == etag:
+                                headers["ETag"] = tag
+                                break
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(message)
+                    return
+                # Hold the headers until the body shows whether it is complete
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if start_message is None:
+                if stream is not None:
+                    # Next chunk of a compressed stream
+                    more_body = message.get("more_body", False)
+                    chunk = stream.compress(message.get("body", b""))
+                    if not more_body:
+                        chunk += stream.finish()
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    return
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            if not is_compressible(headers) or headers.get("content-type", "").startswith(UNCOMPRESSED_STREAM_TYPES):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if message.get("more_body", False):
+                if encoding is None or not 200 <= start["status"] < 300:
+                    await send(start)
+                    await send(message)
+                    return
+                # Streamed body: compress each chunk as it is sent
+                stream = StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start)
+                await send({"type": "http.response.body", "body": stream.compress(body), "more_body": True})
+                return
+
+            if encoding is None or len(body) < COMPRESSION_MIN_SIZE or not 200 <= start["status"] < 300:
+                await send(start)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            compressed = compressed_cache.get((etag, encoding)) if etag else MISSING
+            if compressed is MISSING:
+                compressed = compress(body, encoding)
+                if etag:
+                    compressed_cache.set((etag, encoding), compressed)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if etag:
+                headers["ETag"] = http_cache.encoded_etag(etag, encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,32 +1,219 @@
 """
 CRUD operations for all database entities.
 """
-from datetime import datetime
+import logging
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
+from functools import lru_cache
 from typing import List, Optional
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 import models
 import schemas
+import events
+import query_stats
+import versions
+from cache import MISSING, catalog_cache
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== PREBUILT STATEMENTS ====================
+# Hot lookups and list filters are built once with bound parameters instead of
+# a new db.query(...) per call, so each execution skips constructing the ORM
+# expression and its cache key. List statements are cached per combination of
+# filters in use (see the lru_cache builders next to each get_* function).
+def select_by_key(model, key_column, *options):
+    """SELECT of one row by key, bound as :key at execution time."""
+    return select(model).options(*options).where(key_column == bindparam("key"))
+
+
+# ==================== PAGINATION ====================
+def keyset_order(stmt, key_column, keyset: bool):
+    """
+    Order a list statement by the primary key. Keyset statements also filter
+    on key > :after_id, so the page starts right after that key using the index.
+    """
+    if keyset:
+        stmt = stmt.where(key_column > bindparam("after_id"))
+    return stmt.order_by(key_column)
+
+
+def paginate(stmt, skip: int, limit: int, after_id: Optional[int] = None):
+    """Apply the page size, plus the legacy skip offset when not paging by keyset (after_id)."""
+    if after_id is not None:
+        return stmt.limit(limit)
+    return stmt.offset(skip).limit(limit)
+
+
+# ==================== CHANGE TRACKING ====================
+CATALOG_TABLES = {"Categorias", "MenuProductos"}
+
+
+def mark_changed(*tables: str):
+    """
+    Record committed changes to the given tables.
+    Bumps their versions (used for ETags) and drops the cached catalog when
+    categorias or menu productos changed; catalog writes are rare, so a full
+    clear keeps invalidation simple.
+    """
+    versions.bump(*tables)
+    if CATALOG_TABLES.intersection(tables):
+        catalog_cache.clear()
+
+
+def touch_tables(db: Session, *tables: str):
+    """
+    Bump the shared versions (VersionesTablas) of the given tables inside the
+    current transaction, so they only move if the write commits. The new
+    versions are recorded locally once the session commits.
+    Runs even while this process has not loaded the shared versions yet; if
+    VersionesTablas is not available the bump is skipped in a savepoint and
+    the write itself goes on.
+    """
+    shared = [table for table in tables if versions.is_stored(table)]
+    if not shared:
+        return
+    # Flush the write first so its own errors surface as usual, outside the savepoint
+    db.flush()
+    try:
+        with db.begin_nested():
+            rows = db.execute(
+                update(models.VersionTabla)
+                .where(models.VersionTabla.Tabla.in_(shared))
+                .values(Version=models.VersionTabla.Version + 1, FechaCambio=datetime.utcnow())
+                .returning(models.VersionTabla.Tabla, models.VersionTabla.Version)
+            ).all()
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not bump shared versions of {', '.join(shared)}: {str(e)}")
+        return
+    db.info.setdefault("table_versions", {}).update({row.Tabla: row.Version for row in rows})
+
+
+@event.listens_for(Session, "after_commit")
+def observe_committed_versions(session):
+    """Record the shared versions bumped by the committed transaction."""
+    table_versions = session.info.pop("table_versions", None)
+    if table_versions:
+        versions.observe(table_versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_versions(session):
+    """Forget shared versions bumped by a transaction that was rolled back."""
+    session.info.pop("table_versions", None)
+
+
+def ensure_table_versions(db: Session):
+    """Create the missing VersionesTablas rows for the shared tables."""
+    existing = set(db.scalars(select(models.VersionTabla.Tabla)))
+    faltantes = [table for table in versions.SHARED_TABLES if table not in existing]
+    for table in faltantes:
+        try:
+            with db.begin_nested():
+                db.add(models.VersionTabla(Tabla=table, Version=0))
+        except IntegrityError:
+            pass  # Created by another worker starting at the same time
+    db.commit()
+
+
+def get_table_versions(db: Session):
+    """Read the shared table versions as {Tabla: Version}."""
+    return dict(db.execute(select(models.VersionTabla.Tabla, models.VersionTabla.Version)).all())
+
+
+def mesa_event_data(db_mesa: models.Mesa):
+    """Serialize a mesa for a change event."""
+    return schemas.MesaResponse.model_validate(db_mesa).model_dump(mode="json")
+
+
+def orden_event_data(db_orden):
+    """Serialize an orden (model or dict row, without detalles) for a change event."""
+    return schemas.OrdenResponse.model_validate(db_orden).model_dump(mode="json", exclude={"Detalles"})
+
+
+def detalle_event_data(db_detalle):
+    """Serialize a detalle orden (model or dict row) for a change event."""
+    return schemas.DetalleOrdenResponse.model_validate(db_detalle).model_dump(mode="json")
 
 
 # ==================== CATEGORIAS ====================
-def get_categoria(db: Session, categoria_id: int):
-    """Get a single categoria by ID."""
-    return db.query(models.Categoria).filter(models.Categoria.CategoriaId == categoria_id).first()
+SELECT_CATEGORIA = select_by_key(models.Categoria, models.Categoria.CategoriaId)
 
 
-def get_categorias(db: Session, skip: int = 0, limit: int = 100):
-    """Get all categorias with pagination."""
-    return db.query(models.Categoria).offset(skip).limit(limit).all()
+def get_categoria(db: Session, categoria_id: int):
+    """Get a single categoria by ID."""
+    return db.scalars(SELECT_CATEGORIA, {"key": categoria_id}).first()
+
+
+@lru_cache(maxsize=None)
+def categorias_statement(keyset: bool):
+    """List statement for get_categorias."""
+    return keyset_order(select(models.Categoria), models.Categoria.CategoriaId, keyset)
+
+
+def get_categorias(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get all categorias with offset or keyset (after_id) pagination."""
+    stmt = categorias_statement(after_id is not None)
+    return db.scalars(paginate(stmt, skip, limit, after_id), {"after_id": after_id}).all()
+
+
+def get_categoria_cached(db: Session, categoria_id: int):
+    """Get a categoria snapshot (CategoriaResponse) by ID through the catalog cache."""
+    key = ("categoria", categoria_id)
+    generation = catalog_cache.generation
+    categoria = catalog_cache.get(key)
+    if categoria is MISSING:
+        db_categoria = get_categoria(db, categoria_id)
+        categoria = schemas.CategoriaResponse.model_validate(db_categoria) if db_categoria else None
+        catalog_cache.set(key, categoria, generation)
+    return categoria
+
+
+def get_categorias_cached(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get categoria snapshots with pagination through the catalog cache."""
+    key = ("categorias", skip, limit, after_id)
+    generation = catalog_cache.generation
+    categorias = catalog_cache.get(key)
+    if categorias is MISSING:
+        categorias = [schemas.CategoriaResponse.model_validate(c) for c in get_categorias(db, skip, limit, after_id)]
+        catalog_cache.set(key, categorias, generation)
+    return categorias
+
+
+def get_categorias_by_ids(db: Session, categoria_ids: List[int]):
+    """
+    Get categoria snapshots for the given IDs, keyed by CategoriaId.
+    Cached categorias are served from memory; the rest are loaded with one IN query.
+    """
+    categorias = {}
+    faltantes = set()
+    generation = catalog_cache.generation
+    for categoria_id in set(categoria_ids):
+        categoria = catalog_cache.get(("categoria", categoria_id))
+        if categoria is MISSING:
+            faltantes.add(categoria_id)
+        elif categoria is not None:
+            categorias[categoria_id] = categoria
+
+    if faltantes:
+        encontradas = db.query(models.Categoria).filter(models.Categoria.CategoriaId.in_(faltantes)).all()
+        for db_categoria in encontradas:
+            categorias[db_categoria.CategoriaId] = schemas.CategoriaResponse.model_validate(db_categoria)
+        for categoria_id in faltantes:
+            catalog_cache.set(("categoria", categoria_id), categorias.get(categoria_id), generation)
+    return categorias
 
 
 def create_categoria(db: Session, categoria: schemas.CategoriaCreate):
     """Create a new categoria."""
     db_categoria = models.Categoria(**categoria.model_dump())
     db.add(db_categoria)
+    touch_tables(db, "Categorias")
     db.commit()
+    mark_changed("Categorias")
     db.refresh(db_categoria)
     return db_categoria
 
@@ -41,7 +228,9 @@ def update_categoria(db: Session, categoria_id: int, categoria: schemas.Categori
     for key, value in update_data.items():
         setattr(db_categoria, key, value)
 
+    touch_tables(db, "Categorias")
     db.commit()
+    mark_changed("Categorias")
     db.refresh(db_categoria)
     return db_categoria
 
@@ -53,19 +242,31 @@ def delete_categoria(db: Session, categoria_id: int):
         return None
 
     db.delete(db_categoria)
+    touch_tables(db, "Categorias")
     db.commit()
+    mark_changed("Categorias")
     return db_categoria
 
 
 # ==================== MESEROS ====================
+SELECT_MESERO = select_by_key(models.Mesero, models.Mesero.MeseroId)
+
+
 def get_mesero(db: Session, mesero_id: int):
     """Get a single mesero by ID."""
-    return db.query(models.Mesero).filter(models.Mesero.MeseroId == mesero_id).first()
+    return db.scalars(SELECT_MESERO, {"key": mesero_id}).first()
 
 
-def get_meseros(db: Session, skip: int = 0, limit: int = 100):
-    """Get all meseros with pagination."""
-    return db.query(models.Mesero).offset(skip).limit(limit).all()
+@lru_cache(maxsize=None)
+def meseros_statement(keyset: bool):
+    """List statement for get_meseros."""
+    return keyset_order(select(models.Mesero), models.Mesero.MeseroId, keyset)
+
+
+def get_meseros(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get all meseros with offset or keyset (after_id) pagination."""
+    stmt = meseros_statement(after_id is not None)
+    return db.scalars(paginate(stmt, skip, limit, after_id), {"after_id": after_id}).all()
 
 
 def create_mesero(db: Session, mesero: schemas.MeseroCreate):
@@ -73,6 +274,7 @@ def create_mesero(db: Session, mesero: schemas.MeseroCreate):
     db_mesero = models.Mesero(**mesero.model_dump(exclude_none=True))
     db.add(db_mesero)
     db.commit()
+    mark_changed("Meseros")
     db.refresh(db_mesero)
     return db_mesero
 
@@ -88,6 +290,7 @@ def update_mesero(db: Session, mesero_id: int, mesero: schemas.MeseroUpdate):
         setattr(db_mesero, key, value)
 
     db.commit()
+    mark_changed("Meseros")
     db.refresh(db_mesero)
     return db_mesero
 
@@ -100,29 +303,43 @@ def delete_mesero(db: Session, mesero_id: int):
 
     db.delete(db_mesero)
     db.commit()
+    mark_changed("Meseros")
     return db_mesero
 
 
 # ==================== MESAS ====================
+SELECT_MESA = select_by_key(models.Mesa, models.Mesa.MesaId)
+
+
 def get_mesa(db: Session, mesa_id: int):
     """Get a single mesa by ID."""
-    return db.query(models.Mesa).filter(models.Mesa.MesaId == mesa_id).first()
+    return db.scalars(SELECT_MESA, {"key": mesa_id}).first()
 
 
-def get_mesas(db: Session, skip: int = 0, limit: int = 100, estado: Optional[str] = None):
-    """Get all mesas with pagination and optional estado filter."""
-    query = db.query(models.Mesa)
-    if estado:
-        query = query.filter(models.Mesa.Estado == estado)
-    return query.offset(skip).limit(limit).all()
+@lru_cache(maxsize=None)
+def mesas_statement(por_estado: bool, keyset: bool):
+    """List statement for get_mesas with the filters in use."""
+    stmt = select(models.Mesa)
+    if por_estado:
+        stmt = stmt.where(models.Mesa.Estado == bindparam("estado"))
+    return keyset_order(stmt, models.Mesa.MesaId, keyset)
+
+
+def get_mesas(db: Session, skip: int = 0, limit: int = 100, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """Get all mesas with offset or keyset (after_id) pagination and optional estado filter."""
+    stmt = mesas_statement(bool(estado), after_id is not None)
+    return db.scalars(paginate(stmt, skip, limit, after_id), {"estado": estado, "after_id": after_id}).all()
 
 
 def create_mesa(db: Session, mesa: schemas.MesaCreate):
     """Create a new mesa."""
     db_mesa = models.Mesa(**mesa.model_dump())
     db.add(db_mesa)
+    touch_tables(db, "Mesas")
     db.commit()
+    mark_changed("Mesas")
     db.refresh(db_mesa)
+    events.publish("mesa.creada", mesa_event_data(db_mesa))
     return db_mesa
 
 
@@ -136,8 +353,11 @@ def update_mesa(db: Session, mesa_id: int, mesa: schemas.MesaUpdate):
     for key, value in update_data.items():
         setattr(db_mesa, key, value)
 
+    touch_tables(db, "Mesas")
     db.commit()
+    mark_changed("Mesas")
     db.refresh(db_mesa)
+    events.publish("mesa.actualizada", mesa_event_data(db_mesa))
     return db_mesa
 
 
@@ -148,31 +368,93 @@ def delete_mesa(db: Session, mesa_id: int):
         return None
 
     db.delete(db_mesa)
+    touch_tables(db, "Mesas")
     db.commit()
+    mark_changed("Mesas")
+    events.publish("mesa.eliminada", {"MesaId": db_mesa.MesaId})
     return db_mesa
 
 
 # ==================== MENU PRODUCTOS ====================
-def get_menu_producto(db: Session, producto_id: int):
-    """Get a single menu producto by ID."""
-    return db.query(models.MenuProducto).filter(models.MenuProducto.ProductoId == producto_id).first()
+SELECT_MENU_PRODUCTO = select_by_key(models.MenuProducto, models.MenuProducto.ProductoId)
 
 
-def get_menu_productos(db: Session, skip: int = 0, limit: int = 100, categoria_id: Optional[int] = None, activo: Optional[bool] = None):
-    """Get all menu productos with pagination and optional filters."""
-    query = db.query(models.MenuProducto)
-    if categoria_id:
-        query = query.filter(models.MenuProducto.CategoriaId == categoria_id)
-    if activo is not None:
-        query = query.filter(models.MenuProducto.Activo == activo)
-    return query.offset(skip).limit(limit).all()
+def get_menu_producto(db: Session, producto_id: int):
+    """Get a single menu producto by ID."""
+    return db.scalars(SELECT_MENU_PRODUCTO, {"key": producto_id}).first()
+
+
+@lru_cache(maxsize=None)
+def menu_productos_statement(por_categoria: bool, por_activo: bool, keyset: bool):
+    """List statement for get_menu_productos with the filters in use."""
+    stmt = select(models.MenuProducto)
+    if por_categoria:
+        stmt = stmt.where(models.MenuProducto.CategoriaId == bindparam("categoria_id"))
+    if por_activo:
+        stmt = stmt.where(models.MenuProducto.Activo == bindparam("activo"))
+    return keyset_order(stmt, models.MenuProducto.ProductoId, keyset)
+
+
+def get_menu_productos(db: Session, skip: int = 0, limit: int = 100, categoria_id: Optional[int] = None, activo: Optional[bool] = None, after_id: Optional[int] = None):
+    """Get all menu productos with offset or keyset (after_id) pagination and optional filters."""
+    stmt = menu_productos_statement(bool(categoria_id), activo is not None, after_id is not None)
+    params = {"categoria_id": categoria_id, "activo": activo, "after_id": after_id}
+    return db.scalars(paginate(stmt, skip, limit, after_id), params).all()
+
+
+def get_menu_producto_cached(db: Session, producto_id: int):
+    """Get a menu producto snapshot (MenuProductoResponse) by ID through the catalog cache."""
+    return get_menu_productos_by_ids(db, [producto_id]).get(producto_id)
+
+
+def get_menu_productos_cached(db: Session, skip: int = 0, limit: int = 100, categoria_id: Optional[int] = None, activo: Optional[bool] = None, after_id: Optional[int] = None):
+    """Get menu producto snapshots with pagination and filters through the catalog cache."""
+    key = ("productos", categoria_id, activo, skip, limit, after_id)
+    generation = catalog_cache.generation
+    productos = catalog_cache.get(key)
+    if productos is MISSING:
+        productos = [
+            schemas.MenuProductoResponse.model_validate(p)
+            for p in get_menu_productos(db, skip, limit, categoria_id, activo, after_id)
+        ]
+        catalog_cache.set(key, productos, generation)
+        for producto in productos:
+            catalog_cache.set(("producto", producto.ProductoId), producto, generation)
+    return productos
+
+
+def get_menu_productos_by_ids(db: Session, producto_ids: List[int]):
+    """
+    Get menu producto snapshots for the given IDs, keyed by ProductoId.
+    Cached products are served from memory; the rest are loaded with one IN query.
+    Missing products are absent from the result.
+    """
+    productos = {}
+    faltantes = set()
+    generation = catalog_cache.generation
+    for producto_id in set(producto_ids):
+        producto = catalog_cache.get(("producto", producto_id))
+        if producto is MISSING:
+            faltantes.add(producto_id)
+        elif producto is not None:
+            productos[producto_id] = producto
+
+    if faltantes:
+        encontrados = db.query(models.MenuProducto).filter(models.MenuProducto.ProductoId.in_(faltantes)).all()
+        for db_producto in encontrados:
+            productos[db_producto.ProductoId] = schemas.MenuProductoResponse.model_validate(db_producto)
+        for producto_id in faltantes:
+            catalog_cache.set(("producto", producto_id), productos.get(producto_id), generation)
+    return productos
 
 
 def create_menu_producto(db: Session, producto: schemas.MenuProductoCreate):
     """Create a new menu producto."""
     db_producto = models.MenuProducto(**producto.model_dump())
     db.add(db_producto)
+    touch_tables(db, "MenuProductos")
     db.commit()
+    mark_changed("MenuProductos")
     db.refresh(db_producto)
     return db_producto
 
@@ -187,7 +469,9 @@ def update_menu_producto(db: Session, producto_id: int, producto: schemas.MenuPr
     for key, value in update_data.items():
         setattr(db_producto, key, value)
 
+    touch_tables(db, "MenuProductos")
     db.commit()
+    mark_changed("MenuProductos")
     db.refresh(db_producto)
     return db_producto
 
@@ -199,68 +483,496 @@ def delete_menu_producto(db: Session, producto_id: int):
         return None
 
     db.delete(db_producto)
+    touch_tables(db, "MenuProductos")
     db.commit()
+    mark_changed("MenuProductos")
     return db_producto
 
 
+# ==================== BULK CATALOG ====================
+# Catalog imports take (indice, item) pairs and report one result per row:
+# {"Indice", "Accion", "Id", "Error"}. Existing rows are looked up with chunked
+# IN queries, new ones inserted with one flush and changed ones updated with one
+# executemany, all in a single transaction. Names are matched ignoring case,
+# like the default SQL Server collation.
+def bulk_resultado(indice: int, accion: Optional[str] = None, id: Optional[int] = None, error: Optional[str] = None):
+    """Build the result of one bulk row."""
+    return {"Indice": indice, "Accion": accion, "Id": id, "Error": error}
+
+
+def select_in_chunks(db: Session, columns: tuple, key_column, values, ignore_case: bool = False):
+    """
+    Run select(*columns) WHERE key_column IN (...) over chunks of values.
+    With ignore_case, LOWER(key_column) is matched against the lowercased
+    values, so the result does not depend on the server collation.
+    """
+    values = list(values)
+    if ignore_case:
+        key_column = func.lower(key_column)
+        values = list({value.lower() for value in values})
+    rows = []
+    with query_stats.chunked_reads():
+        for start in range(0, len(values), IN_CHUNK_SIZE):
+            rows.extend(db.execute(select(*columns).where(key_column.in_(values[start:start + IN_CHUNK_SIZE]))))
+    return rows
+
+
+def upsert_categorias(db: Session, filas: list):
+    """
+    Create or update categorias matched by Nombre.
+    An empty Descripcion keeps the current one. Commits once and returns the row results.
+    """
+    resultados = []
+    por_nombre = {}
+    for indice, item in filas:
+        key = item.Nombre.strip().casefold()
+        if key in por_nombre:
+            resultados.append(bulk_resultado(indice, error=f"Categoría '{item.Nombre}' repetida en el lote"))
+        else:
+            por_nombre[key] = (indice, item)
+
+    columns = (models.Categoria.CategoriaId, models.Categoria.Nombre, models.Categoria.Descripcion)
+    existentes = {
+        row.Nombre.casefold(): row
+        for row in select_in_chunks(db, columns, models.Categoria.Nombre, [item.Nombre.strip() for _, item in por_nombre.values()], ignore_case=True)
+    }
+
+    nuevas, cambios = [], []
+    for key, (indice, item) in por_nombre.items():
+        actual = existentes.get(key)
+        if actual is None:
+            nuevas.append((indice, models.Categoria(Nombre=item.Nombre.strip(), Descripcion=item.Descripcion)))
+            continue
+        descripcion = item.Descripcion if item.Descripcion is not None else actual.Descripcion
+        if item.Nombre.strip() == actual.Nombre and descripcion == actual.Descripcion:
+            resultados.append(bulk_resultado(indice, "sin cambios", actual.CategoriaId))
+            continue
+        cambios.append({"CategoriaId": actual.CategoriaId, "Nombre": item.Nombre.strip(), "Descripcion": descripcion})
+        resultados.append(bulk_resultado(indice, "actualizado", actual.CategoriaId))
+
+    if nuevas:
+        db.add_all([db_categoria for _, db_categoria in nuevas])
+        db.flush()  # Flush to get the CategoriaIds
+        resultados.extend(bulk_resultado(indice, "creado", db_categoria.CategoriaId) for indice, db_categoria in nuevas)
+    if cambios:
+        db.execute(update(models.Categoria), cambios)  # Bulk UPDATE by primary key (executemany)
+
+    if nuevas or cambios:
+        touch_tables(db, "Categorias")
+        db.commit()
+        mark_changed("Categorias")
+    return sorted(resultados, key=lambda resultado: resultado["Indice"])
+
+
+def resolve_categorias(db: Session, filas: list, crear_categorias: bool):
+    """
+    Map the categorias referenced by bulk producto rows to their IDs.
+    Returns ({CategoriaId}, {nombre casefold: CategoriaId}, created count); with
+    crear_categorias, unknown names are created (flushed, not committed).
+    """
+    ids = {item.CategoriaId for _, item in filas if item.CategoriaId is not None}
+    nombres = {
+        item.CategoriaNombre.strip().casefold(): item.CategoriaNombre.strip()
+        for _, item in filas
+        if item.CategoriaId is None and item.CategoriaNombre
+    }
+
+    ids_validos = {row.CategoriaId for row in select_in_chunks(db, (models.Categoria.CategoriaId,), models.Categoria.CategoriaId, ids)}
+    por_nombre = {
+        row.Nombre.casefold(): row.CategoriaId
+        for row in select_in_chunks(db, (models.Categoria.CategoriaId, models.Categoria.Nombre), models.Categoria.Nombre, nombres.values(), ignore_case=True)
+    }
+
+    faltantes = [nombre for key, nombre in nombres.items() if key not in por_nombre]
+    if not crear_categorias:
+        faltantes = []
+    if faltantes:
+        db_categorias = [models.Categoria(Nombre=nombre) for nombre in faltantes]
+        db.add_all(db_categorias)
+        db.flush()  # Flush to get the CategoriaIds
+        por_nombre.update((db_categoria.Nombre.casefold(), db_categoria.CategoriaId) for db_categoria in db_categorias)
+    return ids_validos, por_nombre, len(faltantes)
+
+
+def upsert_menu_productos(db: Session, filas: list, crear_categorias: bool = False):
+    """
+    Create or update menu productos from bulk rows.
+    Rows with ProductoId update that producto; otherwise they are matched by
+    Nombre and create a new producto when none exists. Categorias may be given
+    by ID or by name. Empty fields keep the current values. Invalid rows are
+    reported without aborting the rest; commits once and returns the row results.
+    """
+    resultados = []
+    categoria_ids, categorias_por_nombre, categorias_creadas = resolve_categorias(db, filas, crear_categorias)
+
+    columns = (
+        models.MenuProducto.ProductoId, models.MenuProducto.Nombre, models.MenuProducto.Descripcion,
+        models.MenuProducto.Precio, models.MenuProducto.CategoriaId, models.MenuProducto.Activo,
+    )
+    por_id = {
+        row.ProductoId: row
+        for row in select_in_chunks(db, columns, models.MenuProducto.ProductoId, {item.ProductoId for _, item in filas if item.ProductoId is not None})
+    }
+    por_nombre = {}
+    nombres = {item.Nombre.strip() for _, item in filas if item.ProductoId is None}
+    for row in select_in_chunks(db, columns, models.MenuProducto.Nombre, nombres, ignore_case=True):
+        por_nombre.setdefault(row.Nombre.casefold(), []).append(row)
+
+    nuevos, cambios = [], []
+    vistos = set()
+    for indice, item in filas:
+        try:
+            if item.ProductoId is not None:
+                actual = por_id.get(item.ProductoId)
+                if actual is None:
+                    raise ValueError(f"Producto con ID {item.ProductoId} no existe")
+                clave = ("id", item.ProductoId)
+            else:
+                coincidencias = por_nombre.get(item.Nombre.strip().casefold(), [])
+                if len(coincidencias) > 1:
+                    raise ValueError(f"Hay {len(coincidencias)} productos llamados '{item.Nombre}'; indique ProductoId")
+                actual = coincidencias[0] if coincidencias else None
+                clave = ("id", actual.ProductoId) if actual else ("nombre", item.Nombre.strip().casefold())
+            if clave in vistos:
+                raise ValueError(f"Producto '{item.Nombre}' repetido en el lote")
+
+            categoria_id = item.CategoriaId
+            if categoria_id is not None:
+                if categoria_id not in categoria_ids:
+                    raise ValueError(f"Categoría con ID {categoria_id} no existe")
+            elif item.CategoriaNombre:
+                categoria_id = categorias_por_nombre.get(item.CategoriaNombre.strip().casefold())
+                if categoria_id is None:
+                    raise ValueError(f"Categoría '{item.CategoriaNombre}' no existe")
+
+            if actual is None:
+                if item.Precio is None:
+                    raise ValueError("Precio es requerido para productos nuevos")
+                if categoria_id is None:
+                    raise ValueError("CategoriaId o CategoriaNombre es requerido para productos nuevos")
+        except ValueError as e:
+            resultados.append(bulk_resultado(indice, error=str(e)))
+            continue
+        vistos.add(clave)
+
+        if actual is None:
+            nuevos.append((indice, models.MenuProducto(
+                Nombre=item.Nombre.strip(),
+                Descripcion=item.Descripcion,
+                Precio=item.Precio,
+                CategoriaId=categoria_id,
+                Activo=item.Activo if item.Activo is not None else True,
+            )))
+            continue
+
+        fila = {
+            "ProductoId": actual.ProductoId,
+            "Nombre": item.Nombre.strip(),
+            "Descripcion": item.Descripcion if item.Descripcion is not None else actual.Descripcion,
+            "Precio": item.Precio if item.Precio is not None else actual.Precio,
+            "CategoriaId": categoria_id if categoria_id is not None else actual.CategoriaId,
+            "Activo": item.Activo if item.Activo is not None else actual.Activo,
+        }
+        if all(fila[column.name] == getattr(actual, column.name) for column in columns):
+            resultados.append(bulk_resultado(indice, "sin cambios", actual.ProductoId))
+            continue
+        cambios.append(fila)
+        resultados.append(bulk_resultado(indice, "actualizado", actual.ProductoId))
+
+    if nuevos:
+        db.add_all([db_producto for _, db_producto in nuevos])
+        db.flush()  # Flush to get the ProductoIds
+        resultados.extend(bulk_resultado(indice, "creado", db_producto.ProductoId) for indice, db_producto in nuevos)
+    if cambios:
+        db.execute(update(models.MenuProducto), cambios)  # Bulk UPDATE by primary key (executemany)
+
+    if categorias_creadas or nuevos or cambios:
+        touch_tables(db, "MenuProductos", *(["Categorias"] if categorias_creadas else []))
+        db.commit()
+        mark_changed("MenuProductos", *(["Categorias"] if categorias_creadas else []))
+    return sorted(resultados, key=lambda resultado: resultado["Indice"])
+
+
 # ==================== ORDENES ====================
+SELECT_ORDEN = select_by_key(models.Orden, models.Orden.OrdenId, joinedload(models.Orden.detalles))
+
+
 def get_orden(db: Session, orden_id: int):
     """Get a single orden by ID with detalles."""
-    return db.query(models.Orden).options(joinedload(models.Orden.detalles)).filter(models.Orden.OrdenId == orden_id).first()
+    return db.scalars(SELECT_ORDEN, {"key": orden_id}).unique().first()
+
+
+def ordenes_filters(stmt, por_mesa: bool, por_estado: bool):
+    """Add the optional MesaId / Estado filters of the ordenes lists, bound as :mesa_id / :estado."""
+    if por_mesa:
+        stmt = stmt.where(models.Orden.MesaId == bindparam("mesa_id"))
+    if por_estado:
+        stmt = stmt.where(models.Orden.Estado == bindparam("estado"))
+    return stmt
+
+
+@lru_cache(maxsize=None)
+def ordenes_statement(por_mesa: bool, por_estado: bool, keyset: bool):
+    """List statement for get_ordenes (ORM, detalles joined) with the filters in use."""
+    stmt = ordenes_filters(select(models.Orden).options(joinedload(models.Orden.detalles)), por_mesa, por_estado)
+    return keyset_order(stmt, models.Orden.OrdenId, keyset)
+
+
+def get_ordenes(db: Session, skip: int = 0, limit: int = 100, mesa_id: Optional[int] = None, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """Get all ordenes with offset or keyset (after_id) pagination and optional filters."""
+    stmt = ordenes_statement(bool(mesa_id), bool(estado), after_id is not None)
+    params = {"mesa_id": mesa_id, "estado": estado, "after_id": after_id}
+    return db.scalars(paginate(stmt, skip, limit, after_id), params).unique().all()
+
+
+# Columns of OrdenResponse / DetalleOrdenResponse, in schema field order
+ORDEN_RESPONSE_COLUMNS = (
+    models.Orden.MesaId,
+    models.Orden.MeseroId,
+    models.Orden.Estado,
+    models.Orden.Comentarios,
+    models.Orden.OrdenId,
+    models.Orden.FechaCreacion,
+    models.Orden.FechaCierre,
+    models.Orden.Total,
+)
+DETALLE_RESPONSE_COLUMNS = (
+    models.DetalleOrden.ProductoId,
+    models.DetalleOrden.Cantidad,
+    models.DetalleOrden.PrecioUnitario,
+    models.DetalleOrden.Estado,
+    models.DetalleOrden.DetalleId,
+    models.DetalleOrden.OrdenId,
+    models.DetalleOrden.Subtotal,
+)
+# Same columns in the archive tables
+ARCHIVO_ORDEN_COLUMNS = tuple(getattr(models.OrdenArchivo, column.key) for column in ORDEN_RESPONSE_COLUMNS)
+ARCHIVO_DETALLE_COLUMNS = tuple(getattr(models.DetalleOrdenArchivo, column.key) for column in DETALLE_RESPONSE_COLUMNS)
+# Keeps IN lists well below the SQL Server limit of 2100 parameters
+IN_CHUNK_SIZE = 1000
+
+SELECT_ORDEN_ROW = select(*ORDEN_RESPONSE_COLUMNS).where(models.Orden.OrdenId == bindparam("key"))
+SELECT_ORDEN_ARCHIVO_ROW = select(*ARCHIVO_ORDEN_COLUMNS).where(models.OrdenArchivo.OrdenId == bindparam("key"))
+SELECT_DETALLES_ROWS = (
+    select(*DETALLE_RESPONSE_COLUMNS)
+    .where(models.DetalleOrden.OrdenId.in_(bindparam("orden_ids", expanding=True)))
+    .order_by(models.DetalleOrden.DetalleId)
+)
+SELECT_DETALLES_ARCHIVO_ROWS = (
+    select(*ARCHIVO_DETALLE_COLUMNS)
+    .where(models.DetalleOrdenArchivo.OrdenId.in_(bindparam("orden_ids", expanding=True)))
+    .order_by(models.DetalleOrdenArchivo.DetalleId)
+)
+
+
+def attach_detalles_rows(db: Session, ordenes: List[dict], archivo: bool = False):
+    """
+    Fill the Detalles of orden rows with one IN query per chunk of ordenes,
+    from DetallesOrdenArchivo when the ordenes come from the archive.
+    """
+    stmt = SELECT_DETALLES_ARCHIVO_ROWS if archivo else SELECT_DETALLES_ROWS
+    by_orden = {}
+    for orden in ordenes:
+        orden["Detalles"] = []
+        by_orden[orden["OrdenId"]] = orden["Detalles"]
+
+    orden_ids = list(by_orden)
+    for start in range(0, len(orden_ids), IN_CHUNK_SIZE):
+        for row in db.execute(stmt, {"orden_ids": orden_ids[start:start + IN_CHUNK_SIZE]}):
+            by_orden[row.OrdenId].append(row._asdict())
+    return ordenes
+
+
+def get_orden_row(db: Session, orden_id: int):
+    """
+    Get a single orden with detalles as a plain dict shaped like OrdenResponse.
+    Selects only the response columns and skips ORM hydration. Ordenes moved
+    to the archive are looked up there after a miss.
+    """
+    for stmt, archivo in ((SELECT_ORDEN_ROW, False), (SELECT_ORDEN_ARCHIVO_ROW, True)):
+        row = db.execute(stmt, {"key": orden_id}).first()
+        if row is not None:
+            return attach_detalles_rows(db, [row._asdict()], archivo=archivo)[0]
+    return None
+
+
+def orden_response_rows(db: Session, ordenes: list):
+    """
+    Shape written ordenes (models or row dicts) like OrdenResponse with their
+    Detalles, so write endpoints return the same shape as the GETs.
+    """
+    rows = [
+        {column.key: orden[column.key] if isinstance(orden, dict) else getattr(orden, column.key) for column in ORDEN_RESPONSE_COLUMNS}
+        for orden in ordenes
+    ]
+    return attach_detalles_rows(db, rows)
+
+
+@lru_cache(maxsize=None)
+def ordenes_rows_statement(por_mesa: bool, por_estado: bool, keyset: bool):
+    """List statement for get_ordenes_rows (response columns only) with the filters in use."""
+    stmt = ordenes_filters(select(*ORDEN_RESPONSE_COLUMNS), por_mesa, por_estado)
+    return keyset_order(stmt, models.Orden.OrdenId, keyset)
+
+
+def get_ordenes_rows(db: Session, skip: int = 0, limit: int = 100, mesa_id: Optional[int] = None, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """
+    Get ordenes with detalles as plain dicts shaped like OrdenResponse.
+    Same filters and pagination as get_ordenes, without ORM hydration.
+    """
+    stmt = ordenes_rows_statement(bool(mesa_id), bool(estado), after_id is not None)
+    params = {"mesa_id": mesa_id, "estado": estado, "after_id": after_id}
+    ordenes = [row._asdict() for row in db.execute(paginate(stmt, skip, limit, after_id), params)]
+    return attach_detalles_rows(db, ordenes)
+
+
+def get_ordenes_export_chunk(db: Session, after_id: int = 0, limit: int = 1000, desde: Optional[date] = None, hasta: Optional[date] = None, estado: Optional[str] = None, archivo: bool = False):
+    """
+    Get the next chunk of an export: ordenes after after_id (keyset on OrdenId)
+    with detalles, as plain dicts shaped like OrdenResponse.
+    desde/hasta filter the creation day (inclusive); archivo reads the archive tables.
+    """
+    model, columns = (models.OrdenArchivo, ARCHIVO_ORDEN_COLUMNS) if archivo else (models.Orden, ORDEN_RESPONSE_COLUMNS)
+    stmt = select(*columns).where(model.OrdenId > after_id)
+    if desde:
+        stmt = stmt.where(model.FechaCreacion >= datetime.combine(desde, time.min))
+    if hasta:
+        stmt = stmt.where(model.FechaCreacion < datetime.combine(hasta + timedelta(days=1), time.min))
+    if estado:
+        stmt = stmt.where(model.Estado == estado)
+    stmt = stmt.order_by(model.OrdenId).limit(limit)
+    ordenes = [row._asdict() for row in db.execute(stmt)]
+    return attach_detalles_rows(db, ordenes, archivo=archivo)
 
 
-def get_ordenes(db: Session, skip: int = 0, limit: int = 100, mesa_id: Optional[int] = None, estado: Optional[str] = None):
-    """Get all ordenes with pagination and optional filters."""
-    query = db.query(models.Orden).options(joinedload(models.Orden.detalles))
-    if mesa_id:
-        query = query.filter(models.Orden.MesaId == mesa_id)
-    if estado:
-        query = query.filter(models.Orden.Estado == estado)
-    return query.offset(skip).limit(limit).all()
+def build_detalles_orden(detalles: List[schemas.DetalleOrdenCreate], productos: dict):
+    """
+    Validate order lines against prefetched productos and calculate subtotals.
+    Returns the total and the detalle rows ready to insert (without OrdenId).
+    """
+    total = Decimal('0.00')
+    detalles_data = []
+    for detalle in detalles:
+        producto = productos.get(detalle.ProductoId)
+        if producto is None:
+            raise ValueError(f"Producto {detalle.ProductoId} no existe")
+        if not producto.Activo:
+            raise ValueError(f"Producto {producto.Nombre} no está activo")
+
+        subtotal = detalle.Cantidad * detalle.PrecioUnitario
+        total += subtotal
+        detalles_data.append({
+            "ProductoId": detalle.ProductoId,
+            "Cantidad": detalle.Cantidad,
+            "PrecioUnitario": detalle.PrecioUnitario,
+            "Subtotal": subtotal,
+            "Estado": detalle.Estado,
+        })
+    return total, detalles_data
+
+
+def insert_ordenes(db: Session, ordenes_data: list):
+    """
+    Insert ordenes and their detalles without committing.
+    Takes (orden, total, detalles_data) tuples and returns the new Orden objects.
+    """
+    db_ordenes = [
+        models.Orden(**orden.model_dump(exclude={'Detalles'}), Total=total)
+        for orden, total, _ in ordenes_data
+    ]
+    db.add_all(db_ordenes)
+    db.flush()  # Flush to get the OrdenIds
+
+    # Insert all detalles with a single executemany
+    detalles_rows = []
+    for db_orden, (_, _, detalles_data) in zip(db_ordenes, ordenes_data):
+        for detalle_data in detalles_data:
+            detalles_rows.append({**detalle_data, "OrdenId": db_orden.OrdenId})
+    if detalles_rows:
+        db.execute(insert(models.DetalleOrden), detalles_rows)
+    return db_ordenes
 
 
 def create_orden(db: Session, orden: schemas.OrdenCreate):
     """Create a new orden with detalles."""
-    # Create the orden
-    orden_data = orden.model_dump(exclude={'Detalles'})
-    db_orden = models.Orden(**orden_data)
-    db.add(db_orden)
-    db.flush()  # Flush to get the OrdenId
+    detalles = orden.Detalles or []
 
-    # Add detalles if provided
-    total = Decimal('0.00')
-    if orden.Detalles:
-        for detalle in orden.Detalles:
-            # Validate that the product is active
-            producto = get_menu_producto(db, detalle.ProductoId)
-            if producto is None:
-                db.rollback()
-                raise ValueError(f"Producto {detalle.ProductoId} no existe")
-            if not producto.Activo:
-                db.rollback()
-                raise ValueError(f"Producto {producto.Nombre} no está activo")
-
-            # Calculate subtotal
-            subtotal = detalle.Cantidad * detalle.PrecioUnitario
-            total += subtotal
-
-            # Create detalle
-            db_detalle = models.DetalleOrden(
-                OrdenId=db_orden.OrdenId,
-                ProductoId=detalle.ProductoId,
-                Cantidad=detalle.Cantidad,
-                PrecioUnitario=detalle.PrecioUnitario,
-                Subtotal=subtotal,
-                Estado=detalle.Estado
-            )
-            db.add(db_detalle)
-
-    # Update total
-    db_orden.Total = total
+    # Fetch every referenced product in one query instead of one per line
+    productos = get_menu_productos_by_ids(db, [detalle.ProductoId for detalle in detalles])
+    total, detalles_data = build_detalles_orden(detalles, productos)
+
+    db_orden = insert_ordenes(db, [(orden, total, detalles_data)])[0]
 
     db.commit()
+    mark_changed("Ordenes", "DetallesOrden")
     db.refresh(db_orden)
-    return db_orden
+    events.publish("orden.creada", orden_event_data(db_orden))
+    return orden_response_rows(db, [db_orden])[0]
+
+
+def create_ordenes_batch(db: Session, ordenes: List[schemas.OrdenCreate]):
+    """
+    Create several ordenes at once with partial-failure semantics.
+    Mesas, meseros and productos are validated with one query each and all valid
+    ordenes are inserted in a single transaction. Returns one result per input:
+    {"Indice", "Exito", "Orden", "Error"}.
+    """
+    mesa_ids = {orden.MesaId for orden in ordenes}
+    mesero_ids = {orden.MeseroId for orden in ordenes}
+    mesas = {row.MesaId for row in db.query(models.Mesa.MesaId).filter(models.Mesa.MesaId.in_(mesa_ids))}
+    meseros = {row.MeseroId for row in db.query(models.Mesero.MeseroId).filter(models.Mesero.MeseroId.in_(mesero_ids))}
+    productos = get_menu_productos_by_ids(
+        db, [detalle.ProductoId for orden in ordenes for detalle in (orden.Detalles or [])]
+    )
+
+    resultados = [{"Indice": index, "Exito": False, "Orden": None, "Error": None} for index in range(len(ordenes))]
+    validas = []
+    for index, orden in enumerate(ordenes):
+        try:
+            if orden.MesaId not in mesas:
+                raise ValueError(f"Mesa con ID {orden.MesaId} no existe")
+            if orden.MeseroId not in meseros:
+                raise ValueError(f"Mesero con ID {orden.MeseroId} no existe")
+            total, detalles_data = build_detalles_orden(orden.Detalles or [], productos)
+        except ValueError as e:
+            resultados[index]["Error"] = str(e)
+            continue
+        validas.append((index, (orden, total, detalles_data)))
+
+    creadas = {}
+    if validas:
+        try:
+            db_ordenes = insert_ordenes(db, [orden_data for _, orden_data in validas])
+            db.commit()
+            creadas = {index: db_orden.OrdenId for (index, _), db_orden in zip(validas, db_ordenes)}
+        except IntegrityError:
+            db.rollback()
+            # Fall back to one transaction per orden to isolate the failing items
+            for index, orden_data in validas:
+                try:
+                    db_orden = insert_ordenes(db, [orden_data])[0]
+                    db.commit()
+                    creadas[index] = db_orden.OrdenId
+                except IntegrityError as e:
+                    db.rollback()
+                    resultados[index]["Error"] = f"Error al crear orden: {str(e.orig)}"
+
+    # Reload the created ordenes (with server defaults) in one query
+    if creadas:
+        mark_changed("Ordenes", "DetallesOrden")
+        db_ordenes = (
+            db.query(models.Orden)
+            .filter(models.Orden.OrdenId.in_(creadas.values()))
+            .populate_existing()
+            .all()
+        )
+        por_id = {orden["OrdenId"]: orden for orden in orden_response_rows(db, db_ordenes)}
+        for index, orden_id in creadas.items():
+            resultados[index]["Exito"] = True
+            resultados[index]["Orden"] = por_id[orden_id]
+            events.publish("orden.creada", orden_event_data(por_id[orden_id]))
+
+    return resultados
 
 
 def update_orden(db: Session, orden_id: int, orden: schemas.OrdenUpdate):
@@ -274,35 +986,87 @@ def update_orden(db: Session, orden_id: int, orden: schemas.OrdenUpdate):
         setattr(db_orden, key, value)
 
     db.commit()
+    mark_changed("Ordenes")
     db.refresh(db_orden)
-    return db_orden
+    events.publish("orden.actualizada", orden_event_data(db_orden))
+    return orden_response_rows(db, [db_orden])[0]
+
+
+def close_values(comentarios: Optional[str] = None):
+    """SET values that close an orden, with the total aggregated from its detalles in the database."""
+    total_detalles = (
+        select(func.coalesce(func.sum(models.DetalleOrden.Subtotal), 0))
+        .where(models.DetalleOrden.OrdenId == models.Orden.OrdenId)
+        .scalar_subquery()
+    )
+    values = {"Total": total_detalles, "Estado": "Cerrada", "FechaCierre": datetime.utcnow()}
+    if comentarios:
+        values["Comentarios"] = comentarios
+    return values
 
 
 def close_orden(db: Session, orden_id: int, comentarios: Optional[str] = None):
     """Close an orden and calculate final total."""
-    db_orden = get_orden(db, orden_id)
-    if db_orden is None:
-        return None
-
-    if db_orden.Estado == "Cerrada":
+    # Close only if still open, in a single conditional UPDATE
+    closed = db.execute(
+        update(models.Orden)
+        .where(models.Orden.OrdenId == orden_id, models.Orden.Estado != "Cerrada")
+        .values(**close_values(comentarios))
+        .returning(models.Orden.OrdenId)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if closed is None:
+        db.rollback()
+        if db.query(models.Orden.OrdenId).filter(models.Orden.OrdenId == orden_id).first() is None:
+            return None
         raise ValueError("La orden ya está cerrada")
 
-    # Calculate total from detalles
-    total = Decimal('0.00')
-    for detalle in db_orden.detalles:
-        if detalle.Subtotal:
-            total += detalle.Subtotal
-
-    # Update orden
-    db_orden.Total = total
-    db_orden.Estado = "Cerrada"
-    db_orden.FechaCierre = datetime.utcnow()
-    if comentarios:
-        db_orden.Comentarios = comentarios
+    # Add the sale to the rollups in the same transaction. A failure here must
+    # not block closing the orden: the catch-up job applies it later.
+    try:
+        with db.begin_nested():
+            apply_ordenes_to_rollups(db, [orden_id])
+    except SQLAlchemyError as e:
+        logger.warning(f"Rollup update failed for orden {orden_id}, left to catch-up: {str(e)}")
 
     db.commit()
-    db.refresh(db_orden)
-    return db_orden
+    mark_changed("Ordenes")
+    db_orden = db.query(models.Orden).filter(models.Orden.OrdenId == orden_id).populate_existing().first()
+    events.publish("orden.cerrada", orden_event_data(db_orden))
+    return orden_response_rows(db, [db_orden])[0]
+
+
+def close_ordenes(db: Session, orden_ids: List[int], comentarios: Optional[str] = None):
+    """
+    Close several ordenes with one conditional UPDATE ... RETURNING.
+    Ordenes that are already closed or do not exist are skipped; returns the
+    closed ordenes as dicts shaped like OrdenResponse, with their detalles.
+    """
+    orden_columns = models.Orden.__table__.c
+    rows = db.execute(
+        update(models.Orden)
+        .where(models.Orden.OrdenId.in_(orden_ids), models.Orden.Estado != "Cerrada")
+        .values(**close_values(comentarios))
+        .returning(*orden_columns)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not rows:
+        db.rollback()
+        return []
+    cerradas = [row._asdict() for row in rows]
+
+    # Same as close_orden: rollup failures are left to the catch-up job
+    try:
+        with db.begin_nested():
+            apply_ordenes_to_rollups(db, [orden["OrdenId"] for orden in cerradas])
+    except SQLAlchemyError as e:
+        logger.warning(f"Rollup update failed for {len(cerradas)} ordenes, left to catch-up: {str(e)}")
+
+    db.commit()
+    mark_changed("Ordenes")
+    for orden in cerradas:
+        events.publish("orden.cerrada", orden_event_data(orden))
+    return orden_response_rows(db, cerradas)
 
 
 def delete_orden(db: Session, orden_id: int):
@@ -313,37 +1077,110 @@ def delete_orden(db: Session, orden_id: int):
 
     db.delete(db_orden)
     db.commit()
+    mark_changed("Ordenes", "DetallesOrden")
+    events.publish("orden.eliminada", {"OrdenId": db_orden.OrdenId, "MesaId": db_orden.MesaId})
     return db_orden
 
 
+# ==================== ARCHIVO ====================
+# Closed ordenes older than a cutoff are moved with their detalles to
+# OrdenesArchivo / DetallesOrdenArchivo, so Ordenes and DetallesOrden only
+# hold recent history. Archived ordenes are read-only.
+def archive_ordenes(db: Session, antes_de: datetime, batch_size: int = 500):
+    """
+    Move one batch of ordenes closed before antes_de to the archive tables in
+    a single short transaction: copy ordenes and detalles with INSERT ... SELECT,
+    then delete them from the hot tables. They are added to the sales rollups
+    first, since the catch-up job only sees Ordenes. Returns the number moved.
+    """
+    orden_ids = list(db.scalars(
+        select(models.Orden.OrdenId)
+        .where(models.Orden.Estado == "Cerrada", models.Orden.FechaCierre < antes_de)
+        .order_by(models.Orden.OrdenId)
+        .limit(batch_size)
+        .with_for_update()
+    ))
+    if not orden_ids:
+        db.rollback()
+        return 0
+
+    apply_ordenes_to_rollups(db, orden_ids)
+
+    orden_columns = [column.key for column in ORDEN_RESPONSE_COLUMNS]
+    detalle_columns = [column.key for column in DETALLE_RESPONSE_COLUMNS]
+    db.execute(
+        insert(models.OrdenArchivo).from_select(
+            orden_columns,
+            select(*ORDEN_RESPONSE_COLUMNS).where(models.Orden.OrdenId.in_(orden_ids))
+        )
+    )
+    db.execute(
+        insert(models.DetalleOrdenArchivo).from_select(
+            detalle_columns,
+            select(*DETALLE_RESPONSE_COLUMNS).where(models.DetalleOrden.OrdenId.in_(orden_ids))
+        )
+    )
+    db.execute(delete(models.DetalleOrden).where(models.DetalleOrden.OrdenId.in_(orden_ids)).execution_options(synchronize_session=False))
+    db.execute(delete(models.Orden).where(models.Orden.OrdenId.in_(orden_ids)).execution_options(synchronize_session=False))
+    # Archived ordenes can never be applied again, so their ledger rows are not needed
+    db.execute(delete(models.RollupOrdenAplicada).where(models.RollupOrdenAplicada.OrdenId.in_(orden_ids)))
+    db.commit()
+    mark_changed("Ordenes", "DetallesOrden")
+    return len(orden_ids)
+
+
 # ==================== DETALLES ORDEN ====================
+SELECT_DETALLE_ORDEN = select_by_key(models.DetalleOrden, models.DetalleOrden.DetalleId)
+SELECT_DETALLES_DE_ORDEN = select(models.DetalleOrden).where(models.DetalleOrden.OrdenId == bindparam("orden_id"))
+
+
 def get_detalle_orden(db: Session, detalle_id: int):
     """Get a single detalle orden by ID."""
-    return db.query(models.DetalleOrden).filter(models.DetalleOrden.DetalleId == detalle_id).first()
+    return db.scalars(SELECT_DETALLE_ORDEN, {"key": detalle_id}).first()
 
 
 def get_detalles_orden(db: Session, orden_id: int):
     """Get all detalles for a specific orden."""
-    return db.query(models.DetalleOrden).filter(models.DetalleOrden.OrdenId == orden_id).all()
+    return db.scalars(SELECT_DETALLES_DE_ORDEN, {"orden_id": orden_id}).all()
+
+
+def add_to_orden_total(db: Session, orden_id: int, amount, treat_null_as_zero: bool = True):
+    """
+    Atomically add amount (may be negative) to an orden total with
+    UPDATE ... SET Total = Total + ?, so concurrent writers never lose updates
+    and the orden and its detalles are never loaded.
+    Returns False if the orden does not exist.
+    """
+    current_total = func.coalesce(models.Orden.Total, 0) if treat_null_as_zero else models.Orden.Total
+    updated = db.execute(
+        update(models.Orden)
+        .where(models.Orden.OrdenId == orden_id)
+        .values(Total=current_total + amount)
+        .returning(models.Orden.OrdenId)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return updated is not None
 
 
 def create_detalle_orden(db: Session, detalle: schemas.DetalleOrdenCreate):
     """Create a new detalle orden and update orden total."""
-    # Validate orden exists
-    orden = get_orden(db, detalle.OrdenId)
-    if orden is None:
+    # Calculate subtotal
+    subtotal = detalle.Cantidad * detalle.PrecioUnitario
+
+    # Update orden total (also validates that the orden exists)
+    if not add_to_orden_total(db, detalle.OrdenId, subtotal):
+        db.rollback()
         raise ValueError(f"Orden {detalle.OrdenId} no existe")
 
     # Validate product is active
-    producto = get_menu_producto(db, detalle.ProductoId)
+    producto = get_menu_producto_cached(db, detalle.ProductoId)
     if producto is None:
+        db.rollback()
         raise ValueError(f"Producto {detalle.ProductoId} no existe")
     if not producto.Activo:
+        db.rollback()
         raise ValueError(f"Producto {producto.Nombre} no está activo")
 
-    # Calculate subtotal
-    subtotal = detalle.Cantidad * detalle.PrecioUnitario
-
     # Create detalle
     db_detalle = models.DetalleOrden(
         **detalle.model_dump(exclude_none=True),
@@ -351,19 +1188,22 @@ def create_detalle_orden(db: Session, detalle: schemas.DetalleOrdenCreate):
     )
     db.add(db_detalle)
 
-    # Update orden total
-    if orden.Total is None:
-        orden.Total = Decimal('0.00')
-    orden.Total += subtotal
-
     db.commit()
+    mark_changed("DetallesOrden", "Ordenes")
     db.refresh(db_detalle)
+    events.publish("detalle.creado", detalle_event_data(db_detalle))
     return db_detalle
 
 
 def update_detalle_orden(db: Session, detalle_id: int, detalle: schemas.DetalleOrdenUpdate):
     """Update an existing detalle orden and recalculate totals."""
-    db_detalle = get_detalle_orden(db, detalle_id)
+    # Lock the detalle so concurrent updates see each other's subtotal
+    db_detalle = (
+        db.query(models.DetalleOrden)
+        .filter(models.DetalleOrden.DetalleId == detalle_id)
+        .with_for_update()
+        .first()
+    )
     if db_detalle is None:
         return None
 
@@ -379,30 +1219,516 @@ def update_detalle_orden(db: Session, detalle_id: int, detalle: schemas.DetalleO
     if 'Cantidad' in update_data or 'PrecioUnitario' in update_data:
         db_detalle.Subtotal = db_detalle.Cantidad * db_detalle.PrecioUnitario
 
-    # Update orden total
-    orden = get_orden(db, db_detalle.OrdenId)
-    if orden:
-        new_subtotal = db_detalle.Subtotal or Decimal('0.00')
-        if orden.Total is None:
-            orden.Total = Decimal('0.00')
-        orden.Total = orden.Total - old_subtotal + new_subtotal
+    # Update orden total by the difference
+    new_subtotal = db_detalle.Subtotal or Decimal('0.00')
+    if new_subtotal != old_subtotal:
+        add_to_orden_total(db, db_detalle.OrdenId, new_subtotal - old_subtotal)
 
     db.commit()
+    mark_changed("DetallesOrden", "Ordenes")
     db.refresh(db_detalle)
+    events.publish("detalle.actualizado", detalle_event_data(db_detalle))
     return db_detalle
 
 
 def delete_detalle_orden(db: Session, detalle_id: int):
     """Delete a detalle orden and update orden total."""
-    db_detalle = get_detalle_orden(db, detalle_id)
+    db_detalle = (
+        db.query(models.DetalleOrden)
+        .filter(models.DetalleOrden.DetalleId == detalle_id)
+        .with_for_update()
+        .first()
+    )
     if db_detalle is None:
         return None
 
-    # Update orden total
-    orden = get_orden(db, db_detalle.OrdenId)
-    if orden and orden.Total and db_detalle.Subtotal:
-        orden.Total -= db_detalle.Subtotal
+    # Update orden total (a NULL total stays NULL)
+    if db_detalle.Subtotal:
+        add_to_orden_total(db, db_detalle.OrdenId, -db_detalle.Subtotal, treat_null_as_zero=False)
 
     db.delete(db_detalle)
     db.commit()
+    mark_changed("DetallesOrden", "Ordenes")
+    events.publish("detalle.eliminado", {"DetalleId": db_detalle.DetalleId, "OrdenId": db_detalle.OrdenId})
     return db_detalle
+
+
+def update_detalles_estado(db: Session, estado: str, detalle_ids: Optional[List[int]] = None, orden_id: Optional[int] = None, estado_actual: Optional[str] = None):
+    """
+    Move detalles to a new Estado with one conditional UPDATE ... RETURNING,
+    selected by DetalleId list or by orden. With estado_actual only detalles in
+    that Estado change; otherwise every detalle not already in the new Estado.
+    Returns only the changed detalles, as dicts.
+    """
+    condiciones = [models.DetalleOrden.Estado == estado_actual if estado_actual else models.DetalleOrden.Estado != estado]
+    if detalle_ids is not None:
+        condiciones.append(models.DetalleOrden.DetalleId.in_(detalle_ids))
+    if orden_id is not None:
+        condiciones.append(models.DetalleOrden.OrdenId == orden_id)
+
+    rows = db.execute(
+        update(models.DetalleOrden)
+        .where(*condiciones)
+        .values(Estado=estado)
+        .returning(*models.DetalleOrden.__table__.c)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not rows:
+        db.rollback()
+        return []
+
+    db.commit()
+    mark_changed("DetallesOrden")
+    detalles = [dict(row._mapping) for row in rows]
+    for detalle in detalles:
+        events.publish("detalle.actualizado", detalle_event_data(detalle))
+    return detalles
+
+
+# ==================== COCINA ====================
+COCINA_ESTADOS_PENDIENTES = ("Pendiente", "En preparación")
+
+
+def get_cola_cocina(db: Session, estados: tuple = COCINA_ESTADOS_PENDIENTES, limit: int = 500, categoria_ids: Optional[List[int]] = None, excluir_categoria_ids: Optional[List[int]] = None):
+    """
+    Get the pending detalles of open ordenes, oldest orden first, as dicts with
+    the producto and categoria names. The detalles are found through the
+    (Estado, OrdenId) index; names come from the catalog cache. categoria_ids /
+    excluir_categoria_ids restrict the queue to the productos of a station.
+    """
+    stmt = (
+        select(
+            models.DetalleOrden.DetalleId,
+            models.DetalleOrden.OrdenId,
+            models.Orden.MesaId,
+            models.DetalleOrden.ProductoId,
+            models.DetalleOrden.Cantidad,
+            models.DetalleOrden.Estado,
+            models.Orden.FechaCreacion,
+        )
+        .join(models.Orden, models.Orden.OrdenId == models.DetalleOrden.OrdenId)
+        .where(models.DetalleOrden.Estado.in_(estados), models.Orden.Estado == "Abierta")
+        .order_by(models.Orden.FechaCreacion, models.DetalleOrden.DetalleId)
+        .limit(limit)
+    )
+    if categoria_ids is not None or excluir_categoria_ids:
+        stmt = stmt.join(models.MenuProducto, models.MenuProducto.ProductoId == models.DetalleOrden.ProductoId)
+        if categoria_ids is not None:
+            stmt = stmt.where(models.MenuProducto.CategoriaId.in_(categoria_ids))
+        if excluir_categoria_ids:
+            stmt = stmt.where(models.MenuProducto.CategoriaId.notin_(excluir_categoria_ids))
+    detalles = [row._asdict() for row in db.execute(stmt)]
+
+    productos = get_menu_productos_by_ids(db, [detalle["ProductoId"] for detalle in detalles])
+    categorias = get_categorias_by_ids(db, [producto.CategoriaId for producto in productos.values()])
+    for detalle in detalles:
+        producto = productos.get(detalle["ProductoId"])
+        categoria = categorias.get(producto.CategoriaId) if producto else None
+        detalle["Producto"] = producto.Nombre if producto else None
+        detalle["Categoria"] = categoria.Nombre if categoria else None
+    return detalles
+
+
+# ==================== IDEMPOTENCY KEYS ====================
+IDEMPOTENCY_EN_PROCESO = "en_proceso"
+IDEMPOTENCY_COMPLETADA = "completada"
+# Returned by reserve_idempotency_key when the key kept changing under it (lost every race)
+IDEMPOTENCY_OCUPADA = object()
+
+
+def get_idempotency_key(db: Session, clave: str):
+    """Get an idempotency key row as a dict, or None."""
+    row = db.execute(select(models.ClaveIdempotencia.__table__).where(models.ClaveIdempotencia.Clave == clave)).first()
+    return row._asdict() if row else None
+
+
+def reserve_idempotency_key(db: Session, clave: str, huella: str, ttl_seconds: int):
+    """
+    Reserve an idempotency key for a request about to run, in its own transaction.
+    Returns None when the key was reserved, otherwise the existing unexpired row
+    (in progress or completed). Expired keys are replaced; if every attempt
+    loses a race with another request, returns IDEMPOTENCY_OCUPADA.
+    """
+    for _ in range(3):
+        ahora = datetime.utcnow()
+        try:
+            db.execute(insert(models.ClaveIdempotencia).values(
+                Clave=clave,
+                Huella=huella,
+                Estado=IDEMPOTENCY_EN_PROCESO,
+                FechaCreacion=ahora,
+                FechaExpiracion=ahora + timedelta(seconds=ttl_seconds),
+            ))
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        existente = get_idempotency_key(db, clave)
+        if existente is not None and existente["FechaExpiracion"] > ahora:
+            db.rollback()
+            return existente
+        # Expired (or released meanwhile): drop it and try again
+        db.execute(
+            delete(models.ClaveIdempotencia)
+            .where(models.ClaveIdempotencia.Clave == clave, models.ClaveIdempotencia.FechaExpiracion <= ahora)
+        )
+        db.commit()
+    return IDEMPOTENCY_OCUPADA
+
+
+def complete_idempotency_key(db: Session, clave: str, codigo_estado: int, respuesta: str):
+    """Store the response of a reserved key so retries replay it."""
+    db.execute(
+        update(models.ClaveIdempotencia)
+        .where(models.ClaveIdempotencia.Clave == clave)
+        .values(Estado=IDEMPOTENCY_COMPLETADA, CodigoEstado=codigo_estado, Respuesta=respuesta)
+    )
+    db.commit()
+
+
+def release_idempotency_key(db: Session, clave: str):
+    """Drop a reservation whose request failed, so the client can retry it."""
+    db.rollback()
+    db.execute(
+        delete(models.ClaveIdempotencia)
+        .where(models.ClaveIdempotencia.Clave == clave, models.ClaveIdempotencia.Estado == IDEMPOTENCY_EN_PROCESO)
+    )
+    db.commit()
+
+
+def purge_idempotency_keys(db: Session, batch_size: int = 1000):
+    """Delete expired idempotency keys in batches; returns how many were deleted."""
+    eliminadas = 0
+    while True:
+        claves = db.scalars(
+            select(models.ClaveIdempotencia.Clave)
+            .where(models.ClaveIdempotencia.FechaExpiracion <= datetime.utcnow())
+            .limit(batch_size)
+        ).all()
+        if not claves:
+            return eliminadas
+        db.execute(delete(models.ClaveIdempotencia).where(models.ClaveIdempotencia.Clave.in_(claves)))
+        db.commit()
+        eliminadas += len(claves)
+
+
+# ==================== SALES ROLLUPS ====================
+# Closed ordenes are added once (tracked in RollupOrdenesAplicadas) to rollup
+# tables keyed by hour, day/producto and day/mesero, so reports read a few
+# buckets instead of scanning Ordenes and DetallesOrden.
+ROLLUP_BATCH_SIZE = 1000
+ROLLUP_TABLES = tuple(
+    model.__table__ for model in (models.VentasPorHora, models.VentasPorProductoDia, models.VentasPorMeseroDia, models.RollupOrdenAplicada)
+)
+
+
+def add_to_rollups(db: Session, model, key_names: tuple, measure_names: tuple, buckets: dict):
+    """
+    Add measures to rollup buckets, given as {key tuple: measures tuple}.
+    Existing buckets are read with one query and incremented server-side
+    (SET x = x + ?) with one executemany UPDATE; new ones are created with one
+    executemany INSERT. If a concurrent writer created one of them first, the
+    new buckets are retried one by one.
+    """
+    if not buckets:
+        return
+    table = model.__table__
+    key_columns = [table.c[name] for name in key_names]
+
+    existing = set()
+    keys = list(buckets)
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[start:start + IN_CHUNK_SIZE]
+        # One IN per key column (no row-value IN on SQL Server); extra rows are harmless
+        conditions = [column.in_({key[i] for key in chunk}) for i, column in enumerate(key_columns)]
+        existing.update(tuple(row) for row in db.execute(select(*key_columns).where(*conditions)))
+
+    increment = (
+        update(table)
+        .where(*[column == bindparam(f"k_{column.name}") for column in key_columns])
+        .values({name: table.c[name] + bindparam(f"d_{name}") for name in measure_names})
+    )
+
+    def increment_params(key, measures):
+        return {
+            **{f"k_{name}": value for name, value in zip(key_names, key)},
+            **{f"d_{name}": value for name, value in zip(measure_names, measures)},
+        }
+
+    updates = [increment_params(key, measures) for key, measures in buckets.items() if key in existing]
+    nuevos = [(key, measures) for key, measures in buckets.items() if key not in existing]
+    if updates:
+        db.execute(increment, updates)
+    if not nuevos:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(table), [dict(zip(key_names + measure_names, key + measures)) for key, measures in nuevos])
+    except IntegrityError:
+        for key, measures in nuevos:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(dict(zip(key_names + measure_names, key + measures))))
+            except IntegrityError:
+                db.execute(increment, [increment_params(key, measures)])
+
+
+def not_in_rollups():
+    """Condition for ordenes that are not in the rollup ledger yet."""
+    return ~select(models.RollupOrdenAplicada.OrdenId).where(
+        models.RollupOrdenAplicada.OrdenId == models.Orden.OrdenId
+    ).exists()
+
+
+def apply_ordenes_to_rollups(db: Session, orden_ids: List[int]):
+    """
+    Add closed ordenes that are not in the ledger yet to the sales rollups.
+    Runs in the caller's transaction; returns the number of ordenes applied.
+    """
+    ordenes = db.execute(
+        select(
+            models.Orden.OrdenId,
+            models.Orden.MeseroId,
+            models.Orden.FechaCreacion,
+            models.Orden.FechaCierre,
+            models.Orden.Total,
+        ).where(
+            models.Orden.OrdenId.in_(orden_ids),
+            models.Orden.Estado == "Cerrada",
+            models.Orden.FechaCierre.isnot(None),
+            not_in_rollups(),
+        )
+    ).all()
+    if not ordenes:
+        return 0
+
+    ids = [orden.OrdenId for orden in ordenes]
+    lineas = db.execute(
+        select(
+            models.DetalleOrden.OrdenId,
+            models.DetalleOrden.ProductoId,
+            func.sum(models.DetalleOrden.Cantidad).label("Cantidad"),
+            func.sum(models.DetalleOrden.Subtotal).label("Ingresos"),
+        )
+        .where(models.DetalleOrden.OrdenId.in_(ids))
+        .group_by(models.DetalleOrden.OrdenId, models.DetalleOrden.ProductoId)
+    ).all()
+
+    # Claim the ordenes first: a concurrent run fails here instead of double counting
+    db.execute(insert(models.RollupOrdenAplicada), [{"OrdenId": orden_id} for orden_id in ids])
+
+    # Aggregate in memory, then touch each bucket once
+    cierre = {orden.OrdenId: orden.FechaCierre for orden in ordenes}
+    articulos = {}
+    por_producto = {}
+    for linea in lineas:
+        articulos[linea.OrdenId] = articulos.get(linea.OrdenId, 0) + linea.Cantidad
+        bucket = por_producto.setdefault((cierre[linea.OrdenId].date(), linea.ProductoId), [0, Decimal("0.00")])
+        bucket[0] += linea.Cantidad
+        bucket[1] += linea.Ingresos or 0
+
+    por_hora = {}
+    por_mesero = {}
+    for orden in ordenes:
+        ocupacion = max(0, int((orden.FechaCierre - orden.FechaCreacion).total_seconds()))
+        medidas = (1, orden.Total or Decimal("0.00"), articulos.get(orden.OrdenId, 0), ocupacion)
+        hora = orden.FechaCierre.replace(minute=0, second=0, microsecond=0)
+        for buckets, key in ((por_hora, hora), (por_mesero, (orden.FechaCierre.date(), orden.MeseroId))):
+            acumulado = buckets.get(key, (0, Decimal("0.00"), 0, 0))
+            buckets[key] = tuple(a + b for a, b in zip(acumulado, medidas))
+
+    medidas_orden = ("Ordenes", "Ingresos", "Articulos", "SegundosOcupacion")
+    add_to_rollups(db, models.VentasPorHora, ("Hora",), medidas_orden,
+                   {(hora,): medidas for hora, medidas in por_hora.items()})
+    add_to_rollups(db, models.VentasPorMeseroDia, ("Fecha", "MeseroId"), medidas_orden, por_mesero)
+    add_to_rollups(db, models.VentasPorProductoDia, ("Fecha", "ProductoId"), ("Cantidad", "Ingresos"),
+                   {key: tuple(medidas) for key, medidas in por_producto.items()})
+    return len(ordenes)
+
+
+def get_missing_rollup_tables(db: Session):
+    """Names of the rollup and ledger tables that do not exist yet (BD1.sql not migrated)."""
+    connection = db.connection()
+    schemas_map = connection.get_execution_options().get("schema_translate_map") or {}
+    inspector = inspect(connection)
+    return [
+        table.name for table in ROLLUP_TABLES
+        if not inspector.has_table(table.name, schema=schemas_map.get(table.schema, table.schema))
+    ]
+
+
+def catch_up_rollups(db: Session, lookback_hours: int = 48):
+    """
+    Apply closed ordenes missing from the ledger, e.g. closed through
+    PUT /ordenes or while the rollup update failed. Only ordenes closed in
+    the last lookback_hours are considered, so the scan stays on recent rows.
+    Commits per batch and returns the number of ordenes applied.
+    """
+    since = datetime.utcnow() - timedelta(hours=lookback_hours)
+    pendientes = (
+        select(models.Orden.OrdenId)
+        .where(models.Orden.Estado == "Cerrada", models.Orden.FechaCierre >= since, not_in_rollups())
+        .order_by(models.Orden.OrdenId)
+        .limit(ROLLUP_BATCH_SIZE)
+    )
+    total = 0
+    while True:
+        orden_ids = list(db.scalars(pendientes))
+        if not orden_ids:
+            return total
+        total += apply_ordenes_to_rollups(db, orden_ids)
+        db.commit()
+
+
+def rebuild_rollups(db: Session, desde: date, hasta: date):
+    """
+    Recompute the rollups of the days desde..hasta (inclusive) from Ordenes
+    and DetallesOrden, e.g. after ordenes were reopened or edited once closed.
+    Returns the number of ordenes applied.
+    """
+    inicio, fin = day_range(desde, hasta)
+    archivadas = db.execute(
+        select(models.OrdenArchivo.OrdenId)
+        .where(models.OrdenArchivo.FechaCierre >= inicio, models.OrdenArchivo.FechaCierre < fin)
+        .limit(1)
+    ).first()
+    if archivadas is not None:
+        raise ValueError("El rango incluye órdenes archivadas; sus rollups no se pueden reconstruir")
+    cerradas_en_rango = select(models.Orden.OrdenId).where(
+        models.Orden.FechaCierre >= inicio, models.Orden.FechaCierre < fin
+    )
+
+    db.execute(delete(models.VentasPorHora).where(models.VentasPorHora.Hora >= inicio, models.VentasPorHora.Hora < fin))
+    db.execute(delete(models.VentasPorMeseroDia).where(models.VentasPorMeseroDia.Fecha.between(desde, hasta)))
+    db.execute(delete(models.VentasPorProductoDia).where(models.VentasPorProductoDia.Fecha.between(desde, hasta)))
+    db.execute(delete(models.RollupOrdenAplicada).where(models.RollupOrdenAplicada.OrdenId.in_(cerradas_en_rango)))
+
+    total = 0
+    after_id = 0
+    while True:
+        orden_ids = list(db.scalars(
+            cerradas_en_rango
+            .where(models.Orden.Estado == "Cerrada", models.Orden.OrdenId > after_id)
+            .order_by(models.Orden.OrdenId)
+            .limit(ROLLUP_BATCH_SIZE)
+        ))
+        if not orden_ids:
+            break
+        total += apply_ordenes_to_rollups(db, orden_ids)
+        after_id = orden_ids[-1]
+    db.commit()
+    return total
+
+
+# ==================== REPORTES ====================
+def day_range(desde: date, hasta: date):
+    """Datetime bounds [inicio, fin) covering the days desde..hasta."""
+    return datetime.combine(desde, time.min), datetime.combine(hasta + timedelta(days=1), time.min)
+
+
+def rollup_measures(ordenes: int, ingresos, articulos: int, segundos: int):
+    """Measures of a time or mesero bucket, with average ticket and table time."""
+    return {
+        "Ordenes": ordenes,
+        "Ingresos": ingresos,
+        "Articulos": articulos,
+        "TicketPromedio": (Decimal(ingresos) / ordenes).quantize(Decimal("0.01")) if ordenes else Decimal("0.00"),
+        "MinutosPromedioMesa": round(segundos / ordenes / 60, 1) if ordenes else 0.0,
+    }
+
+
+def get_ventas_horas(db: Session, desde: date, hasta: date):
+    """Hourly rollup rows (UTC closing hour) for the days desde..hasta."""
+    inicio, fin = day_range(desde, hasta)
+    return db.execute(
+        select(models.VentasPorHora)
+        .where(models.VentasPorHora.Hora >= inicio, models.VentasPorHora.Hora < fin)
+        .order_by(models.VentasPorHora.Hora)
+    ).scalars().all()
+
+
+def get_ventas_por_hora(db: Session, desde: date, hasta: date):
+    """Sales per closing hour in desde..hasta."""
+    return [
+        {"Hora": row.Hora, **rollup_measures(row.Ordenes, row.Ingresos, row.Articulos, row.SegundosOcupacion)}
+        for row in get_ventas_horas(db, desde, hasta)
+    ]
+
+
+def get_ventas_diarias(db: Session, desde: date, hasta: date):
+    """Sales per closing day in desde..hasta, adding up at most 24 hourly buckets per day."""
+    dias = {}
+    for row in get_ventas_horas(db, desde, hasta):
+        dia = dias.setdefault(row.Hora.date(), [0, Decimal("0.00"), 0, 0])
+        dia[0] += row.Ordenes
+        dia[1] += row.Ingresos
+        dia[2] += row.Articulos
+        dia[3] += row.SegundosOcupacion
+    return [{"Fecha": fecha, **rollup_measures(*medidas)} for fecha, medidas in sorted(dias.items())]
+
+
+def get_ventas_por_producto(db: Session, desde: date, hasta: date, limit: int = 100):
+    """Best-selling productos in desde..hasta by revenue."""
+    ingresos = func.sum(models.VentasPorProductoDia.Ingresos)
+    rows = db.execute(
+        select(
+            models.VentasPorProductoDia.ProductoId,
+            models.MenuProducto.Nombre,
+            models.MenuProducto.CategoriaId,
+            func.sum(models.VentasPorProductoDia.Cantidad).label("Cantidad"),
+            ingresos.label("Ingresos"),
+        )
+        .join(models.MenuProducto, models.MenuProducto.ProductoId == models.VentasPorProductoDia.ProductoId)
+        .where(models.VentasPorProductoDia.Fecha.between(desde, hasta))
+        .group_by(models.VentasPorProductoDia.ProductoId, models.MenuProducto.Nombre, models.MenuProducto.CategoriaId)
+        .order_by(ingresos.desc())
+        .limit(limit)
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_ventas_por_categoria(db: Session, desde: date, hasta: date):
+    """Sales per categoria in desde..hasta by revenue."""
+    ingresos = func.sum(models.VentasPorProductoDia.Ingresos)
+    rows = db.execute(
+        select(
+            models.Categoria.CategoriaId,
+            models.Categoria.Nombre,
+            func.sum(models.VentasPorProductoDia.Cantidad).label("Cantidad"),
+            ingresos.label("Ingresos"),
+        )
+        .join(models.MenuProducto, models.MenuProducto.ProductoId == models.VentasPorProductoDia.ProductoId)
+        .join(models.Categoria, models.Categoria.CategoriaId == models.MenuProducto.CategoriaId)
+        .where(models.VentasPorProductoDia.Fecha.between(desde, hasta))
+        .group_by(models.Categoria.CategoriaId, models.Categoria.Nombre)
+        .order_by(ingresos.desc())
+    )
+    return [row._asdict() for row in rows]
+
+
+def get_ventas_por_mesero(db: Session, desde: date, hasta: date):
+    """Sales per mesero in desde..hasta by revenue."""
+    ingresos = func.sum(models.VentasPorMeseroDia.Ingresos)
+    rows = db.execute(
+        select(
+            models.VentasPorMeseroDia.MeseroId,
+            models.Mesero.Nombre,
+            func.sum(models.VentasPorMeseroDia.Ordenes).label("Ordenes"),
+            ingresos.label("Ingresos"),
+            func.sum(models.VentasPorMeseroDia.Articulos).label("Articulos"),
+            func.sum(models.VentasPorMeseroDia.SegundosOcupacion).label("SegundosOcupacion"),
+        )
+        .join(models.Mesero, models.Mesero.MeseroId == models.VentasPorMeseroDia.MeseroId)
+        .where(models.VentasPorMeseroDia.Fecha.between(desde, hasta))
+        .group_by(models.VentasPorMeseroDia.MeseroId, models.Mesero.Nombre)
+        .order_by(ingresos.desc())
+    )
+    return [
+        {
+            "MeseroId": row.MeseroId,
+            "Nombre": row.Nombre,
+            **rollup_measures(row.Ordenes, row.Ingresos, row.Articulos, row.SegundosOcupacion),
+        }
+        for row in rows
+    ]
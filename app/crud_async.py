@@ -0,0 +1,336 @@
+"""
+Async CRUD operations for all database entities.
+
+Each function runs the matching function from crud.py on the AsyncSession's
+underlying sync Session via run_sync, so queries go through the async driver
+without blocking the event loop and the business rules live in one place.
+"""
+from datetime import date, datetime
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import schemas
+
+
+# ==================== CHANGE TRACKING ====================
+async def ensure_table_versions(db: AsyncSession):
+    """Create the missing VersionesTablas rows for the shared tables."""
+    return await db.run_sync(crud.ensure_table_versions)
+
+
+async def get_table_versions(db: AsyncSession):
+    """Read the shared table versions as {Tabla: Version}."""
+    return await db.run_sync(crud.get_table_versions)
+
+
+# ==================== CATEGORIAS ====================
+async def get_categoria(db: AsyncSession, categoria_id: int):
+    """Get a single categoria by ID."""
+    return await db.run_sync(crud.get_categoria, categoria_id=categoria_id)
+
+
+async def get_categorias(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get all categorias with offset or keyset (after_id) pagination."""
+    return await db.run_sync(crud.get_categorias, skip=skip, limit=limit, after_id=after_id)
+
+
+async def get_categoria_cached(db: AsyncSession, categoria_id: int):
+    """Get a categoria snapshot (CategoriaResponse) by ID through the catalog cache."""
+    return await db.run_sync(crud.get_categoria_cached, categoria_id=categoria_id)
+
+
+async def get_categorias_cached(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get categoria snapshots with pagination through the catalog cache."""
+    return await db.run_sync(crud.get_categorias_cached, skip=skip, limit=limit, after_id=after_id)
+
+
+async def get_categorias_by_ids(db: AsyncSession, categoria_ids: List[int]):
+    """Get categoria snapshots for the given IDs, keyed by CategoriaId."""
+    return await db.run_sync(crud.get_categorias_by_ids, categoria_ids=categoria_ids)
+
+
+async def create_categoria(db: AsyncSession, categoria: schemas.CategoriaCreate):
+    """Create a new categoria."""
+    return await db.run_sync(crud.create_categoria, categoria=categoria)
+
+
+async def update_categoria(db: AsyncSession, categoria_id: int, categoria: schemas.CategoriaUpdate):
+    """Update an existing categoria."""
+    return await db.run_sync(crud.update_categoria, categoria_id=categoria_id, categoria=categoria)
+
+
+async def delete_categoria(db: AsyncSession, categoria_id: int):
+    """Delete a categoria."""
+    return await db.run_sync(crud.delete_categoria, categoria_id=categoria_id)
+
+
+# ==================== MESEROS ====================
+async def get_mesero(db: AsyncSession, mesero_id: int):
+    """Get a single mesero by ID."""
+    return await db.run_sync(crud.get_mesero, mesero_id=mesero_id)
+
+
+async def get_meseros(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Get all meseros with offset or keyset (after_id) pagination."""
+    return await db.run_sync(crud.get_meseros, skip=skip, limit=limit, after_id=after_id)
+
+
+async def create_mesero(db: AsyncSession, mesero: schemas.MeseroCreate):
+    """Create a new mesero."""
+    return await db.run_sync(crud.create_mesero, mesero=mesero)
+
+
+async def update_mesero(db: AsyncSession, mesero_id: int, mesero: schemas.MeseroUpdate):
+    """Update an existing mesero."""
+    return await db.run_sync(crud.update_mesero, mesero_id=mesero_id, mesero=mesero)
+
+
+async def delete_mesero(db: AsyncSession, mesero_id: int):
+    """Delete a mesero."""
+    return await db.run_sync(crud.delete_mesero, mesero_id=mesero_id)
+
+
+# ==================== MESAS ====================
+async def get_mesa(db: AsyncSession, mesa_id: int):
+    """Get a single mesa by ID."""
+    return await db.run_sync(crud.get_mesa, mesa_id=mesa_id)
+
+
+async def get_mesas(db: AsyncSession, skip: int = 0, limit: int = 100, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """Get all mesas with offset or keyset (after_id) pagination and optional estado filter."""
+    return await db.run_sync(crud.get_mesas, skip=skip, limit=limit, estado=estado, after_id=after_id)
+
+
+async def create_mesa(db: AsyncSession, mesa: schemas.MesaCreate):
+    """Create a new mesa."""
+    return await db.run_sync(crud.create_mesa, mesa=mesa)
+
+
+async def update_mesa(db: AsyncSession, mesa_id: int, mesa: schemas.MesaUpdate):
+    """Update an existing mesa."""
+    return await db.run_sync(crud.update_mesa, mesa_id=mesa_id, mesa=mesa)
+
+
+async def delete_mesa(db: AsyncSession, mesa_id: int):
+    """Delete a mesa."""
+    return await db.run_sync(crud.delete_mesa, mesa_id=mesa_id)
+
+
+# ==================== MENU PRODUCTOS ====================
+async def get_menu_producto(db: AsyncSession, producto_id: int):
+    """Get a single menu producto by ID."""
+    return await db.run_sync(crud.get_menu_producto, producto_id=producto_id)
+
+
+async def get_menu_productos(db: AsyncSession, skip: int = 0, limit: int = 100, categoria_id: Optional[int] = None, activo: Optional[bool] = None, after_id: Optional[int] = None):
+    """Get all menu productos with offset or keyset (after_id) pagination and optional filters."""
+    return await db.run_sync(crud.get_menu_productos, skip=skip, limit=limit, categoria_id=categoria_id, activo=activo, after_id=after_id)
+
+
+async def get_menu_producto_cached(db: AsyncSession, producto_id: int):
+    """Get a menu producto snapshot (MenuProductoResponse) by ID through the catalog cache."""
+    return await db.run_sync(crud.get_menu_producto_cached, producto_id=producto_id)
+
+
+async def get_menu_productos_cached(db: AsyncSession, skip: int = 0, limit: int = 100, categoria_id: Optional[int] = None, activo: Optional[bool] = None, after_id: Optional[int] = None):
+    """Get menu producto snapshots with pagination and filters through the catalog cache."""
+    return await db.run_sync(crud.get_menu_productos_cached, skip=skip, limit=limit, categoria_id=categoria_id, activo=activo, after_id=after_id)
+
+
+async def get_menu_productos_by_ids(db: AsyncSession, producto_ids: List[int]):
+    """Get menu producto snapshots for the given IDs, keyed by ProductoId."""
+    return await db.run_sync(crud.get_menu_productos_by_ids, producto_ids=producto_ids)
+
+
+async def create_menu_producto(db: AsyncSession, producto: schemas.MenuProductoCreate):
+    """Create a new menu producto."""
+    return await db.run_sync(crud.create_menu_producto, producto=producto)
+
+
+async def update_menu_producto(db: AsyncSession, producto_id: int, producto: schemas.MenuProductoUpdate):
+    """Update an existing menu producto."""
+    return await db.run_sync(crud.update_menu_producto, producto_id=producto_id, producto=producto)
+
+
+async def delete_menu_producto(db: AsyncSession, producto_id: int):
+    """Delete a menu producto."""
+    return await db.run_sync(crud.delete_menu_producto, producto_id=producto_id)
+
+
+# ==================== BULK CATALOG ====================
+async def upsert_categorias(db: AsyncSession, filas: list):
+    """Create or update categorias matched by Nombre; returns one result per row."""
+    return await db.run_sync(crud.upsert_categorias, filas=filas)
+
+
+async def upsert_menu_productos(db: AsyncSession, filas: list, crear_categorias: bool = False):
+    """Create or update menu productos from bulk rows; returns one result per row."""
+    return await db.run_sync(crud.upsert_menu_productos, filas=filas, crear_categorias=crear_categorias)
+
+
+# ==================== ORDENES ====================
+async def get_orden(db: AsyncSession, orden_id: int):
+    """Get a single orden by ID with detalles."""
+    return await db.run_sync(crud.get_orden, orden_id=orden_id)
+
+
+async def get_ordenes(db: AsyncSession, skip: int = 0, limit: int = 100, mesa_id: Optional[int] = None, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """Get all ordenes with offset or keyset (after_id) pagination and optional filters."""
+    return await db.run_sync(crud.get_ordenes, skip=skip, limit=limit, mesa_id=mesa_id, estado=estado, after_id=after_id)
+
+
+async def get_orden_row(db: AsyncSession, orden_id: int):
+    """Get a single orden with detalles as a plain dict shaped like OrdenResponse."""
+    return await db.run_sync(crud.get_orden_row, orden_id=orden_id)
+
+
+async def get_ordenes_rows(db: AsyncSession, skip: int = 0, limit: int = 100, mesa_id: Optional[int] = None, estado: Optional[str] = None, after_id: Optional[int] = None):
+    """Get ordenes with detalles as plain dicts shaped like OrdenResponse."""
+    return await db.run_sync(crud.get_ordenes_rows, skip=skip, limit=limit, mesa_id=mesa_id, estado=estado, after_id=after_id)
+
+
+async def get_ordenes_export_chunk(db: AsyncSession, after_id: int = 0, limit: int = 1000, desde: Optional[date] = None, hasta: Optional[date] = None, estado: Optional[str] = None, archivo: bool = False):
+    """Get the next keyset chunk of ordenes with detalles for an export."""
+    return await db.run_sync(crud.get_ordenes_export_chunk, after_id=after_id, limit=limit, desde=desde, hasta=hasta, estado=estado, archivo=archivo)
+
+
+async def create_orden(db: AsyncSession, orden: schemas.OrdenCreate):
+    """Create a new orden with detalles."""
+    return await db.run_sync(crud.create_orden, orden=orden)
+
+
+async def create_ordenes_batch(db: AsyncSession, ordenes: List[schemas.OrdenCreate]):
+    """Create several ordenes at once with partial-failure semantics."""
+    return await db.run_sync(crud.create_ordenes_batch, ordenes=ordenes)
+
+
+async def update_orden(db: AsyncSession, orden_id: int, orden: schemas.OrdenUpdate):
+    """Update an existing orden."""
+    return await db.run_sync(crud.update_orden, orden_id=orden_id, orden=orden)
+
+
+async def close_orden(db: AsyncSession, orden_id: int, comentarios: Optional[str] = None):
+    """Close an orden and calculate final total."""
+    return await db.run_sync(crud.close_orden, orden_id=orden_id, comentarios=comentarios)
+
+
+async def close_ordenes(db: AsyncSession, orden_ids: List[int], comentarios: Optional[str] = None):
+    """Close several ordenes with one conditional UPDATE, skipping closed ones."""
+    return await db.run_sync(crud.close_ordenes, orden_ids=orden_ids, comentarios=comentarios)
+
+
+async def delete_orden(db: AsyncSession, orden_id: int):
+    """Delete an orden (cascade deletes detalles)."""
+    return await db.run_sync(crud.delete_orden, orden_id=orden_id)
+
+
+# ==================== ARCHIVO ====================
+async def archive_ordenes(db: AsyncSession, antes_de: datetime, batch_size: int = 500):
+    """Move one batch of ordenes closed before antes_de to the archive tables."""
+    return await db.run_sync(crud.archive_ordenes, antes_de=antes_de, batch_size=batch_size)
+
+
+# ==================== DETALLES ORDEN ====================
+async def get_detalle_orden(db: AsyncSession, detalle_id: int):
+    """Get a single detalle orden by ID."""
+    return await db.run_sync(crud.get_detalle_orden, detalle_id=detalle_id)
+
+
+async def get_detalles_orden(db: AsyncSession, orden_id: int):
+    """Get all detalles for a specific orden."""
+    return await db.run_sync(crud.get_detalles_orden, orden_id=orden_id)
+
+
+async def create_detalle_orden(db: AsyncSession, detalle: schemas.DetalleOrdenCreate):
+    """Create a new detalle orden and update orden total."""
+    return await db.run_sync(crud.create_detalle_orden, detalle=detalle)
+
+
+async def update_detalle_orden(db: AsyncSession, detalle_id: int, detalle: schemas.DetalleOrdenUpdate):
+    """Update an existing detalle orden and recalculate totals."""
+    return await db.run_sync(crud.update_detalle_orden, detalle_id=detalle_id, detalle=detalle)
+
+
+async def update_detalles_estado(db: AsyncSession, estado: str, detalle_ids: Optional[List[int]] = None, orden_id: Optional[int] = None, estado_actual: Optional[str] = None):
+    """Move detalles to a new Estado with one conditional UPDATE, returning the changed ones."""
+    return await db.run_sync(crud.update_detalles_estado, estado=estado, detalle_ids=detalle_ids, orden_id=orden_id, estado_actual=estado_actual)
+
+
+async def delete_detalle_orden(db: AsyncSession, detalle_id: int):
+    """Delete a detalle orden and update orden total."""
+    return await db.run_sync(crud.delete_detalle_orden, detalle_id=detalle_id)
+
+
+# ==================== COCINA ====================
+async def get_cola_cocina(db: AsyncSession, estados: tuple = crud.COCINA_ESTADOS_PENDIENTES, limit: int = 500, categoria_ids: Optional[List[int]] = None, excluir_categoria_ids: Optional[List[int]] = None):
+    """Get the pending detalles of open ordenes, oldest orden first, optionally for some categorias only."""
+    return await db.run_sync(crud.get_cola_cocina, estados=estados, limit=limit, categoria_ids=categoria_ids, excluir_categoria_ids=excluir_categoria_ids)
+
+
+# ==================== IDEMPOTENCY KEYS ====================
+async def get_idempotency_key(db: AsyncSession, clave: str):
+    """Get an idempotency key row as a dict, or None."""
+    return await db.run_sync(crud.get_idempotency_key, clave=clave)
+
+
+async def reserve_idempotency_key(db: AsyncSession, clave: str, huella: str, ttl_seconds: int):
+    """Reserve an idempotency key; returns None, the existing unexpired row or IDEMPOTENCY_OCUPADA."""
+    return await db.run_sync(crud.reserve_idempotency_key, clave=clave, huella=huella, ttl_seconds=ttl_seconds)
+
+
+async def complete_idempotency_key(db: AsyncSession, clave: str, codigo_estado: int, respuesta: str):
+    """Store the response of a reserved key so retries replay it."""
+    return await db.run_sync(crud.complete_idempotency_key, clave=clave, codigo_estado=codigo_estado, respuesta=respuesta)
+
+
+async def release_idempotency_key(db: AsyncSession, clave: str):
+    """Drop a reservation whose request failed, so the client can retry it."""
+    return await db.run_sync(crud.release_idempotency_key, clave=clave)
+
+
+async def purge_idempotency_keys(db: AsyncSession, batch_size: int = 1000):
+    """Delete expired idempotency keys in batches; returns how many were deleted."""
+    return await db.run_sync(crud.purge_idempotency_keys, batch_size=batch_size)
+
+
+# ==================== SALES ROLLUPS ====================
+async def get_missing_rollup_tables(db: AsyncSession):
+    """Names of the rollup and ledger tables that do not exist yet."""
+    return await db.run_sync(crud.get_missing_rollup_tables)
+
+
+async def catch_up_rollups(db: AsyncSession, lookback_hours: int = 48):
+    """Apply closed ordenes missing from the rollup ledger."""
+    return await db.run_sync(crud.catch_up_rollups, lookback_hours=lookback_hours)
+
+
+async def rebuild_rollups(db: AsyncSession, desde: date, hasta: date):
+    """Recompute the rollups of the days desde..hasta from Ordenes and DetallesOrden."""
+    return await db.run_sync(crud.rebuild_rollups, desde=desde, hasta=hasta)
+
+
+# ==================== REPORTES ====================
+async def get_ventas_por_hora(db: AsyncSession, desde: date, hasta: date):
+    """Sales per closing hour in desde..hasta."""
+    return await db.run_sync(crud.get_ventas_por_hora, desde=desde, hasta=hasta)
+
+
+async def get_ventas_diarias(db: AsyncSession, desde: date, hasta: date):
+    """Sales per closing day in desde..hasta."""
+    return await db.run_sync(crud.get_ventas_diarias, desde=desde, hasta=hasta)
+
+
+async def get_ventas_por_producto(db: AsyncSession, desde: date, hasta: date, limit: int = 100):
+    """Best-selling productos in desde..hasta by revenue."""
+    return await db.run_sync(crud.get_ventas_por_producto, desde=desde, hasta=hasta, limit=limit)
+
+
+async def get_ventas_por_categoria(db: AsyncSession, desde: date, hasta: date):
+    """Sales per categoria in desde..hasta by revenue."""
+    return await db.run_sync(crud.get_ventas_por_categoria, desde=desde, hasta=hasta)
+
+
+async def get_ventas_por_mesero(db: AsyncSession, desde: date, hasta: date):
+    """Sales per mesero in desde..hasta by revenue."""
+    return await db.run_sync(crud.get_ventas_por_mesero, desde=desde, hasta=hasta)
@@ -2,11 +2,20 @@
 Database configuration and session management for Azure SQL Server.
 """
 import os
+import time
 from urllib.parse import quote_plus
+from fastapi import Request
 from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, DisconnectionError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.schema import CreateColumn
+
+import metrics
+import query_stats
 
 # Environment variables for database connection
 DB_SERVER = os.getenv("DB_SERVER", "")
@@ -15,6 +24,27 @@ DB_USER = os.getenv("DB_USER", "")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_DRIVER = os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")
 
+# Connection pool configuration ("queue" keeps warm connections, "null" opens one per session)
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "240"))
+
+# Send executemany parameter sets to SQL Server as one array (pyodbc fast_executemany)
+DB_FAST_EXECUTEMANY = os.getenv("DB_FAST_EXECUTEMANY", "true").lower() == "true"
+
+# Optional read replica for GET traffic: a separate server (e.g. a geo-replica) or
+# the primary with ApplicationIntent=ReadOnly (Azure SQL read scale-out)
+DB_READ_SERVER = os.getenv("DB_READ_SERVER", "")
+DB_READ_INTENT = os.getenv("DB_READ_INTENT", "false").lower() == "true"
+# Seconds to send reads to the primary after the replica failed
+DB_READ_RETRY_SECONDS = int(os.getenv("DB_READ_RETRY_SECONDS", "30"))
+# Request header that forces reads to the primary (read-your-writes)
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
 # Build connection string for Azure SQL Server
 connection_string = (
     f"DRIVER={{{DB_DRIVER}}};"
@@ -27,19 +57,144 @@ connection_string = (
     f"Connection Timeout=30;"
 )
 
-# URL encode the connection string for SQLAlchemy
+# URL encode the connection string for SQLAlchemy.
+# DATABASE_URL can be overridden (e.g. sqlite:///./restaurante.db) to run offline.
 params = quote_plus(connection_string)
-DATABASE_URL = f"mssql+pyodbc:///?odbc_connect={params}"
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mssql+pyodbc:///?odbc_connect={params}"
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_MSSQL = DATABASE_URL.startswith("mssql")
+
+
+def to_async_url(url):
+    """
+    Map a sync database URL to its asyncio driver (aioodbc for SQL Server, aiosqlite for SQLite).
+    """
+    if url.startswith("mssql+pyodbc"):
+        return url.replace("mssql+pyodbc", "mssql+aioodbc", 1)
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite" + url[url.index(":"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+
+def build_read_database_url():
+    """
+    Return the async URL of the read replica, or None when reads go to the primary.
+    READ_DATABASE_URL overrides it (e.g. a second SQLite file to test locally).
+    """
+    read_url = os.getenv("READ_DATABASE_URL")
+    if read_url:
+        return to_async_url(read_url)
+    if not (DB_READ_SERVER or DB_READ_INTENT) or os.getenv("DATABASE_URL"):
+        return None
+    read_connection_string = connection_string + "ApplicationIntent=ReadOnly;"
+    if DB_READ_SERVER:
+        read_connection_string = read_connection_string.replace(f"SERVER={DB_SERVER};", f"SERVER={DB_READ_SERVER};", 1)
+    return to_async_url(f"mssql+pyodbc:///?odbc_connect={quote_plus(read_connection_string)}")
+
+
+READ_DATABASE_URL = build_read_database_url()
+
+
+class TimedCheckoutMixin:
+    """
+    Pool mixin that records how long each checkout waits for a connection,
+    including opening a new one when the pool is not full.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_checkout(time.perf_counter() - started)
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=NullPool,  # Use NullPool for Azure SQL to avoid connection issues
-    echo=os.getenv("SQL_ECHO", "false").lower() == "true",  # Enable SQL logging if needed
+class TimedNullPool(TimedCheckoutMixin, NullPool):
+    pass
+
+
+def get_pool_options(use_async=False):
+    """
+    Build the pool keyword arguments for create_engine from the DB_POOL_* settings.
+    Pre-ping and recycle let the pool recover from connections dropped by the Azure SQL gateway.
+    """
+    if DB_POOL_MODE == "null":
+        return {"poolclass": TimedNullPool}
+
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if use_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": True,  # Reuse the most recent connection so surplus ones can go idle and expire
+    }
+
+
+def get_engine_options(use_async=False):
+    """
+    Build the create_engine keyword arguments shared by the sync and async engines.
+    """
+    options = {
+        "echo": os.getenv("SQL_ECHO", "false").lower() == "true",  # Enable SQL logging if needed
+        **get_pool_options(use_async),
+    }
+    if IS_SQLITE:
+        # SQLite has no schemas: map 'restaurante' to the default one
+        options["execution_options"] = {"schema_translate_map": {"restaurante": None}}
+    if IS_MSSQL and DB_FAST_EXECUTEMANY:
+        # Also makes plain INSERTs use executemany instead of multi-row VALUES batches
+        options["fast_executemany"] = True
+    return options
+
+
+# Create SQLAlchemy engines: sync for scripts and startup tasks, async for request handling
+engine = create_engine(DATABASE_URL, **get_engine_options())
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(use_async=True))
+read_async_engine = (
+    create_async_engine(READ_DATABASE_URL, **get_engine_options(use_async=True))
+    if READ_DATABASE_URL else None
 )
 
-# Configure session
+# Counters for pool activity, exposed through get_pool_status()
+pool_counters = {
+    "connections_opened": 0,
+    "idle_discarded": 0,
+    "invalidated": 0,
+}
+
+# Configure sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # Objects are serialized after the session is gone
+)
+ReadAsyncSessionLocal = async_sessionmaker(
+    bind=read_async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+) if read_async_engine is not None else None
+
+# Replica health: reads go to the primary until down_until (monotonic seconds)
+replica_state = {
+    "down_until": 0.0,
+    "failures": 0,
+}
 
 # Base class for models
 Base = declarative_base()
@@ -57,12 +212,232 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependency function to get an async database session.
+    Yields an AsyncSession and ensures it's closed after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def mark_replica_down():
+    """Send reads to the primary for the next DB_READ_RETRY_SECONDS."""
+    replica_state["down_until"] = time.monotonic() + DB_READ_RETRY_SECONDS
+    replica_state["failures"] += 1
+
+
+def mark_replica_unreachable():
+    """Mark the replica down after a failed checkout, unless handle_error already did."""
+    if time.monotonic() >= replica_state["down_until"]:
+        mark_replica_down()
+
+
+def use_read_replica(request: Request) -> bool:
+    """
+    Whether a read-only request should use the replica: one is configured, it
+    has not failed recently and the client did not ask to read its own writes.
+    """
+    if ReadAsyncSessionLocal is None or time.monotonic() < replica_state["down_until"]:
+        return False
+    return request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() not in ("1", "true")
+
+
+async def get_read_db(request: Request):
+    """
+    Dependency function to get an async session for read-only routes.
+    Uses the read replica when available and falls back to the primary when
+    the replica cannot be reached or the request sends X-Read-Your-Writes: true.
+    """
+    if use_read_replica(request):
+        async with ReadAsyncSessionLocal() as db:
+            try:
+                await db.connection()  # Check out now so an unreachable replica falls back
+            except DBAPIError:
+                mark_replica_unreachable()
+            else:
+                yield db
+                return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_session_factory(request: Request):
+    """
+    Return the session factory get_read_db would pick, for reads that open
+    their own sessions (e.g. streamed responses): the replica when available
+    and reachable, otherwise the primary.
+    """
+    if use_read_replica(request):
+        async with ReadAsyncSessionLocal() as db:
+            try:
+                await db.connection()  # The checked connection returns to the pool for the caller
+            except DBAPIError:
+                mark_replica_unreachable()
+            else:
+                return ReadAsyncSessionLocal
+    return AsyncSessionLocal
+
+
+@compiles(CreateColumn, "sqlite")
+def compile_sqlite_column(element, compiler, **kw):
+    """
+    Translate the SQL Server date functions used as server defaults when creating SQLite tables.
+    """
+    column_ddl = compiler.visit_create_column(element, **kw)
+    return column_ddl.replace("GETDATE()", "CURRENT_DATE").replace("SYSUTCDATETIME()", "CURRENT_TIMESTAMP")
+
+
 # Event listener to set schema for all queries
 @event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
 def set_search_path(dbapi_conn, connection_record):
     """
     Set the default schema to 'restaurante' for all connections.
+    On SQLite, enable foreign keys so cascades behave like SQL Server, and
+    make LOWER() Unicode-aware like SQL Server's (the built-in only folds ASCII).
+    """
+    if IS_SQLITE:
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+        dbapi_conn.create_function("lower", 1, lambda value: value.lower() if isinstance(value, str) else value, deterministic=True)
+    else:
+        cursor = dbapi_conn.cursor()
+        cursor.execute("SET NOCOUNT ON")
+        cursor.close()
+    pool_counters["connections_opened"] += 1
+
+
+@event.listens_for(engine, "checkin")
+@event.listens_for(async_engine.sync_engine, "checkin")
+def mark_connection_idle(dbapi_conn, connection_record):
+    """
+    Remember when a connection went back to the pool.
+    """
+    connection_record.info["checked_in_at"] = time.monotonic()
+
+
+@event.listens_for(engine, "checkout")
+@event.listens_for(async_engine.sync_engine, "checkout")
+def discard_idle_connection(dbapi_conn, connection_record, connection_proxy):
+    """
+    Discard connections that sat idle longer than DB_POOL_IDLE_TIMEOUT.
+    Azure SQL silently drops idle sessions; raising DisconnectionError makes
+    the pool replace the connection instead of handing out a dead one.
+    """
+    checked_in_at = connection_record.info.get("checked_in_at")
+    if DB_POOL_IDLE_TIMEOUT > 0 and checked_in_at is not None:
+        if time.monotonic() - checked_in_at > DB_POOL_IDLE_TIMEOUT:
+            pool_counters["idle_discarded"] += 1
+            raise DisconnectionError("Connection idle longer than DB_POOL_IDLE_TIMEOUT")
+
+
+@event.listens_for(engine, "invalidate")
+@event.listens_for(async_engine.sync_engine, "invalidate")
+def count_invalidated_connection(dbapi_conn, connection_record, exception):
+    """
+    Count connections invalidated by pre-ping or disconnect errors.
+    """
+    pool_counters["invalidated"] += 1
+
+
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    """
+    Count statements sent to the database for the metrics endpoint and
+    start timing them for the per-request query stats.
+    """
+    metrics.count_statement()
+    query_stats.before_execute(conn)
+
+
+if IS_MSSQL and DB_FAST_EXECUTEMANY:
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def enable_fast_executemany(conn, cursor, statement, parameters, context, executemany):
+        """
+        Turn on pyodbc fast_executemany for executemany calls on the async engine.
+        The dialect sets the flag on the aioodbc cursor adapter, which does not
+        forward it, so it is set on the underlying pyodbc cursor as well.
+        """
+        if executemany:
+            raw_cursor = getattr(getattr(cursor, "_cursor", cursor), "_impl", None)
+            if raw_cursor is not None:
+                raw_cursor.fast_executemany = True
+
+
+@event.listens_for(engine, "after_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    """
+    Add the statement and its duration to the stats of the current request.
+    """
+    query_stats.after_execute(conn, statement)
+
+
+@event.listens_for(engine, "handle_error")
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def count_statement_error(exception_context):
+    """
+    Count statements that failed with a database error.
+    """
+    metrics.count_statement_error()
+    query_stats.failed_execute(exception_context.connection)
+
+
+if read_async_engine is not None:
+    for event_name, listener in (
+        ("connect", set_search_path),
+        ("checkin", mark_connection_idle),
+        ("checkout", discard_idle_connection),
+        ("invalidate", count_invalidated_connection),
+        ("before_cursor_execute", count_statement),
+        ("after_cursor_execute", record_statement),
+        ("handle_error", count_statement_error),
+    ):
+        event.listen(read_async_engine.sync_engine, event_name, listener)
+
+    @event.listens_for(read_async_engine.sync_engine, "handle_error")
+    def detect_replica_failure(exception_context):
+        """
+        Stop reading from the replica for a while when it drops connections or
+        refuses new ones, so the following requests go to the primary.
+        """
+        if exception_context.is_disconnect or exception_context.connection is None:
+            mark_replica_down()
+
+
+def get_pool_status():
+    """
+    Return a snapshot of the request-serving (async) pool state and activity counters.
+    """
+    pool = async_engine.pool
+    status = {"mode": DB_POOL_MODE, **pool_counters}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    status["replica"] = get_replica_status()
+    return status
+
+
+def get_replica_status():
+    """
+    Return whether a read replica is configured and currently receiving reads.
     """
-    cursor = dbapi_conn.cursor()
-    cursor.execute("SET NOCOUNT ON")
-    cursor.close()
+    if read_async_engine is None:
+        return {"configured": False}
+    status = {
+        "configured": True,
+        "available": time.monotonic() >= replica_state["down_until"],
+        "failures": replica_state["failures"],
+    }
+    pool = read_async_engine.pool
+    if isinstance(pool, QueuePool):
+        status.update({"checked_in": pool.checkedin(), "checked_out": pool.checkedout()})
+    return status
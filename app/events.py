@@ -0,0 +1,129 @@
+"""
+In-process change event broker for server push (Server-Sent Events).
+
+The crud write functions publish an event after each commit. Every
+connected client has its own bounded queue; a client that falls behind is
+disconnected instead of slowing down publishers, and reconnects with its
+Last-Event-ID to replay what it missed from a bounded history buffer.
+Event ids are "<boot id>-<sequence>", so ids from a previous process are
+recognised and answered with a "reset" event (reload full state).
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Optional, Set
+
+import versions
+
+EVENTS_HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "1000"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "200"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+
+class Subscriber:
+    """A connected client: its pending events and optional type filter."""
+
+    def __init__(self, tipos: Optional[Set[str]]):
+        self.tipos = tipos
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event: dict) -> bool:
+        """Check the event against the subscriber's type filter (e.g. 'mesa' or 'orden.cerrada')."""
+        if not self.tipos:
+            return True
+        tipo = event["tipo"]
+        return tipo in self.tipos or tipo.split(".")[0] in self.tipos
+
+    def offer(self, event: dict):
+        """Queue an event without blocking; mark the subscriber as overflowed when full."""
+        if self.overflowed or not self.wants(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBroker:
+    """Fan-out of change events to subscribers with a replay history."""
+
+    def __init__(self, history_size: int):
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def publish(self, tipo: str, datos: dict):
+        """Record an event and deliver it to every subscriber."""
+        with self._lock:
+            event = {"id": f"{versions.BOOT_ID}-{next(self._sequence)}", "tipo": tipo, "datos": datos}
+            self._history.append(event)
+        if not self._subscribers:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._deliver(event)
+        elif self._loop is not None:
+            # Published from a worker thread: hand over to the event loop
+            self._loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        for subscriber in list(self._subscribers):
+            subscriber.offer(event)
+
+    def subscribe(self, tipos: Optional[Set[str]] = None, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Register a subscriber. With last_event_id, missed events are queued first;
+        if they are no longer available a single "reset" event is queued instead.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(tipos)
+        if last_event_id:
+            for event in self._replay(last_event_id):
+                subscriber.offer(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Remove a subscriber."""
+        self._subscribers.discard(subscriber)
+
+    def _replay(self, last_event_id: str):
+        boot_id, _, sequence = last_event_id.rpartition("-")
+        with self._lock:
+            history = list(self._history)
+        reset = [{"id": history[-1]["id"] if history else f"{versions.BOOT_ID}-0", "tipo": "reset", "datos": {}}]
+        if boot_id != versions.BOOT_ID or not sequence.isdigit():
+            return reset
+        last_sequence = int(sequence)
+        missed = [event for event in history if int(event["id"].rpartition("-")[2]) > last_sequence]
+        oldest = int(history[0]["id"].rpartition("-")[2]) if history else last_sequence + 1
+        if oldest > last_sequence + 1:
+            return reset  # Some missed events already fell out of the history
+        return missed
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = EventBroker(EVENTS_HISTORY_SIZE)
+
+
+def publish(tipo: str, datos: dict):
+    """Publish a change event to all connected clients."""
+    broker.publish(tipo, datos)
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event in Server-Sent Events wire format."""
+    data = json.dumps(event["datos"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['tipo']}\ndata: {data}\n\n"
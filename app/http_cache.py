@@ -0,0 +1,80 @@
+"""
+HTTP conditional GET support (ETag / If-None-Match).
+
+ETags are derived from the table versions in versions.py plus the request
+path and query, so they can be computed and compared before touching the
+database; shared table versions make them identical in every worker. When
+the client already holds the current representation the route answers
+304 Not Modified without querying or serializing anything. Compressed
+representations carry the same ETag with an encoding suffix (see
+compression.py), which is ignored when comparing.
+"""
+import hashlib
+import os
+from fastapi import Request, Response, status
+
+import versions
+
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+# Content codings whose representations get their own ETag ("abc" -> "abc-gzip")
+ETAG_ENCODINGS = ("gzip", "br")
+
+
+def make_etag(request: Request, *tables: str) -> str:
+    """Build a strong ETag for the request from the versions of the tables it reads."""
+    table_versions = "-".join(str(versions.get(table)) for table in tables)
+    target = f"{request.url.path}?{request.url.query}".encode()
+    target_hash = hashlib.blake2s(target, digest_size=6).hexdigest()
+    return f'"{versions.scope(*tables)}-{table_versions}-{target_hash}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the representation compressed with encoding, derived from the identity ETag."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def identity_etag(tag: str) -> str:
+    """Strip the content coding suffix added by encoded_etag, if any."""
+    for encoding in ETAG_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def if_none_match_tags(request_header: str) -> list:
+    """Entity tags listed in an If-None-Match header, without weak prefixes."""
+    return [tag.strip().removeprefix("W/") for tag in request_header.split(",")]
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check whether the If-None-Match header already matches the ETag, in any
+    of its content codings (the client may hold a compressed representation).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (identity_etag(tag) for tag in if_none_match_tags(if_none_match))
+
+
+def not_modified_response(etag: str) -> Response:
+    """Build an empty 304 response carrying the validator headers."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    )
+
+
+def set_cache_headers(request: Request, response: Response, etag: str, *tables: str):
+    """
+    Attach the ETag and Cache-Control headers to a full response.
+    etag was computed before the body was read; if the tables changed while
+    reading, the body may belong to either version, so it goes out without
+    an ETag (and is neither revalidated nor cached in compressed form).
+    """
+    response.headers["Cache-Control"] = HTTP_CACHE_CONTROL
+    if make_etag(request, *tables) == etag:
+        response.headers["ETag"] = etag
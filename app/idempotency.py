@@ -0,0 +1,116 @@
+"""
+Idempotency-Key support for POST endpoints that create records.
+
+A client that may retry (e.g. a tablet on flaky Wi-Fi) sends a unique
+Idempotency-Key header. The first request reserves the key in the
+ClavesIdempotencia table, runs and stores its response; a retry with the same
+key and payload gets the stored response back without touching the order
+tables. Completed responses are also kept in an in-process LRU, so most
+replays do not reach the database at all. Keys expire after
+IDEMPOTENCY_TTL_SECONDS and are purged by a background job.
+"""
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from fastapi import HTTPException, Request, Response, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import crud_async
+import serialization
+from cache import IDEMPOTENCY_TTL_SECONDS, MISSING, idempotency_cache
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(request: Request, payload: BaseModel) -> str:
+    """Hash of the method, path and validated payload the key was first used with."""
+    content = f"{request.method} {request.url.path}\n{payload.model_dump_json()}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def replay_response(huella: str, entry: dict) -> Response:
+    """Return the stored response, or reject a key reused with another payload."""
+    if entry["Huella"] != huella:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"La {IDEMPOTENCY_KEY_HEADER} ya se usó con otra petición"
+        )
+    return Response(
+        content=entry["Respuesta"],
+        status_code=entry["CodigoEstado"],
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def run(
+    db: AsyncSession,
+    clave: str,
+    request: Request,
+    payload: BaseModel,
+    response_model,
+    status_code: int,
+    handler: Callable[[], Awaitable]
+):
+    """
+    Run handler once per Idempotency-Key.
+    Without a key the handler result is returned as is. With a key, a completed
+    request is replayed, one still running gets 409, and a new one is reserved,
+    run and stored; if the handler fails the reservation is released so the
+    client can retry. If the handler succeeded but its response cannot be
+    stored, the key is released rather than left in process until it expires,
+    and the response is not cached either, so no worker replays it.
+    """
+    if clave is None:
+        return await handler()
+
+    huella = fingerprint(request, payload)
+    entry = idempotency_cache.get(clave)
+    if entry is not MISSING and entry["FechaExpiracion"] > datetime.utcnow():
+        return replay_response(huella, entry)
+
+    existente = await crud_async.reserve_idempotency_key(db, clave=clave, huella=huella, ttl_seconds=IDEMPOTENCY_TTL_SECONDS)
+    if existente is not None:
+        if existente is crud.IDEMPOTENCY_OCUPADA or (
+            existente["Huella"] == huella and existente["Estado"] != crud.IDEMPOTENCY_COMPLETADA
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Una petición con esta {IDEMPOTENCY_KEY_HEADER} todavía está en proceso"
+            )
+        if existente["Estado"] == crud.IDEMPOTENCY_COMPLETADA:
+            idempotency_cache.set(clave, existente)
+        return replay_response(huella, existente)
+
+    try:
+        result = await handler()
+    except BaseException:
+        await crud_async.release_idempotency_key(db, clave=clave)
+        raise
+
+    respuesta = serialization.dumps(response_model.model_validate(result).model_dump(mode="json")).decode()
+    try:
+        await crud_async.complete_idempotency_key(db, clave=clave, codigo_estado=status_code, respuesta=respuesta)
+    except Exception as e:
+        # The record was created: answer normally, but replay nothing this worker alone would know
+        logger.error(f"Could not store the response of {IDEMPOTENCY_KEY_HEADER} {clave}, releasing it: {str(e)}")
+        await db.rollback()
+        try:
+            await crud_async.release_idempotency_key(db, clave=clave)
+        except Exception as e:
+            logger.error(f"Could not release {IDEMPOTENCY_KEY_HEADER} {clave}: {str(e)}")
+        return Response(content=respuesta, status_code=status_code, media_type="application/json")
+    idempotency_cache.set(clave, {
+        "Huella": huella,
+        "Estado": crud.IDEMPOTENCY_COMPLETADA,
+        "CodigoEstado": status_code,
+        "Respuesta": respuesta,
+        "FechaExpiracion": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    })
+    return Response(content=respuesta, status_code=status_code, media_type="application/json")
@@ -0,0 +1,174 @@
+"""
+Background jobs started with the application.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+import cache
+import crud
+import crud_async
+import versions
+from database import AsyncSessionLocal
+
+# Seconds between rollup catch-up runs (0 disables the job)
+ROLLUP_CATCHUP_SECONDS = float(os.getenv("ROLLUP_CATCHUP_SECONDS", "60"))
+ROLLUP_CATCHUP_LOOKBACK_HOURS = int(os.getenv("ROLLUP_CATCHUP_LOOKBACK_HOURS", "48"))
+# Seconds between purges of expired Idempotency-Keys (0 disables the job)
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600"))
+
+# Closed ordenes older than this many days are moved to the archive tables (0 disables the job)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+# Ordenes moved per transaction, keeping locks short
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+# Whether the rollup and ledger tables exist: None until checked (database unreachable)
+rollup_state = {"available": None}
+
+
+async def check_rollup_tables():
+    """
+    Check once that the rollup and ledger tables of BD1.sql exist. Without
+    them the catch-up job is disabled with a single warning; if the database
+    cannot be reached the check is repeated by the job.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            faltantes = await crud_async.get_missing_rollup_tables(db)
+    except Exception as e:
+        logger.warning(f"Could not check the rollup tables, retrying later: {str(e)}")
+        return
+    rollup_state["available"] = not faltantes
+    if faltantes:
+        logger.warning(f"Rollup catch-up disabled, tables not migrated (run BD1.sql): {', '.join(faltantes)}")
+
+
+async def rollup_catchup_loop():
+    """
+    Periodically add closed ordenes that missed the rollups to them
+    (closed via PUT /ordenes, or whose rollup update failed on close).
+    """
+    while True:
+        await asyncio.sleep(ROLLUP_CATCHUP_SECONDS)
+        if rollup_state["available"] is None:
+            await check_rollup_tables()
+        if rollup_state["available"] is False:
+            return
+        if rollup_state["available"] is None:
+            continue
+        try:
+            async with AsyncSessionLocal() as db:
+                aplicadas = await crud_async.catch_up_rollups(db, lookback_hours=ROLLUP_CATCHUP_LOOKBACK_HOURS)
+            if aplicadas:
+                logger.info(f"Rollup catch-up applied {aplicadas} ordenes")
+        except Exception as e:
+            logger.error(f"Rollup catch-up failed: {str(e)}")
+
+
+async def init_table_versions():
+    """
+    Load the shared table versions before serving requests. If VersionesTablas
+    is not available (database down, schema not migrated yet) versions stay
+    per process and table_versions_loop keeps retrying.
+    """
+    if versions.TABLE_VERSIONS_POLL_SECONDS <= 0:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await crud_async.ensure_table_versions(db)
+            versions.observe(await crud_async.get_table_versions(db))
+        versions.shared_state["enabled"] = True
+    except Exception as e:
+        logger.warning(f"Shared table versions disabled, VersionesTablas not available: {str(e)}")
+
+
+async def table_versions_loop():
+    """
+    Poll VersionesTablas and drop local caches when another worker changed a
+    shared table, so every process converges within the poll interval.
+    Until the shared versions could be loaded, each round retries that instead.
+    """
+    while True:
+        await asyncio.sleep(versions.TABLE_VERSIONS_POLL_SECONDS)
+        if not versions.shared_state["enabled"]:
+            await init_table_versions()
+            if versions.shared_state["enabled"]:
+                # Other workers may have changed the catalog while this one could not see it
+                cache.catalog_cache.clear()
+                logger.info("Shared table versions enabled")
+            continue
+        try:
+            async with AsyncSessionLocal() as db:
+                changed = versions.observe(await crud_async.get_table_versions(db))
+            if crud.CATALOG_TABLES.intersection(changed):
+                cache.catalog_cache.clear()
+        except Exception as e:
+            logger.error(f"Table versions poll failed: {str(e)}")
+
+
+async def idempotency_purge_loop():
+    """
+    Periodically delete expired Idempotency-Keys so the table stays small.
+    """
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                eliminadas = await crud_async.purge_idempotency_keys(db)
+            if eliminadas:
+                logger.info(f"Purged {eliminadas} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Idempotency key purge failed: {str(e)}")
+
+
+async def archive_loop():
+    """
+    Periodically move closed ordenes older than ARCHIVE_AFTER_DAYS to the
+    archive tables, one short transaction per batch.
+    """
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+        try:
+            antes_de = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+            archivadas = 0
+            async with AsyncSessionLocal() as db:
+                while True:
+                    movidas = await crud_async.archive_ordenes(db, antes_de=antes_de, batch_size=ARCHIVE_BATCH_SIZE)
+                    archivadas += movidas
+                    if movidas < ARCHIVE_BATCH_SIZE:
+                        break
+                    # Let requests run between batches
+                    await asyncio.sleep(0)
+            if archivadas:
+                logger.info(f"Archived {archivadas} ordenes closed before {antes_de:%Y-%m-%d}")
+        except Exception as e:
+            logger.error(f"Orden archival failed: {str(e)}")
+
+
+def start_background_jobs():
+    """
+    Start the enabled background jobs; returns their tasks so shutdown can cancel them.
+    """
+    tasks = []
+    if versions.TABLE_VERSIONS_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(table_versions_loop()))
+    if ROLLUP_CATCHUP_SECONDS > 0 and rollup_state["available"] is not False:
+        tasks.append(asyncio.create_task(rollup_catchup_loop()))
+    if IDEMPOTENCY_PURGE_SECONDS > 0:
+        tasks.append(asyncio.create_task(idempotency_purge_loop()))
+    if ARCHIVE_AFTER_DAYS > 0 and ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(archive_loop()))
+    return tasks
+
+
+async def stop_background_jobs(tasks):
+    """
+    Cancel the background jobs and wait for them to finish.
+    """
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,17 +1,33 @@
 """
 FastAPI main application for Restaurant Management System.
 """
+import time
+STARTED_AT = time.perf_counter()  # Before the imports below, for the startup report
+
+import asyncio
 import os
 import logging
 from datetime import datetime
+from typing import List
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy import text
 
-from database import engine, get_db
-from routes import categorias, meseros, mesas, menu_productos, ordenes, detalles_orden
+import cache
+import compression
+import idempotency
+import jobs
+import metrics
+import query_stats
+from database import Base, IS_SQLITE, async_engine, get_pool_status, read_async_engine
+from pagination import NEXT_CURSOR_HEADER
+from routes import categorias, meseros, mesas, menu_productos, ordenes, detalles_orden, eventos, reportes, cocina
 import schemas
+import warmup
+
+# Time spent importing the application, reported by the warm-up
+warmup.warmup_state["import_ms"] = round((time.perf_counter() - STARTED_AT) * 1000, 1)
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +46,9 @@ app = FastAPI(
     openapi_url="/openapi.json"
 )
 
+# Compress large responses (innermost, so the other middlewares see the final headers)
+app.add_middleware(compression.CompressionMiddleware)
+
 # Configure CORS
 origins = os.getenv("CORS_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -38,7 +57,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", idempotency.REPLAYED_HEADER, query_stats.QUERIES_HEADER, query_stats.TIME_HEADER],
 )
+app.add_middleware(query_stats.QueryStatsMiddleware)
+# Added last so it wraps CORS and sees every request
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 # Health check endpoint
@@ -49,8 +72,8 @@ async def health_check():
     """
     try:
         # Test database connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_status = "connected"
     except Exception as e:
         logger.error(f"Database health check failed: {str(e)}")
@@ -63,6 +86,49 @@ async def health_check():
     }
 
 
+# Readiness endpoint
+@app.get("/health/ready", response_model=schemas.ReadinessResponse, tags=["Health"])
+async def readiness_check():
+    """
+    Readiness probe: 503 until the startup warm-up (connections, mappers,
+    statements, OpenAPI) has finished, 200 afterwards, with the timing report.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if warmup.warmup_state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if warmup.warmup_state["ready"] else "warming", **warmup.warmup_state}
+    )
+
+
+# Connection pool status endpoint
+@app.get("/health/pool", response_model=schemas.PoolStatusResponse, tags=["Health"])
+async def pool_status():
+    """
+    Connection pool status: size, checked out connections and recycle counters.
+    """
+    return get_pool_status()
+
+
+# Cache statistics endpoint
+@app.get("/health/cache", response_model=List[schemas.CacheStatsResponse], tags=["Health"])
+async def cache_stats():
+    """
+    Size and hit/miss counters of the in-process caches.
+    """
+    return [c.stats() for c in cache.registry]
+
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Request, database pool and cache metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        metrics.render_metrics(get_pool_status(), [c.stats() for c in cache.registry]),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -100,6 +166,12 @@ app.include_router(mesas.router, prefix="/api/v1")
 app.include_router(menu_productos.router, prefix="/api/v1")
 app.include_router(ordenes.router, prefix="/api/v1")
 app.include_router(detalles_orden.router, prefix="/api/v1")
+app.include_router(eventos.router, prefix="/api/v1")
+app.include_router(reportes.router, prefix="/api/v1")
+app.include_router(cocina.router, prefix="/api/v1")
+
+# Background tasks started on startup
+background_tasks = []
 
 
 # Startup event
@@ -111,6 +183,20 @@ async def startup_event():
     logger.info("Starting Restaurant Management API...")
     logger.info(f"Database server: {os.getenv('DB_SERVER', 'Not configured')}")
     logger.info(f"Database name: {os.getenv('DB_NAME', 'Not configured')}")
+    logger.info(f"Read replica: {'configured' if read_async_engine is not None else 'not configured'}")
+
+    # Local SQLite stand-in: create the schema from the models
+    if IS_SQLITE:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        logger.info("SQLite schema created from models")
+
+    await jobs.init_table_versions()
+    if jobs.ROLLUP_CATCHUP_SECONDS > 0:
+        await jobs.check_rollup_tables()
+    background_tasks.extend(jobs.start_background_jobs())
+    # Warm up in the background so /health and /health/ready answer meanwhile
+    background_tasks.append(asyncio.create_task(warmup.run_warmup(app)))
 
 
 # Shutdown event
@@ -120,6 +206,10 @@ async def shutdown_event():
     Runs on application shutdown.
     """
     logger.info("Shutting down Restaurant Management API...")
+    await jobs.stop_background_jobs(background_tasks)
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
 
 
 if __name__ == "__main__":
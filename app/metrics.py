@@ -0,0 +1,200 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+MetricsMiddleware records, per route template (e.g. /api/v1/ordenes/{orden_id}),
+request counts by status, a latency histogram and an in-flight gauge. The
+database layer records pool checkout times and statement counts here, and
+render_metrics() adds pool and cache gauges at scrape time.
+
+Requests are handled on a single event loop thread, so the hot path only
+increments plain ints and lists without locks; a rare lost increment from
+a thread (e.g. a sync startup task) is acceptable for monitoring counters.
+"""
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from starlette.routing import Match
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Latency buckets in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Label for requests that match no route, so arbitrary paths cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket counts are made cumulative when rendered."""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# (method, route, status) -> count
+requests_total = defaultdict(int)
+# (method, route) -> Histogram
+request_duration = {}
+# (method, route) -> requests being processed
+requests_in_flight = defaultdict(int)
+
+pool_checkout_duration = Histogram(POOL_CHECKOUT_BUCKETS)
+db_counters = {
+    "statements": 0,
+    "errors": 0,
+}
+
+
+def observe_pool_checkout(seconds: float):
+    """Record how long a pool checkout waited for a connection."""
+    pool_checkout_duration.observe(seconds)
+
+
+def count_statement():
+    """Count a statement sent to the database."""
+    db_counters["statements"] += 1
+
+
+def count_statement_error():
+    """Count a statement that raised a database error."""
+    db_counters["errors"] += 1
+
+
+def resolve_route(app, scope):
+    """Return the path template of the route that will handle the request."""
+    partial = None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records count, latency and in-flight requests
+    per method and route template. Streaming responses (SSE) are timed until
+    the stream ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        key = (method, resolve_route(scope["app"], scope))
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        requests_in_flight[key] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight[key] -= 1
+            histogram = request_duration.get(key)
+            if histogram is None:
+                histogram = request_duration[key] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(elapsed)
+            requests_total[(method, key[1], status_code[0])] += 1
+
+
+def format_labels(**labels):
+    """Render a Prometheus label set, escaping backslashes, quotes and newlines."""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_histogram(lines, name, histogram, **labels):
+    """Append the _bucket/_sum/_count series of a histogram."""
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{format_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{format_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{format_labels(**labels) if labels else ''} {histogram.sum}")
+    lines.append(f"{name}_count{format_labels(**labels) if labels else ''} {histogram.count}")
+
+
+def render_metrics(pool_status: dict, cache_stats: list) -> str:
+    """Render all metrics in the Prometheus text format (version 0.0.4)."""
+    lines = []
+
+    lines.append("# HELP http_requests_total HTTP requests by method, route template and status.")
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route, status_code), count in list(requests_total.items()):
+        lines.append(f"http_requests_total{format_labels(method=method, route=route, status=status_code)} {count}")
+
+    lines.append("# HELP http_request_duration_seconds HTTP request latency by method and route template.")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    for (method, route), histogram in list(request_duration.items()):
+        render_histogram(lines, "http_request_duration_seconds", histogram, method=method, route=route)
+
+    lines.append("# HELP http_requests_in_flight HTTP requests being processed by method and route template.")
+    lines.append("# TYPE http_requests_in_flight gauge")
+    for (method, route), count in list(requests_in_flight.items()):
+        lines.append(f"http_requests_in_flight{format_labels(method=method, route=route)} {count}")
+
+    lines.append("# HELP db_pool_checkout_seconds Time spent waiting for a pooled database connection.")
+    lines.append("# TYPE db_pool_checkout_seconds histogram")
+    render_histogram(lines, "db_pool_checkout_seconds", pool_checkout_duration)
+
+    pool_gauges = ("size", "checked_in", "checked_out", "overflow")
+    pool_counters = ("connections_opened", "idle_discarded", "invalidated")
+    for name in pool_gauges:
+        if name in pool_status:
+            lines.append(f"# TYPE db_pool_{name} gauge")
+            lines.append(f"db_pool_{name} {pool_status[name]}")
+    for name in pool_counters:
+        lines.append(f"# TYPE db_pool_{name}_total counter")
+        lines.append(f"db_pool_{name}_total {pool_status[name]}")
+
+    lines.append("# HELP db_statements_total SQL statements sent to the database.")
+    lines.append("# TYPE db_statements_total counter")
+    lines.append(f"db_statements_total {db_counters['statements']}")
+    lines.append("# HELP db_statement_errors_total SQL statements that raised a database error.")
+    lines.append("# TYPE db_statement_errors_total counter")
+    lines.append(f"db_statement_errors_total {db_counters['errors']}")
+
+    lines.append("# HELP cache_hits_total In-process cache hits.")
+    lines.append("# TYPE cache_hits_total counter")
+    for stats in cache_stats:
+        lines.append(f"cache_hits_total{format_labels(cache=stats['name'])} {stats['hits']}")
+    lines.append("# HELP cache_misses_total In-process cache misses.")
+    lines.append("# TYPE cache_misses_total counter")
+    for stats in cache_stats:
+        lines.append(f"cache_misses_total{format_labels(cache=stats['name'])} {stats['misses']}")
+    lines.append("# HELP cache_hit_ratio In-process cache hit ratio since startup.")
+    lines.append("# TYPE cache_hit_ratio gauge")
+    for stats in cache_stats:
+        lines.append(f"cache_hit_ratio{format_labels(cache=stats['name'])} {stats['hit_ratio']}")
+    lines.append("# TYPE cache_entries gauge")
+    for stats in cache_stats:
+        lines.append(f"cache_entries{format_labels(cache=stats['name'])} {stats['size']}")
+
+    return "\n".join(lines) + "\n"
@@ -2,7 +2,7 @@
 SQLAlchemy models for restaurant database.
 Maps to the 'restaurante' schema in Azure SQL Server.
 """
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Date, Boolean, ForeignKey, CheckConstraint, text
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DECIMAL, DateTime, Date, Boolean, ForeignKey, CheckConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -76,7 +76,10 @@ class MenuProducto(Base):
 class Orden(Base):
     """Model for Ordenes table."""
     __tablename__ = "Ordenes"
-    __table_args__ = {'schema': 'restaurante'}
+    __table_args__ = (
+        Index('IX_Ordenes_Estado_FechaCierre', 'Estado', 'FechaCierre'),
+        {'schema': 'restaurante'}
+    )
 
     OrdenId = Column(Integer, primary_key=True, index=True, autoincrement=True)
     MesaId = Column(Integer, ForeignKey('restaurante.Mesas.MesaId'), nullable=False, index=True)
@@ -99,6 +102,7 @@ class DetalleOrden(Base):
     __table_args__ = (
         CheckConstraint('Cantidad > 0', name='CK_DetallesOrden_Cantidad'),
         CheckConstraint('PrecioUnitario >= 0', name='CK_DetallesOrden_PrecioUnitario'),
+        Index('IX_DetallesOrden_Estado_Orden', 'Estado', 'OrdenId', mssql_include=['ProductoId', 'Cantidad']),
         {'schema': 'restaurante'}
     )
 
@@ -114,3 +118,108 @@ class DetalleOrden(Base):
     # Relationships
     orden = relationship("Orden", back_populates="detalles")
     producto = relationship("MenuProducto", back_populates="detalles_orden")
+
+
+class OrdenArchivo(Base):
+    """
+    Closed orden moved out of Ordenes by the archival job (read-only history).
+    Keeps the foreign keys of Ordenes, so parents with archived ordenes cannot be deleted.
+    """
+    __tablename__ = "OrdenesArchivo"
+    __table_args__ = {'schema': 'restaurante'}
+
+    OrdenId = Column(Integer, primary_key=True, autoincrement=False)
+    MesaId = Column(Integer, ForeignKey('restaurante.Mesas.MesaId'), nullable=False)
+    MeseroId = Column(Integer, ForeignKey('restaurante.Meseros.MeseroId'), nullable=False)
+    FechaCreacion = Column(DateTime, nullable=False)
+    FechaCierre = Column(DateTime, nullable=True)
+    Total = Column(DECIMAL(12, 2), nullable=True)
+    Estado = Column(String(30), nullable=False)
+    Comentarios = Column(String(500), nullable=True)
+    FechaArchivo = Column(DateTime, nullable=False, server_default=text('SYSUTCDATETIME()'))
+
+
+class DetalleOrdenArchivo(Base):
+    """Detalle of an archived orden."""
+    __tablename__ = "DetallesOrdenArchivo"
+    __table_args__ = {'schema': 'restaurante'}
+
+    DetalleId = Column(Integer, primary_key=True, autoincrement=False)
+    OrdenId = Column(Integer, ForeignKey('restaurante.OrdenesArchivo.OrdenId', ondelete='CASCADE'), nullable=False, index=True)
+    ProductoId = Column(Integer, ForeignKey('restaurante.MenuProductos.ProductoId'), nullable=False)
+    Cantidad = Column(Integer, nullable=False)
+    PrecioUnitario = Column(DECIMAL(10, 2), nullable=False)
+    Subtotal = Column(DECIMAL(12, 2), nullable=True)
+    Estado = Column(String(30), nullable=False)
+
+
+class VentasPorHora(Base):
+    """Rollup of closed ordenes by closing hour (UTC)."""
+    __tablename__ = "VentasPorHora"
+    __table_args__ = {'schema': 'restaurante'}
+
+    Hora = Column(DateTime, primary_key=True)
+    Ordenes = Column(Integer, nullable=False, server_default='0')
+    Ingresos = Column(DECIMAL(14, 2), nullable=False, server_default='0')
+    Articulos = Column(Integer, nullable=False, server_default='0')
+    SegundosOcupacion = Column(BigInteger, nullable=False, server_default='0')
+
+
+class VentasPorProductoDia(Base):
+    """Rollup of sold items by closing day and producto."""
+    __tablename__ = "VentasPorProductoDia"
+    __table_args__ = {'schema': 'restaurante'}
+
+    Fecha = Column(Date, primary_key=True)
+    ProductoId = Column(Integer, ForeignKey('restaurante.MenuProductos.ProductoId'), primary_key=True)
+    Cantidad = Column(Integer, nullable=False, server_default='0')
+    Ingresos = Column(DECIMAL(14, 2), nullable=False, server_default='0')
+
+
+class VentasPorMeseroDia(Base):
+    """Rollup of closed ordenes by closing day and mesero."""
+    __tablename__ = "VentasPorMeseroDia"
+    __table_args__ = {'schema': 'restaurante'}
+
+    Fecha = Column(Date, primary_key=True)
+    MeseroId = Column(Integer, ForeignKey('restaurante.Meseros.MeseroId'), primary_key=True)
+    Ordenes = Column(Integer, nullable=False, server_default='0')
+    Ingresos = Column(DECIMAL(14, 2), nullable=False, server_default='0')
+    Articulos = Column(Integer, nullable=False, server_default='0')
+    SegundosOcupacion = Column(BigInteger, nullable=False, server_default='0')
+
+
+class RollupOrdenAplicada(Base):
+    """Ledger of ordenes already added to the sales rollups (each one is applied once)."""
+    __tablename__ = "RollupOrdenesAplicadas"
+    __table_args__ = {'schema': 'restaurante'}
+
+    OrdenId = Column(Integer, primary_key=True, autoincrement=False)
+    FechaAplicacion = Column(DateTime, nullable=False, server_default=text('SYSUTCDATETIME()'))
+
+
+class VersionTabla(Base):
+    """Shared version of a cached table, bumped by every write so all workers can invalidate."""
+    __tablename__ = "VersionesTablas"
+    __table_args__ = {'schema': 'restaurante'}
+
+    Tabla = Column(String(50), primary_key=True)
+    Version = Column(BigInteger, nullable=False, server_default='0')
+    FechaCambio = Column(DateTime, nullable=False, server_default=text('SYSUTCDATETIME()'))
+
+
+class ClaveIdempotencia(Base):
+    """Idempotency-Key of a POST request and the response it produced, replayed on retries."""
+    __tablename__ = "ClavesIdempotencia"
+    __table_args__ = (
+        Index('IX_ClavesIdempotencia_FechaExpiracion', 'FechaExpiracion'),
+        {'schema': 'restaurante'}
+    )
+
+    Clave = Column(String(100), primary_key=True)
+    Huella = Column(String(64), nullable=False)
+    Estado = Column(String(20), nullable=False)
+    CodigoEstado = Column(Integer, nullable=True)
+    Respuesta = Column(Text, nullable=True)
+    FechaCreacion = Column(DateTime, nullable=False, server_default=text('SYSUTCDATETIME()'))
+    FechaExpiracion = Column(DateTime, nullable=False)
@@ -0,0 +1,59 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints.
+
+A cursor is an opaque, URL-safe token that encodes the primary key of the
+last row of a page. The next page is read with `WHERE pk > :last_id`, which
+uses the clustered index and costs the same on page 1 and page 10,000,
+unlike OFFSET that has to scan and discard every skipped row.
+"""
+import base64
+import binascii
+import json
+from typing import Optional
+from fastapi import HTTPException, Query, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last primary key of a page as an opaque cursor."""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["id"])
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError("Cursor de paginación inválido")
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="Cursor de paginación (header X-Next-Cursor de la página anterior)")
+) -> Optional[int]:
+    """
+    Dependency that decodes the `cursor` query parameter into the last seen primary key.
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def set_next_cursor(response: Response, items: list, limit: int, key: str):
+    """
+    Add the X-Next-Cursor header when the page is full, i.e. more rows may follow.
+    Items may be ORM objects or plain row dicts.
+    """
+    if items and len(items) >= limit:
+        last = items[-1]
+        last_id = last[key] if isinstance(last, dict) else getattr(last, key)
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_id)
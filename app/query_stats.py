@@ -0,0 +1,131 @@
+"""
+Per-request SQL statistics and N+1 detection.
+
+QueryStatsMiddleware opens a RequestQueryStats for every HTTP request in a
+context variable. The engine cursor events in database.py add each statement
+and its duration to it (context variables follow the request into the
+run_sync greenlets). With DEBUG=true the totals are returned in the
+X-DB-Queries and X-DB-Time-ms headers, and a warning is logged whenever one
+request runs the same statement shape more than DB_REPEATED_QUERY_THRESHOLD
+times, the usual sign of an N+1 query pattern. Reads that repeat one
+statement on purpose (keyset chunks of a stream, IN lists split in chunks)
+run inside chunked_reads() and are left out of that check.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# More executions than this of one statement shape in a request are reported (0 disables)
+DB_REPEATED_QUERY_THRESHOLD = int(os.getenv("DB_REPEATED_QUERY_THRESHOLD", "5"))
+
+QUERIES_HEADER = "X-DB-Queries"
+TIME_HEADER = "X-DB-Time-ms"
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists: "(?, ?, ?)" -> "(?)", so lists of any length share a shape
+IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+current_stats = contextvars.ContextVar("request_query_stats", default=None)
+# Set while running deliberately repeated statements, which are not N+1 patterns
+in_chunked_read = contextvars.ContextVar("in_chunked_read", default=False)
+
+
+class RequestQueryStats:
+    """Statements run by one request: count, total time and count per statement shape."""
+    __slots__ = ("queries", "seconds", "shapes")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float, repeatable: bool = False):
+        self.queries += 1
+        self.seconds += seconds
+        if not repeatable:
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int):
+        """Statement shapes executed more than threshold times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so executions differing only in IN list length match."""
+    return IN_LIST_PATTERN.sub("(?)", statement)
+
+
+@contextmanager
+def chunked_reads():
+    """Count the statements run inside the block, but exempt them from N+1 detection."""
+    token = in_chunked_read.set(True)
+    try:
+        yield
+    finally:
+        in_chunked_read.reset(token)
+
+
+def before_execute(conn):
+    """Remember when the statement started (called from before_cursor_execute)."""
+    if current_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def after_execute(conn, statement: str):
+    """Add the finished statement to the request stats (called from after_cursor_execute)."""
+    stats = current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started_at")
+    if started:
+        stats.record(statement, time.perf_counter() - started.pop(), in_chunked_read.get())
+
+
+def failed_execute(conn):
+    """Drop the start time of a statement that raised (called from handle_error)."""
+    started = conn.info.get("query_started_at") if conn is not None else None
+    if started:
+        started.pop()
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware that collects the SQL statistics of each request,
+    adds them as response headers in debug mode and warns about N+1 patterns.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if DEBUG and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERIES_HEADER.lower().encode(), str(stats.queries).encode()))
+                headers.append((TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_stats.reset(token)
+            if DB_REPEATED_QUERY_THRESHOLD > 0:
+                for shape, count in stats.repeated_shapes(DB_REPEATED_QUERY_THRESHOLD):
+                    logger.warning(
+                        "Possible N+1: %s %s ran the same statement %d times: %s",
+                        scope["method"], scope["path"], count, " ".join(shape.split())[:300]
+                    )
@@ -1,77 +1,129 @@
 """
 Routes for Categorias endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
+import http_cache
 import schemas
-from database import get_db
+import serialization
+from database import get_async_db
+from pagination import get_cursor, set_next_cursor
 
 router = APIRouter(prefix="/categorias", tags=["Categorias"])
 
 
 @router.get("/", response_model=List[schemas.CategoriaResponse])
-def get_categorias(
+async def get_categorias(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all categorias with pagination.
+    Pass the X-Next-Cursor response header as `cursor` to read the next page (keyset).
     """
-    categorias = crud.get_categorias(db, skip=skip, limit=limit)
+    etag = http_cache.make_etag(request, "Categorias")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    categorias = await crud_async.get_categorias_cached(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, categorias, limit, "CategoriaId")
+    http_cache.set_cache_headers(request, response, etag, "Categorias")
     return categorias
 
 
 @router.get("/{categoria_id}", response_model=schemas.CategoriaResponse)
-def get_categoria(
+async def get_categoria(
+    request: Request,
+    response: Response,
     categoria_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific categoria by ID.
     """
-    categoria = crud.get_categoria(db, categoria_id=categoria_id)
+    etag = http_cache.make_etag(request, "Categorias")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    categoria = await crud_async.get_categoria_cached(db, categoria_id=categoria_id)
     if categoria is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Categoría con ID {categoria_id} no encontrada"
         )
+    http_cache.set_cache_headers(request, response, etag, "Categorias")
     return categoria
 
 
 @router.post("/", response_model=schemas.CategoriaResponse, status_code=status.HTTP_201_CREATED)
-def create_categoria(
+async def create_categoria(
     categoria: schemas.CategoriaCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new categoria.
     """
     try:
-        return crud.create_categoria(db=db, categoria=categoria)
+        return await crud_async.create_categoria(db=db, categoria=categoria)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una categoría con ese nombre"
         )
 
 
+@router.post(
+    "/bulk",
+    response_model=schemas.CatalogoBulkResponse,
+    openapi_extra=serialization.bulk_request_body(schemas.CategoriaBulkItem)
+)
+async def bulk_upsert_categorias(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create or update categorias in bulk from a JSON array or a CSV file (Content-Type: text/csv).
+    Rows are matched by Nombre; valid rows are applied in one transaction and
+    every row gets its own result.
+    """
+    try:
+        filas = serialization.parse_bulk_rows(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    validas, resultados = serialization.validate_bulk_rows(filas, schemas.CategoriaBulkItem)
+    if validas:
+        try:
+            resultados += await crud_async.upsert_categorias(db, filas=validas)
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al importar categorías: {str(e.orig)}"
+            )
+    return serialization.bulk_response(resultados)
+
+
 @router.put("/{categoria_id}", response_model=schemas.CategoriaResponse)
-def update_categoria(
+async def update_categoria(
     categoria_id: int,
     categoria: schemas.CategoriaUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing categoria.
     """
     try:
-        db_categoria = crud.update_categoria(db, categoria_id=categoria_id, categoria=categoria)
+        db_categoria = await crud_async.update_categoria(db, categoria_id=categoria_id, categoria=categoria)
         if db_categoria is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -79,7 +131,7 @@ def update_categoria(
             )
         return db_categoria
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una categoría con ese nombre"
@@ -87,15 +139,15 @@ def update_categoria(
 
 
 @router.delete("/{categoria_id}", response_model=schemas.MessageResponse)
-def delete_categoria(
+async def delete_categoria(
     categoria_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a categoria.
     """
     try:
-        categoria = crud.delete_categoria(db, categoria_id=categoria_id)
+        categoria = await crud_async.delete_categoria(db, categoria_id=categoria_id)
         if categoria is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -103,7 +155,7 @@ def delete_categoria(
             )
         return {"message": f"Categoría {categoria.Nombre} eliminada exitosamente"}
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se puede eliminar la categoría porque tiene productos asociados"
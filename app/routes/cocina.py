@@ -0,0 +1,70 @@
+"""
+Routes for the kitchen display queue.
+"""
+import os
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import crud_async
+import schemas
+from database import get_async_db
+
+router = APIRouter(prefix="/cocina", tags=["Cocina"])
+
+# Categoria -> station routing, e.g. "Bebidas=barra;Postres=postres" (names ignore case)
+KITCHEN_STATIONS = {
+    categoria.strip().casefold(): estacion.strip()
+    for categoria, _, estacion in (
+        item.partition("=") for item in os.getenv("KITCHEN_STATIONS", "Bebidas=barra").split(";") if "=" in item
+    )
+}
+# Station for categorias without a mapping
+KITCHEN_DEFAULT_STATION = os.getenv("KITCHEN_DEFAULT_STATION", "cocina")
+# Upper bound when loading every categoria to resolve a station
+CATEGORIAS_MAX = 10000
+
+
+def station_for(categoria: Optional[str]) -> str:
+    """Return the station that prepares productos of the given categoria."""
+    if categoria is None:
+        return KITCHEN_DEFAULT_STATION
+    return KITCHEN_STATIONS.get(categoria.casefold(), KITCHEN_DEFAULT_STATION)
+
+
+@router.get("/cola", response_model=List[schemas.CocinaEstacionResponse])
+async def get_cola_cocina(
+    estacion: Optional[str] = Query(None, description="Solo esta estación (p. ej. cocina, barra)"),
+    estado: Optional[str] = Query(None, description="Solo detalles en este estado (default: Pendiente y En preparación)"),
+    limit: int = Query(500, ge=1, le=2000, description="Máximo de detalles"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the pending detalles of all open ordenes grouped by station, oldest orden first.
+    Reads the primary database so bumped items disappear from the screens immediately.
+    """
+    estados = (estado,) if estado else crud.COCINA_ESTADOS_PENDIENTES
+    filtro = {}
+    if estacion is not None:
+        # Resolve the station to its categorias so the limit applies to that station only
+        categorias = await crud_async.get_categorias_cached(db, limit=CATEGORIAS_MAX)
+        propias = [c.CategoriaId for c in categorias if station_for(c.Nombre).casefold() == estacion.casefold()]
+        if estacion.casefold() == KITCHEN_DEFAULT_STATION.casefold():
+            filtro["excluir_categoria_ids"] = [c.CategoriaId for c in categorias if c.CategoriaId not in propias]
+        else:
+            filtro["categoria_ids"] = propias
+    detalles = await crud_async.get_cola_cocina(db, estados=estados, limit=limit, **filtro)
+
+    ahora = datetime.utcnow()
+    estaciones = {}
+    for detalle in detalles:
+        nombre = station_for(detalle["Categoria"])
+        detalle["MinutosEspera"] = round((ahora - detalle["FechaCreacion"]).total_seconds() / 60, 1)
+        estaciones.setdefault(nombre, []).append(detalle)
+
+    return [
+        {"Estacion": nombre, "Pendientes": len(items), "Detalles": items}
+        for nombre, items in estaciones.items()
+    ]
@@ -1,47 +1,48 @@
 """
 Routes for DetallesOrden endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
+import idempotency
 import schemas
-from database import get_db
+from database import get_async_db, get_read_db
 
 router = APIRouter(prefix="/detalles-orden", tags=["Detalles Orden"])
 
 
 @router.get("/orden/{orden_id}", response_model=List[schemas.DetalleOrdenResponse])
-def get_detalles_by_orden(
+async def get_detalles_by_orden(
     orden_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all detalles for a specific orden.
     """
     # Validate orden exists
-    orden = crud.get_orden(db, orden_id)
+    orden = await crud_async.get_orden(db, orden_id)
     if orden is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Orden con ID {orden_id} no encontrada"
         )
 
-    detalles = crud.get_detalles_orden(db, orden_id=orden_id)
+    detalles = await crud_async.get_detalles_orden(db, orden_id=orden_id)
     return detalles
 
 
 @router.get("/{detalle_id}", response_model=schemas.DetalleOrdenResponse)
-def get_detalle_orden(
+async def get_detalle_orden(
     detalle_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific detalle orden by ID.
     """
-    detalle = crud.get_detalle_orden(db, detalle_id=detalle_id)
+    detalle = await crud_async.get_detalle_orden(db, detalle_id=detalle_id)
     if detalle is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,42 +52,68 @@ def get_detalle_orden(
 
 
 @router.post("/", response_model=schemas.DetalleOrdenResponse, status_code=status.HTTP_201_CREATED)
-def create_detalle_orden(
+async def create_detalle_orden(
     detalle: schemas.DetalleOrdenCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=idempotency.IDEMPOTENCY_KEY_HEADER, max_length=100, description="Clave única para reintentos seguros"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new detalle orden.
     Validates that orden exists and product is active.
     Updates orden total automatically.
+    With an Idempotency-Key header, retries return the first response instead of creating duplicates.
     """
-    try:
-        return crud.create_detalle_orden(db=db, detalle=detalle)
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error al crear detalle: {str(e)}"
-        )
+    async def crear():
+        try:
+            return await crud_async.create_detalle_orden(db=db, detalle=detalle)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al crear detalle: {str(e)}"
+            )
+
+    return await idempotency.run(db, idempotency_key, request, detalle, schemas.DetalleOrdenResponse, status.HTTP_201_CREATED, crear)
+
+
+@router.post("/estado", response_model=schemas.DetallesEstadoResponse)
+async def update_detalles_estado(
+    cambio: schemas.DetallesEstadoUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Move a list of detalles, or all detalles of an orden, to a new Estado
+    (e.g. bump a whole ticket to Servido) with a single conditional UPDATE.
+    Returns only the detalles that changed.
+    """
+    detalles = await crud_async.update_detalles_estado(
+        db,
+        estado=cambio.Estado,
+        detalle_ids=cambio.DetalleIds,
+        orden_id=cambio.OrdenId,
+        estado_actual=cambio.EstadoActual
+    )
+    return {"Actualizados": len(detalles), "Detalles": detalles}
 
 
 @router.put("/{detalle_id}", response_model=schemas.DetalleOrdenResponse)
-def update_detalle_orden(
+async def update_detalle_orden(
     detalle_id: int,
     detalle: schemas.DetalleOrdenUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing detalle orden.
     Recalculates subtotal and updates orden total automatically.
     """
     try:
-        db_detalle = crud.update_detalle_orden(db, detalle_id=detalle_id, detalle=detalle)
+        db_detalle = await crud_async.update_detalle_orden(db, detalle_id=detalle_id, detalle=detalle)
         if db_detalle is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -94,7 +121,7 @@ def update_detalle_orden(
             )
         return db_detalle
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al actualizar detalle: {str(e)}"
@@ -102,15 +129,15 @@ def update_detalle_orden(
 
 
 @router.delete("/{detalle_id}", response_model=schemas.MessageResponse)
-def delete_detalle_orden(
+async def delete_detalle_orden(
     detalle_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a detalle orden.
     Updates orden total automatically.
     """
-    detalle = crud.delete_detalle_orden(db, detalle_id=detalle_id)
+    detalle = await crud_async.delete_detalle_orden(db, detalle_id=detalle_id)
     if detalle is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,49 @@
+"""
+Routes for change event streaming (Server-Sent Events).
+"""
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+import events
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"])
+
+
+@router.get("/stream")
+async def stream_eventos(
+    request: Request,
+    tipos: Optional[str] = Query(None, description="Tipos separados por coma: mesa, orden, detalle u otro específico como orden.cerrada"),
+    last_event_id: Optional[str] = Query(None, description="Reanudar después de este ID de evento"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream mesa, orden and detalle changes as Server-Sent Events.
+    Replaces polling of /mesas and /ordenes. Reconnecting clients resume from
+    the Last-Event-ID header (sent automatically by EventSource); a "reset"
+    event means the missed changes are gone and the client must reload state.
+    """
+    filtro = {tipo.strip() for tipo in tipos.split(",") if tipo.strip()} if tipos else None
+    subscriber = events.broker.subscribe(filtro, last_event_id_header or last_event_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=events.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.format_sse(event)
+        finally:
+            events.broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
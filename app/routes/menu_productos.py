@@ -2,79 +2,133 @@
 Routes for MenuProductos endpoints.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
+import http_cache
 import schemas
-from database import get_db
+import serialization
+from database import get_async_db
+from pagination import get_cursor, set_next_cursor
 
 router = APIRouter(prefix="/menu-productos", tags=["Menu Productos"])
 
 
 @router.get("/", response_model=List[schemas.MenuProductoResponse])
-def get_menu_productos(
+async def get_menu_productos(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     categoria_id: Optional[int] = Query(None, description="Filtrar por categoría"),
     activo: Optional[bool] = Query(None, description="Filtrar por estado activo/inactivo"),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all menu productos with pagination and optional filters.
+    Pass the X-Next-Cursor response header as `cursor` to read the next page (keyset).
     """
-    productos = crud.get_menu_productos(db, skip=skip, limit=limit, categoria_id=categoria_id, activo=activo)
+    etag = http_cache.make_etag(request, "MenuProductos")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    productos = await crud_async.get_menu_productos_cached(db, skip=skip, limit=limit, categoria_id=categoria_id, activo=activo, after_id=after_id)
+    set_next_cursor(response, productos, limit, "ProductoId")
+    http_cache.set_cache_headers(request, response, etag, "MenuProductos")
     return productos
 
 
 @router.get("/{producto_id}", response_model=schemas.MenuProductoResponse)
-def get_menu_producto(
+async def get_menu_producto(
+    request: Request,
+    response: Response,
     producto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific menu producto by ID.
     """
-    producto = crud.get_menu_producto(db, producto_id=producto_id)
+    etag = http_cache.make_etag(request, "MenuProductos")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    producto = await crud_async.get_menu_producto_cached(db, producto_id=producto_id)
     if producto is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Producto con ID {producto_id} no encontrado"
         )
+    http_cache.set_cache_headers(request, response, etag, "MenuProductos")
     return producto
 
 
 @router.post("/", response_model=schemas.MenuProductoResponse, status_code=status.HTTP_201_CREATED)
-def create_menu_producto(
+async def create_menu_producto(
     producto: schemas.MenuProductoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new menu producto.
     """
     try:
         # Validate that categoria exists
-        categoria = crud.get_categoria(db, producto.CategoriaId)
+        categoria = await crud_async.get_categoria_cached(db, producto.CategoriaId)
         if categoria is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Categoría con ID {producto.CategoriaId} no existe"
             )
-        return crud.create_menu_producto(db=db, producto=producto)
+        return await crud_async.create_menu_producto(db=db, producto=producto)
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al crear producto: {str(e)}"
         )
 
 
+@router.post(
+    "/bulk",
+    response_model=schemas.CatalogoBulkResponse,
+    openapi_extra=serialization.bulk_request_body(schemas.MenuProductoBulkItem)
+)
+async def bulk_upsert_menu_productos(
+    request: Request,
+    crear_categorias: bool = Query(False, description="Crear las categorías indicadas por nombre que no existan"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create or update menu productos in bulk from a JSON array or a CSV file (Content-Type: text/csv).
+    Rows with ProductoId update that producto; the rest are matched by Nombre.
+    Categorias can be given by ID or by name (CategoriaNombre). Valid rows are
+    applied in one transaction and every row gets its own result.
+    """
+    try:
+        filas = serialization.parse_bulk_rows(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    validas, resultados = serialization.validate_bulk_rows(filas, schemas.MenuProductoBulkItem)
+    if validas:
+        try:
+            resultados += await crud_async.upsert_menu_productos(db, filas=validas, crear_categorias=crear_categorias)
+        except IntegrityError as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al importar productos: {str(e.orig)}"
+            )
+    return serialization.bulk_response(resultados)
+
+
 @router.put("/{producto_id}", response_model=schemas.MenuProductoResponse)
-def update_menu_producto(
+async def update_menu_producto(
     producto_id: int,
     producto: schemas.MenuProductoUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing menu producto.
@@ -82,14 +136,14 @@ def update_menu_producto(
     try:
         # Validate categoria if provided
         if producto.CategoriaId is not None:
-            categoria = crud.get_categoria(db, producto.CategoriaId)
+            categoria = await crud_async.get_categoria_cached(db, producto.CategoriaId)
             if categoria is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Categoría con ID {producto.CategoriaId} no existe"
                 )
 
-        db_producto = crud.update_menu_producto(db, producto_id=producto_id, producto=producto)
+        db_producto = await crud_async.update_menu_producto(db, producto_id=producto_id, producto=producto)
         if db_producto is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -97,7 +151,7 @@ def update_menu_producto(
             )
         return db_producto
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al actualizar producto: {str(e)}"
@@ -105,15 +159,15 @@ def update_menu_producto(
 
 
 @router.delete("/{producto_id}", response_model=schemas.MessageResponse)
-def delete_menu_producto(
+async def delete_menu_producto(
     producto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a menu producto.
     """
     try:
-        producto = crud.delete_menu_producto(db, producto_id=producto_id)
+        producto = await crud_async.delete_menu_producto(db, producto_id=producto_id)
         if producto is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -121,7 +175,7 @@ def delete_menu_producto(
             )
         return {"message": f"Producto {producto.Nombre} eliminado exitosamente"}
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se puede eliminar el producto porque está en detalles de órdenes"
@@ -2,60 +2,79 @@
 Routes for Mesas endpoints.
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
+import http_cache
 import schemas
-from database import get_db
+from database import get_async_db
+from pagination import get_cursor, set_next_cursor
 
 router = APIRouter(prefix="/mesas", tags=["Mesas"])
 
 
 @router.get("/", response_model=List[schemas.MesaResponse])
-def get_mesas(
+async def get_mesas(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     estado: Optional[str] = Query(None, description="Filtrar por estado: Libre, Ocupada, Reservada"),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all mesas with pagination and optional estado filter.
+    Pass the X-Next-Cursor response header as `cursor` to read the next page (keyset).
     """
-    mesas = crud.get_mesas(db, skip=skip, limit=limit, estado=estado)
+    etag = http_cache.make_etag(request, "Mesas")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    mesas = await crud_async.get_mesas(db, skip=skip, limit=limit, estado=estado, after_id=after_id)
+    set_next_cursor(response, mesas, limit, "MesaId")
+    http_cache.set_cache_headers(request, response, etag, "Mesas")
     return mesas
 
 
 @router.get("/{mesa_id}", response_model=schemas.MesaResponse)
-def get_mesa(
+async def get_mesa(
+    request: Request,
+    response: Response,
     mesa_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific mesa by ID.
     """
-    mesa = crud.get_mesa(db, mesa_id=mesa_id)
+    etag = http_cache.make_etag(request, "Mesas")
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag)
+
+    mesa = await crud_async.get_mesa(db, mesa_id=mesa_id)
     if mesa is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Mesa con ID {mesa_id} no encontrada"
         )
+    http_cache.set_cache_headers(request, response, etag, "Mesas")
     return mesa
 
 
 @router.post("/", response_model=schemas.MesaResponse, status_code=status.HTTP_201_CREATED)
-def create_mesa(
+async def create_mesa(
     mesa: schemas.MesaCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new mesa.
     """
     try:
-        return crud.create_mesa(db=db, mesa=mesa)
+        return await crud_async.create_mesa(db=db, mesa=mesa)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una mesa con ese número"
@@ -63,16 +82,16 @@ def create_mesa(
 
 
 @router.put("/{mesa_id}", response_model=schemas.MesaResponse)
-def update_mesa(
+async def update_mesa(
     mesa_id: int,
     mesa: schemas.MesaUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing mesa.
     """
     try:
-        db_mesa = crud.update_mesa(db, mesa_id=mesa_id, mesa=mesa)
+        db_mesa = await crud_async.update_mesa(db, mesa_id=mesa_id, mesa=mesa)
         if db_mesa is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -80,7 +99,7 @@ def update_mesa(
             )
         return db_mesa
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una mesa con ese número"
@@ -88,15 +107,15 @@ def update_mesa(
 
 
 @router.delete("/{mesa_id}", response_model=schemas.MessageResponse)
-def delete_mesa(
+async def delete_mesa(
     mesa_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a mesa.
     """
     try:
-        mesa = crud.delete_mesa(db, mesa_id=mesa_id)
+        mesa = await crud_async.delete_mesa(db, mesa_id=mesa_id)
         if mesa is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -104,7 +123,7 @@ def delete_mesa(
             )
         return {"message": f"Mesa {mesa.Numero} eliminada exitosamente"}
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se puede eliminar la mesa porque tiene órdenes asociadas"
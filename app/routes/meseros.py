@@ -1,40 +1,45 @@
 """
 Routes for Meseros endpoints.
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
 import schemas
-from database import get_db
+from database import get_async_db, get_read_db
+from pagination import get_cursor, set_next_cursor
 
 router = APIRouter(prefix="/meseros", tags=["Meseros"])
 
 
 @router.get("/", response_model=List[schemas.MeseroResponse])
-def get_meseros(
+async def get_meseros(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all meseros with pagination.
+    Pass the X-Next-Cursor response header as `cursor` to read the next page (keyset).
     """
-    meseros = crud.get_meseros(db, skip=skip, limit=limit)
+    meseros = await crud_async.get_meseros(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, meseros, limit, "MeseroId")
     return meseros
 
 
 @router.get("/{mesero_id}", response_model=schemas.MeseroResponse)
-def get_mesero(
+async def get_mesero(
     mesero_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific mesero by ID.
     """
-    mesero = crud.get_mesero(db, mesero_id=mesero_id)
+    mesero = await crud_async.get_mesero(db, mesero_id=mesero_id)
     if mesero is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -44,17 +49,17 @@ def get_mesero(
 
 
 @router.post("/", response_model=schemas.MeseroResponse, status_code=status.HTTP_201_CREATED)
-def create_mesero(
+async def create_mesero(
     mesero: schemas.MeseroCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new mesero.
     """
     try:
-        return crud.create_mesero(db=db, mesero=mesero)
+        return await crud_async.create_mesero(db=db, mesero=mesero)
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al crear mesero: {str(e)}"
@@ -62,15 +67,15 @@ def create_mesero(
 
 
 @router.put("/{mesero_id}", response_model=schemas.MeseroResponse)
-def update_mesero(
+async def update_mesero(
     mesero_id: int,
     mesero: schemas.MeseroUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing mesero.
     """
-    db_mesero = crud.update_mesero(db, mesero_id=mesero_id, mesero=mesero)
+    db_mesero = await crud_async.update_mesero(db, mesero_id=mesero_id, mesero=mesero)
     if db_mesero is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -80,15 +85,15 @@ def update_mesero(
 
 
 @router.delete("/{mesero_id}", response_model=schemas.MessageResponse)
-def delete_mesero(
+async def delete_mesero(
     mesero_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a mesero.
     """
     try:
-        mesero = crud.delete_mesero(db, mesero_id=mesero_id)
+        mesero = await crud_async.delete_mesero(db, mesero_id=mesero_id)
         if mesero is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -96,7 +101,7 @@ def delete_mesero(
             )
         return {"message": f"Mesero {mesero.Nombre} eliminado exitosamente"}
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se puede eliminar el mesero porque tiene órdenes asociadas"
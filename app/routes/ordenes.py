@@ -1,97 +1,213 @@
 """
 Routes for Ordenes endpoints.
 """
+import os
+from datetime import date
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-import crud
+import crud_async
+import idempotency
+import query_stats
 import schemas
-from database import get_db
+import serialization
+from database import get_async_db, get_read_db, get_read_session_factory
+from pagination import get_cursor, set_next_cursor
+from serialization import FastJSONResponse
 
 router = APIRouter(prefix="/ordenes", tags=["Ordenes"])
 
+# Ordenes read per round trip while streaming an export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
 
 @router.get("/", response_model=List[schemas.OrdenResponse])
-def get_ordenes(
+async def get_ordenes(
     skip: int = 0,
     limit: int = 100,
     mesa_id: Optional[int] = Query(None, description="Filtrar por mesa"),
     estado: Optional[str] = Query(None, description="Filtrar por estado"),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Depends(get_cursor),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all ordenes with pagination and optional filters.
+    Pass the X-Next-Cursor response header as `cursor` to read the next page (keyset).
+    Rows are selected as plain columns and serialized directly, without ORM objects.
+    """
+    ordenes = await crud_async.get_ordenes_rows(db, skip=skip, limit=limit, mesa_id=mesa_id, estado=estado, after_id=after_id)
+    response = FastJSONResponse(ordenes)
+    set_next_cursor(response, ordenes, limit, "OrdenId")
+    return response
+
+
+@router.get("/export")
+async def export_ordenes(
+    request: Request,
+    formato: str = Query("ndjson", description="ndjson (una orden por línea) o csv (una fila por detalle)"),
+    desde: Optional[date] = Query(None, description="Creadas desde este día (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Creadas hasta este día (inclusive)"),
+    estado: Optional[str] = Query(None, description="Filtrar por estado")
+):
+    """
+    Stream the order history, archived ordenes included, with detalles as NDJSON or CSV.
+    Ordenes are read in keyset chunks of EXPORT_CHUNK_SIZE and written as they
+    arrive, so memory stays flat regardless of the number of rows.
     """
-    ordenes = crud.get_ordenes(db, skip=skip, limit=limit, mesa_id=mesa_id, estado=estado)
-    return ordenes
+    if formato not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado: {formato} (use ndjson o csv)"
+        )
+    if desde and hasta and desde > hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'desde' debe ser anterior o igual a 'hasta'"
+        )
+
+    session_factory = await get_read_session_factory(request)
+
+    async def export_stream():
+        # The request session is closed before the body is sent, so the stream uses its own
+        # Archived ordenes first (older history), then the hot tables
+        async with session_factory() as db:
+            first = True
+            for archivo in (True, False):
+                after_id = 0
+                while True:
+                    with query_stats.chunked_reads():
+                        ordenes = await crud_async.get_ordenes_export_chunk(
+                            db, after_id=after_id, limit=EXPORT_CHUNK_SIZE, desde=desde, hasta=hasta, estado=estado, archivo=archivo
+                        )
+                    # End the read transaction so the connection returns to the pool between chunks
+                    await db.rollback()
+                    if formato == "csv":
+                        if ordenes or first:
+                            yield serialization.ordenes_to_csv(ordenes, header=first)
+                            first = False
+                    elif ordenes:
+                        yield serialization.ordenes_to_ndjson(ordenes)
+                    if len(ordenes) < EXPORT_CHUNK_SIZE:
+                        break
+                    after_id = ordenes[-1]["OrdenId"]
+
+    filename = f"ordenes.{formato}"
+    return StreamingResponse(
+        export_stream(),
+        media_type=EXPORT_FORMATS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{orden_id}", response_model=schemas.OrdenResponse)
-def get_orden(
+async def get_orden(
     orden_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a specific orden by ID with all detalles.
     """
-    orden = crud.get_orden(db, orden_id=orden_id)
+    orden = await crud_async.get_orden_row(db, orden_id=orden_id)
     if orden is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Orden con ID {orden_id} no encontrada"
         )
-    return orden
+    return FastJSONResponse(orden)
 
 
 @router.post("/", response_model=schemas.OrdenResponse, status_code=status.HTTP_201_CREATED)
-def create_orden(
+async def create_orden(
     orden: schemas.OrdenCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=idempotency.IDEMPOTENCY_KEY_HEADER, max_length=100, description="Clave única para reintentos seguros"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new orden with optional detalles.
     Validates that mesa and mesero exist, and that products are active.
+    With an Idempotency-Key header, retries return the first response instead of creating duplicates.
     """
-    try:
-        # Validate mesa exists
-        mesa = crud.get_mesa(db, orden.MesaId)
-        if mesa is None:
+    async def crear():
+        try:
+            # Validate mesa exists
+            mesa = await crud_async.get_mesa(db, orden.MesaId)
+            if mesa is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Mesa con ID {orden.MesaId} no existe"
+                )
+
+            # Validate mesero exists
+            mesero = await crud_async.get_mesero(db, orden.MeseroId)
+            if mesero is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Mesero con ID {orden.MeseroId} no existe"
+                )
+
+            # Create orden (validation of products happens in crud)
+            return await crud_async.create_orden(db=db, orden=orden)
+
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Mesa con ID {orden.MesaId} no existe"
+                detail=str(e)
             )
-
-        # Validate mesero exists
-        mesero = crud.get_mesero(db, orden.MeseroId)
-        if mesero is None:
+        except IntegrityError as e:
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Mesero con ID {orden.MeseroId} no existe"
+                detail=f"Error al crear orden: {str(e)}"
             )
 
-        # Create orden (validation of products happens in crud)
-        return crud.create_orden(db=db, orden=orden)
+    return await idempotency.run(db, idempotency_key, request, orden, schemas.OrdenResponse, status.HTTP_201_CREATED, crear)
 
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except IntegrityError as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error al crear orden: {str(e)}"
-        )
+
+@router.post("/batch", response_model=schemas.OrdenBatchResponse)
+async def create_ordenes_batch(
+    batch: schemas.OrdenBatchCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create several ordenes in one request (e.g. queued orders replayed by POS clients).
+    Mesas, meseros and products are validated set-based and all valid ordenes are
+    committed together; invalid ones are reported per item without aborting the batch.
+    """
+    resultados = await crud_async.create_ordenes_batch(db, ordenes=batch.Ordenes)
+    creadas = sum(1 for resultado in resultados if resultado["Exito"])
+    return {
+        "Creadas": creadas,
+        "Fallidas": len(resultados) - creadas,
+        "Resultados": resultados
+    }
+
+
+@router.post("/cerrar", response_model=schemas.OrdenesCloseResponse)
+async def close_ordenes(
+    close_data: schemas.OrdenesClose,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Close several ordenes with a single conditional UPDATE.
+    Returns only the ordenes that were closed; closed or missing ones are skipped.
+    """
+    ordenes = await crud_async.close_ordenes(db, orden_ids=close_data.OrdenIds, comentarios=close_data.Comentarios)
+    return {"Cerradas": len(ordenes), "Ordenes": ordenes}
 
 
 @router.put("/{orden_id}", response_model=schemas.OrdenResponse)
-def update_orden(
+async def update_orden(
     orden_id: int,
     orden: schemas.OrdenUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update an existing orden.
@@ -99,7 +215,7 @@ def update_orden(
     try:
         # Validate mesa if provided
         if orden.MesaId is not None:
-            mesa = crud.get_mesa(db, orden.MesaId)
+            mesa = await crud_async.get_mesa(db, orden.MesaId)
             if mesa is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -108,14 +224,14 @@ def update_orden(
 
         # Validate mesero if provided
         if orden.MeseroId is not None:
-            mesero = crud.get_mesero(db, orden.MeseroId)
+            mesero = await crud_async.get_mesero(db, orden.MeseroId)
             if mesero is None:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Mesero con ID {orden.MeseroId} no existe"
                 )
 
-        db_orden = crud.update_orden(db, orden_id=orden_id, orden=orden)
+        db_orden = await crud_async.update_orden(db, orden_id=orden_id, orden=orden)
         if db_orden is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -123,7 +239,7 @@ def update_orden(
             )
         return db_orden
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al actualizar orden: {str(e)}"
@@ -131,16 +247,16 @@ def update_orden(
 
 
 @router.post("/{orden_id}/cerrar", response_model=schemas.OrdenResponse)
-def close_orden(
+async def close_orden(
     orden_id: int,
     close_data: schemas.OrdenClose,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Close an orden, calculating the final total from all detalles.
     """
     try:
-        orden = crud.close_orden(db, orden_id=orden_id, comentarios=close_data.Comentarios)
+        orden = await crud_async.close_orden(db, orden_id=orden_id, comentarios=close_data.Comentarios)
         if orden is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -155,14 +271,14 @@ def close_orden(
 
 
 @router.delete("/{orden_id}", response_model=schemas.MessageResponse)
-def delete_orden(
+async def delete_orden(
     orden_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete an orden (cascade deletes all detalles).
     """
-    orden = crud.delete_orden(db, orden_id=orden_id)
+    orden = await crud_async.delete_orden(db, orden_id=orden_id)
     if orden is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
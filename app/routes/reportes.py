@@ -0,0 +1,121 @@
+"""
+Routes for sales reports, served from the rollup tables.
+"""
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud_async
+import schemas
+from database import get_async_db, get_read_db
+
+router = APIRouter(prefix="/reportes", tags=["Reportes"])
+
+# Days covered when the range is not given
+DEFAULT_RANGE_DAYS = 30
+
+
+def get_rango_fechas(
+    desde: Optional[date] = Query(None, description="Primer día (UTC), por defecto hace 30 días"),
+    hasta: Optional[date] = Query(None, description="Último día (UTC), por defecto hoy")
+):
+    """
+    Dependency that resolves the reported date range (inclusive).
+    """
+    hasta = hasta or datetime.utcnow().date()
+    desde = desde or hasta - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if desde > hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'desde' debe ser anterior o igual a 'hasta'"
+        )
+    return desde, hasta
+
+
+@router.get("/ventas/diarias", response_model=List[schemas.VentasDiaResponse])
+async def get_ventas_diarias(
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Sales per day: ordenes, revenue, items, average ticket and average table time.
+    """
+    return await crud_async.get_ventas_diarias(db, *rango)
+
+
+@router.get("/ventas/por-hora", response_model=List[schemas.VentasHoraResponse])
+async def get_ventas_por_hora(
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Sales per closing hour (UTC).
+    """
+    return await crud_async.get_ventas_por_hora(db, *rango)
+
+
+@router.get("/ventas/productos", response_model=List[schemas.VentasProductoResponse])
+async def get_ventas_por_producto(
+    limit: int = Query(100, ge=1, le=1000),
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Best-selling productos by revenue.
+    """
+    return await crud_async.get_ventas_por_producto(db, *rango, limit=limit)
+
+
+@router.get("/ventas/categorias", response_model=List[schemas.VentasCategoriaResponse])
+async def get_ventas_por_categoria(
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Sales per categoria by revenue.
+    """
+    return await crud_async.get_ventas_por_categoria(db, *rango)
+
+
+@router.get("/ventas/meseros", response_model=List[schemas.VentasMeseroResponse])
+async def get_ventas_por_mesero(
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Sales per mesero by revenue, with average ticket and table time.
+    """
+    return await crud_async.get_ventas_por_mesero(db, *rango)
+
+
+@router.post("/rollups/actualizar", response_model=schemas.RollupActualizacionResponse)
+async def actualizar_rollups(
+    horas: int = Query(48, ge=1, le=24 * 90, description="Revisar órdenes cerradas en las últimas N horas"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Run the rollup catch-up now instead of waiting for the background job.
+    """
+    aplicadas = await crud_async.catch_up_rollups(db, lookback_hours=horas)
+    return {"OrdenesAplicadas": aplicadas}
+
+
+@router.post("/rollups/reconstruir", response_model=schemas.RollupActualizacionResponse)
+async def reconstruir_rollups(
+    rango: tuple = Depends(get_rango_fechas),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recompute the rollups of a date range from Ordenes and DetallesOrden
+    (initial load, or after closed ordenes were reopened or edited).
+    Ranges that include archived ordenes are rejected.
+    """
+    try:
+        aplicadas = await crud_async.rebuild_rollups(db, *rango)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {"OrdenesAplicadas": aplicadas}
@@ -4,7 +4,7 @@ Pydantic schemas for request/response validation.
 from datetime import datetime, date
 from decimal import Decimal
 from typing import Optional, List
-from pydantic import BaseModel, Field, EmailStr, field_validator
+from pydantic import BaseModel, Field, EmailStr, field_validator, model_validator
 
 
 # ==================== CATEGORIAS ====================
@@ -29,6 +29,11 @@ class CategoriaResponse(CategoriaBase):
         from_attributes = True
 
 
+class CategoriaBulkItem(CategoriaBase):
+    """Row of a bulk categoria upsert; matched by Nombre."""
+    pass
+
+
 # ==================== MESEROS ====================
 class MeseroBase(BaseModel):
     Nombre: str = Field(..., max_length=150, description="Nombre del mesero")
@@ -123,6 +128,37 @@ class MenuProductoResponse(MenuProductoBase):
         from_attributes = True
 
 
+class MenuProductoBulkItem(BaseModel):
+    """
+    Row of a bulk producto upsert. Matched by ProductoId if given, otherwise by
+    Nombre; empty fields keep the current value of existing productos.
+    """
+    ProductoId: Optional[int] = Field(None, description="ID del producto a actualizar")
+    Nombre: str = Field(..., max_length=200, description="Nombre del producto")
+    Descripcion: Optional[str] = Field(None, max_length=500)
+    Precio: Optional[Decimal] = Field(None, ge=0, description="Requerido para productos nuevos")
+    CategoriaId: Optional[int] = None
+    CategoriaNombre: Optional[str] = Field(None, max_length=100, description="Categoría por nombre (alternativa a CategoriaId)")
+    Activo: Optional[bool] = None
+
+
+class CatalogoBulkResultado(BaseModel):
+    """Result of one row of a bulk catalog upsert."""
+    Indice: int = Field(..., description="Posición de la fila en el lote")
+    Accion: Optional[str] = Field(None, description="creado, actualizado o sin cambios")
+    Id: Optional[int] = None
+    Error: Optional[str] = None
+
+
+class CatalogoBulkResponse(BaseModel):
+    """Schema for the bulk catalog upsert response."""
+    Creados: int
+    Actualizados: int
+    SinCambios: int
+    Fallidos: int
+    Resultados: List[CatalogoBulkResultado]
+
+
 # ==================== DETALLES ORDEN ====================
 class DetalleOrdenBase(BaseModel):
     ProductoId: int = Field(..., description="ID del producto")
@@ -150,6 +186,26 @@ class DetalleOrdenResponse(DetalleOrdenBase):
         from_attributes = True
 
 
+class DetallesEstadoUpdate(BaseModel):
+    """Schema for moving several detalles to a new Estado at once."""
+    Estado: str = Field(..., max_length=30, description="Nuevo estado de los detalles")
+    DetalleIds: Optional[List[int]] = Field(None, min_length=1, max_length=1000, description="Detalles a actualizar")
+    OrdenId: Optional[int] = Field(None, description="Actualizar todos los detalles de esta orden")
+    EstadoActual: Optional[str] = Field(None, max_length=30, description="Solo detalles que estén en este estado")
+
+    @model_validator(mode='after')
+    def validate_seleccion(self):
+        if self.DetalleIds is None and self.OrdenId is None:
+            raise ValueError('Indique DetalleIds u OrdenId')
+        return self
+
+
+class DetallesEstadoResponse(BaseModel):
+    """Detalles changed by a bulk Estado update."""
+    Actualizados: int
+    Detalles: List[DetalleOrdenResponse]
+
+
 # ==================== ORDENES ====================
 class OrdenBase(BaseModel):
     MesaId: int = Field(..., description="ID de la mesa")
@@ -186,6 +242,103 @@ class OrdenResponse(OrdenBase):
         from_attributes = True
 
 
+class OrdenesClose(BaseModel):
+    """Schema for closing several ordenes at once."""
+    OrdenIds: List[int] = Field(..., min_length=1, max_length=1000, description="Órdenes a cerrar")
+    Comentarios: Optional[str] = Field(None, max_length=500, description="Comentarios al cerrar")
+
+
+class OrdenesCloseResponse(BaseModel):
+    """Ordenes closed by a bulk close; already closed or missing ones are omitted."""
+    Cerradas: int
+    Ordenes: List[OrdenResponse]
+
+
+class OrdenBatchCreate(BaseModel):
+    """Schema for creating several ordenes in one request."""
+    Ordenes: List[OrdenCreate] = Field(..., min_length=1, max_length=500, description="Órdenes a crear")
+
+
+class OrdenBatchResult(BaseModel):
+    """Result of one orden inside a batch."""
+    Indice: int = Field(..., description="Posición de la orden en el lote")
+    Exito: bool
+    Orden: Optional[OrdenResponse] = None
+    Error: Optional[str] = None
+
+
+class OrdenBatchResponse(BaseModel):
+    """Schema for the batch creation response."""
+    Creadas: int
+    Fallidas: int
+    Resultados: List[OrdenBatchResult]
+
+
+# ==================== COCINA ====================
+class CocinaDetalleResponse(BaseModel):
+    """Pending detalle shown on a kitchen screen."""
+    DetalleId: int
+    OrdenId: int
+    MesaId: int
+    ProductoId: int
+    Producto: Optional[str] = None
+    Categoria: Optional[str] = None
+    Cantidad: int
+    Estado: str
+    FechaCreacion: datetime = Field(..., description="Fecha de creación de la orden")
+    MinutosEspera: float = Field(..., description="Minutos desde que se abrió la orden")
+
+
+class CocinaEstacionResponse(BaseModel):
+    """Pending detalles of one kitchen station."""
+    Estacion: str
+    Pendientes: int
+    Detalles: List[CocinaDetalleResponse]
+
+
+# ==================== REPORTES ====================
+class VentasMedidas(BaseModel):
+    """Sales measures of a rollup bucket."""
+    Ordenes: int = Field(..., description="Órdenes cerradas")
+    Ingresos: Decimal = Field(..., description="Suma de los totales")
+    Articulos: int = Field(..., description="Unidades vendidas")
+    TicketPromedio: Decimal = Field(..., description="Ingresos / Ordenes")
+    MinutosPromedioMesa: float = Field(..., description="Minutos promedio entre apertura y cierre")
+
+
+class VentasHoraResponse(VentasMedidas):
+    Hora: datetime = Field(..., description="Hora de cierre (UTC)")
+
+
+class VentasDiaResponse(VentasMedidas):
+    Fecha: date = Field(..., description="Día de cierre (UTC)")
+
+
+class VentasMeseroResponse(VentasMedidas):
+    MeseroId: int
+    Nombre: str
+
+
+class VentasProductoResponse(BaseModel):
+    ProductoId: int
+    Nombre: str
+    CategoriaId: int
+    Cantidad: int
+    Ingresos: Decimal
+
+
+class VentasCategoriaResponse(BaseModel):
+    CategoriaId: int
+    Nombre: str
+    Cantidad: int
+    Ingresos: Decimal
+
+
+class RollupActualizacionResponse(BaseModel):
+    """Result of a rollup catch-up or rebuild."""
+    OrdenesAplicadas: int
+
+
 # ==================== GENERIC RESPONSES ====================
 class MessageResponse(BaseModel):
     """Generic message response."""
@@ -198,3 +351,48 @@ class HealthResponse(BaseModel):
     status: str
     database: str
     timestamp: datetime
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness probe response with the startup timing report."""
+    status: str
+    ready: bool
+    attempts: int
+    import_ms: Optional[float] = None
+    warmup_ms: Optional[float] = None
+    steps: dict
+    error: Optional[str] = None
+
+
+class ReplicaStatusResponse(BaseModel):
+    """Read replica status."""
+    configured: bool
+    available: Optional[bool] = None
+    failures: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+
+
+class PoolStatusResponse(BaseModel):
+    """Connection pool status response."""
+    mode: str
+    connections_opened: int
+    idle_discarded: int
+    invalidated: int
+    size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    replica: Optional[ReplicaStatusResponse] = None
+
+
+class CacheStatsResponse(BaseModel):
+    """In-process cache statistics."""
+    name: str
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_ratio: float
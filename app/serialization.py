@@ -0,0 +1,158 @@
+"""
+Fast JSON serialization for read paths that skip ORM hydration and pydantic,
+plus parsing of bulk catalog imports (JSON arrays or CSV).
+
+Rows are plain dicts already shaped like the response schemas, so they are
+dumped straight to bytes with orjson. Decimals are written as strings and
+datetimes in ISO 8601, exactly like the pydantic-serialized responses.
+"""
+import csv
+import io
+from decimal import Decimal
+import orjson
+from fastapi.responses import Response
+from pydantic import ValidationError
+
+
+def serialize_default(obj):
+    """Serialize the types orjson does not handle natively."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Serialize content to JSON bytes."""
+    return orjson.dumps(content, default=serialize_default)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, for content already shaped like the response model."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# CSV export: one row per detalle, orden columns repeated
+CSV_ORDEN_COLUMNS = ("OrdenId", "MesaId", "MeseroId", "Estado", "FechaCreacion", "FechaCierre", "Total", "Comentarios")
+CSV_DETALLE_COLUMNS = ("DetalleId", "ProductoId", "Cantidad", "PrecioUnitario", "Subtotal")
+CSV_HEADER = CSV_ORDEN_COLUMNS + CSV_DETALLE_COLUMNS + ("DetalleEstado",)
+
+
+def csv_value(value):
+    """Format a value for CSV: ISO 8601 datetimes, plain decimals, empty for None."""
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def ordenes_to_ndjson(ordenes) -> bytes:
+    """Serialize ordenes as newline-delimited JSON, one orden (with Detalles) per line."""
+    return b"".join(dumps(orden) + b"\n" for orden in ordenes)
+
+
+def ordenes_to_csv(ordenes, header: bool = False) -> str:
+    """
+    Serialize ordenes as CSV with one row per detalle; ordenes without
+    detalles get a single row with empty detalle columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_HEADER)
+    for orden in ordenes:
+        orden_values = [csv_value(orden[column]) for column in CSV_ORDEN_COLUMNS]
+        detalles = orden["Detalles"] or [None]
+        for detalle in detalles:
+            if detalle is None:
+                writer.writerow(orden_values + [""] * (len(CSV_DETALLE_COLUMNS) + 1))
+            else:
+                writer.writerow(
+                    orden_values
+                    + [csv_value(detalle[column]) for column in CSV_DETALLE_COLUMNS]
+                    + [detalle["Estado"]]
+                )
+    return buffer.getvalue()
+
+
+# Bulk imports: a JSON array of objects or a CSV file with a header row
+BULK_MAX_ROWS = 5000
+
+
+def parse_bulk_rows(body: bytes, content_type: str) -> list:
+    """
+    Parse a bulk import body into a list of dicts.
+    text/csv bodies are read with the header row as keys (empty cells become
+    None); anything else must be a JSON array of objects. Raises ValueError
+    for malformed or oversized bodies.
+    """
+    if content_type.split(";")[0].strip().lower() == "text/csv":
+        try:
+            text = body.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("El CSV debe estar codificado en UTF-8")
+        reader = csv.DictReader(io.StringIO(text))
+        filas = [
+            {key.strip(): (value.strip() or None) if value is not None else None for key, value in row.items() if key}
+            for row in reader
+        ]
+    else:
+        try:
+            filas = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            raise ValueError("El cuerpo no es JSON válido")
+        if not isinstance(filas, list) or not all(isinstance(fila, dict) for fila in filas):
+            raise ValueError("Se esperaba un arreglo JSON de objetos")
+
+    if not filas:
+        raise ValueError("El lote está vacío")
+    if len(filas) > BULK_MAX_ROWS:
+        raise ValueError(f"El lote excede el máximo de {BULK_MAX_ROWS} filas")
+    return filas
+
+
+def validate_bulk_rows(filas: list, model) -> tuple:
+    """
+    Validate parsed bulk rows against a pydantic model.
+    Returns ([(indice, item)], [error results]) so invalid rows are reported
+    per row instead of rejecting the whole batch.
+    """
+    validas, errores = [], []
+    for indice, fila in enumerate(filas):
+        try:
+            validas.append((indice, model.model_validate(fila)))
+        except ValidationError as e:
+            mensaje = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc']) or 'fila'}: {error['msg']}" for error in e.errors()
+            )
+            errores.append({"Indice": indice, "Accion": None, "Id": None, "Error": mensaje})
+    return validas, errores
+
+
+def bulk_request_body(model) -> dict:
+    """OpenAPI requestBody for bulk endpoints that read the raw body (JSON array or CSV)."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": model.model_json_schema()}},
+                "text/csv": {"schema": {"type": "string", "description": "CSV con encabezados iguales a los campos"}},
+            },
+        }
+    }
+
+
+def bulk_response(resultados: list) -> dict:
+    """Summarize bulk row results as a CatalogoBulkResponse."""
+    resultados = sorted(resultados, key=lambda resultado: resultado["Indice"])
+    acciones = [resultado["Accion"] for resultado in resultados]
+    return {
+        "Creados": acciones.count("creado"),
+        "Actualizados": acciones.count("actualizado"),
+        "SinCambios": acciones.count("sin cambios"),
+        "Fallidos": acciones.count(None),
+        "Resultados": resultados,
+    }
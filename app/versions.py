@@ -0,0 +1,80 @@
+"""
+Per-table version counters.
+
+The crud write functions bump the version of every table they commit to.
+Readers combine versions into validators (e.g. HTTP ETags) that change
+whenever the underlying data may have changed, without querying it.
+
+Versions of the tables that are cached or served with ETags (SHARED_TABLES)
+are also kept in the VersionesTablas table, bumped inside the writing
+transaction. A background poller in every worker (jobs.py) reads them, so
+all processes agree on those versions and drop their caches within
+TABLE_VERSIONS_POLL_SECONDS of a write made by any other process.
+"""
+import os
+import threading
+import uuid
+
+# Distinguishes this process so validators from other workers or restarts never collide
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Tables versioned in the database and shared by every worker
+SHARED_TABLES = ("Categorias", "MenuProductos", "Mesas")
+# Seconds between polls of VersionesTablas (0 disables shared versions)
+TABLE_VERSIONS_POLL_SECONDS = float(os.getenv("TABLE_VERSIONS_POLL_SECONDS", "2"))
+
+_versions = {}
+_shared = {}
+_lock = threading.Lock()
+# Turned on once VersionesTablas has been read (at startup, or later by the poller)
+shared_state = {"enabled": False}
+
+
+def bump(*tables: str):
+    """Increment the version of each table."""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def is_stored(table: str) -> bool:
+    """
+    Whether writes to the table bump its version in VersionesTablas. True even
+    before this process could read them, so other workers still see its writes.
+    """
+    return TABLE_VERSIONS_POLL_SECONDS > 0 and table in SHARED_TABLES
+
+
+def is_shared(table: str) -> bool:
+    """Whether the table version comes from VersionesTablas."""
+    return shared_state["enabled"] and table in SHARED_TABLES
+
+
+def get(table: str) -> int:
+    """Return the current version of a table (0 if never written)."""
+    if is_shared(table):
+        return _shared.get(table, 0)
+    return _versions.get(table, 0)
+
+
+def scope(*tables: str) -> str:
+    """
+    Validator prefix for the given tables: shared versions mean the same thing
+    in every worker, local counters only within this process.
+    """
+    return "db" if all(is_shared(table) for table in tables) else BOOT_ID
+
+
+def observe(table_versions: dict) -> list:
+    """
+    Record shared versions read from or written to VersionesTablas.
+    Returns the tables whose version moved forward.
+    """
+    changed = []
+    with _lock:
+        for table, version in table_versions.items():
+            if version > _shared.get(table, -1):
+                if table in _shared:
+                    changed.append(table)
+                _shared[table] = version
+    return changed
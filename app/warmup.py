@@ -0,0 +1,112 @@
+"""
+Warm-up after startup so a new instance serves its first requests at full speed.
+
+A fresh container otherwise makes its first requests pay for the ODBC/TLS
+logins, SQLAlchemy mapper configuration, statement compilation, the empty
+menu cache and OpenAPI generation. run_warmup() does that work up front and
+records how long each step took; /health/ready reports 503 until it has
+succeeded, so the load balancer only routes traffic to warm instances.
+"""
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+import crud_async
+from database import AsyncSessionLocal, DB_POOL_MODE, DB_POOL_SIZE, async_engine, read_async_engine
+
+# Pooled connections opened before serving (capped at DB_POOL_SIZE, 0 disables)
+WARMUP_CONNECTIONS = min(int(os.getenv("WARMUP_CONNECTIONS", str(DB_POOL_SIZE))), DB_POOL_SIZE)
+# Seconds between warm-up attempts while the database is unreachable
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+warmup_state = {
+    "ready": False,
+    "attempts": 0,
+    "import_ms": None,
+    "warmup_ms": None,
+    "steps": {},
+    "error": None,
+}
+
+
+async def open_pool_connections(engine, count: int):
+    """
+    Open count connections at once and return them to the pool. If any
+    fails, the ones that did open are closed before the error is raised.
+    """
+    if count <= 0 or DB_POOL_MODE == "null":
+        return
+    results = await asyncio.gather(*(engine.connect() for _ in range(count)), return_exceptions=True)
+    connections = [result for result in results if not isinstance(result, BaseException)]
+    try:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        for connection in connections:
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def warm_statements():
+    """
+    Run the hot crud queries once so their compiled SQL is cached, and load
+    the first page of the menu into the catalog cache.
+    """
+    async with AsyncSessionLocal() as db:
+        await crud_async.get_categorias_cached(db)
+        await crud_async.get_menu_productos_cached(db)
+        await crud_async.get_menu_productos_by_ids(db, [0])
+        await crud_async.get_mesa(db, 0)
+        await crud_async.get_mesas(db, limit=1)
+        await crud_async.get_mesero(db, 0)
+        await crud_async.get_meseros(db, limit=1)
+        await crud_async.get_orden(db, 0)
+        await crud_async.get_orden_row(db, 0)
+        await crud_async.get_ordenes_rows(db, limit=1)
+        await crud_async.get_detalle_orden(db, 0)
+        await crud_async.get_detalles_orden(db, 0)
+
+
+async def run_step(name: str, step):
+    """Run one warm-up step and record its duration in milliseconds."""
+    started = time.perf_counter()
+    result = step()
+    if asyncio.iscoroutine(result):
+        await result
+    warmup_state["steps"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def run_warmup(app):
+    """
+    Warm the instance, retrying every WARMUP_RETRY_SECONDS until the database
+    answers, then mark it ready and log the startup report.
+    """
+    while True:
+        warmup_state["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            await run_step("mappers", configure_mappers)
+            await run_step("connections", lambda: open_pool_connections(async_engine, WARMUP_CONNECTIONS))
+            if read_async_engine is not None:
+                await run_step("replica_connections", lambda: open_pool_connections(read_async_engine, WARMUP_CONNECTIONS))
+            await run_step("statements", warm_statements)
+            await run_step("openapi", app.openapi)
+        except Exception as e:
+            warmup_state["error"] = str(e)
+            logger.warning(f"Warm-up attempt {warmup_state['attempts']} failed: {str(e)}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            continue
+
+        warmup_state["warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        warmup_state["error"] = None
+        warmup_state["ready"] = True
+        steps = ", ".join(f"{name} {ms} ms" for name, ms in warmup_state["steps"].items())
+        logger.info(f"Warm-up finished in {warmup_state['warmup_ms']} ms (imports {warmup_state['import_ms']} ms): {steps}")
+        return
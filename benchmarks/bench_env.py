@@ -0,0 +1,20 @@
+"""
+Shared setup for the benchmark scripts.
+
+The application modules read DATABASE_URL at import time, so it has to be set
+before anything from app/ is imported.
+"""
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db")
+
+
+def use_database(db_path: str):
+    """Point the application at a local SQLite file and make app/ importable."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    # Keep per-request SQL logging out of the measurements
+    os.environ.setdefault("SQL_ECHO", "false")
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
@@ -0,0 +1,429 @@
+"""
+Drive the application in process with realistic request mixes and report
+latency percentiles, throughput and database round trips per endpoint.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/seed.py
+    python benchmarks/run.py --profile servicio --requests 5000 --concurrency 16
+    python benchmarks/run.py --output base.json
+    python benchmarks/run.py --baseline base.json   # exit code 1 on p95 regressions
+
+Requests go through httpx.ASGITransport straight into main:app (no network),
+so the numbers reflect routing, validation, ORM/SQL and serialization.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date
+
+from bench_env import DEFAULT_DB_PATH, use_database
+
+# Request mixes: (weight, scenario). Scenarios are the Workload methods below.
+PROFILES = {
+    "menu": [
+        (50, "menu_activo"),
+        (20, "categorias"),
+        (15, "producto"),
+        (15, "mesas"),
+    ],
+    "servicio": [
+        (22, "menu_activo"),
+        (5, "categorias"),
+        (5, "producto"),
+        (6, "mesas"),
+        (2, "meseros"),
+        (12, "crear_orden"),
+        (10, "ver_orden"),
+        (6, "listar_ordenes"),
+        (5, "detalles_orden"),
+        (10, "agregar_detalle"),
+        (7, "editar_detalle"),
+        (3, "eliminar_detalle"),
+        (4, "cerrar_orden"),
+        (3, "estado_mesa"),
+    ],
+    "cocina": [
+        (25, "cola_cocina"),
+        (10, "cola_barra"),
+        (25, "detalles_orden"),
+        (15, "editar_detalle"),
+        (10, "detalles_estado"),
+        (10, "ver_orden"),
+        (5, "listar_ordenes"),
+    ],
+    "reportes": [
+        (25, "ventas_diarias"),
+        (15, "ventas_por_hora"),
+        (25, "ventas_productos"),
+        (15, "ventas_categorias"),
+        (15, "ventas_meseros"),
+        (5, "exportar"),
+    ],
+    "lotes": [
+        (30, "crear_lote"),
+        (20, "cerrar_lote"),
+        (20, "detalles_estado"),
+        (15, "importar_menu"),
+        (15, "exportar"),
+    ],
+}
+# Ordenes per POST /ordenes/batch and per bulk close, productos per menu import
+LOTE_SIZE = 20
+
+# Database round trips of the request currently running in this task
+current_counter = contextvars.ContextVar("bench_query_counter", default=None)
+
+
+class QueryCounter:
+    """Mutable holder so the SQLAlchemy event can count into the current request."""
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the API in process against a seeded SQLite database.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite file created by seed.py")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="servicio", help="Request mix")
+    parser.add_argument("--requests", type=int, default=3000, help="Measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the request mix")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 increase over the baseline (0.25 = 25%%)")
+    return parser.parse_args()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Workload:
+    """
+    Realistic client behaviour on top of the seeded data. Keeps track of the
+    open ordenes and detalles it can act on, and of the ETags seen by menu pollers.
+    """
+
+    def __init__(self, client, rng, orden_ids, detalle_ids, producto_ids, mesa_ids, mesero_ids):
+        self.client = client
+        self.rng = rng
+        self.orden_ids = orden_ids
+        self.detalle_ids = detalle_ids
+        self.producto_ids = producto_ids
+        self.mesa_ids = mesa_ids
+        self.mesero_ids = mesero_ids
+        self.etags = {}
+
+    async def poll(self, route, url):
+        """GET with If-None-Match, like a client polling the catalog."""
+        headers = {}
+        if url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = await self.client.get(url, headers=headers)
+        if "etag" in response.headers:
+            self.etags[url] = response.headers["etag"]
+        return route, response
+
+    async def menu_activo(self):
+        return await self.poll("GET /menu-productos/", "/api/v1/menu-productos/?activo=true&limit=500")
+
+    async def categorias(self):
+        return await self.poll("GET /categorias/", "/api/v1/categorias/")
+
+    async def producto(self):
+        producto_id = self.rng.choice(self.producto_ids)
+        return await self.poll("GET /menu-productos/{producto_id}", f"/api/v1/menu-productos/{producto_id}")
+
+    async def mesas(self):
+        return await self.poll("GET /mesas/", "/api/v1/mesas/?limit=100")
+
+    async def meseros(self):
+        return "GET /meseros/", await self.client.get("/api/v1/meseros/?limit=100")
+
+    async def estado_mesa(self):
+        mesa_id = self.rng.choice(self.mesa_ids)
+        estado = self.rng.choice(["Libre", "Ocupada", "Reservada"])
+        return "PUT /mesas/{mesa_id}", await self.client.put(f"/api/v1/mesas/{mesa_id}", json={"Estado": estado})
+
+    def nueva_orden(self):
+        """Payload of a new orden with 1 to 5 lines."""
+        return {
+            "MesaId": self.rng.choice(self.mesa_ids),
+            "MeseroId": self.rng.choice(self.mesero_ids),
+            "Detalles": [
+                {"ProductoId": self.rng.choice(self.producto_ids), "Cantidad": self.rng.randint(1, 3), "PrecioUnitario": "50.00"}
+                for _ in range(self.rng.randint(1, 5))
+            ],
+        }
+
+    async def crear_orden(self):
+        response = await self.client.post("/api/v1/ordenes/", json=self.nueva_orden())
+        if response.status_code == 201:
+            self.orden_ids.append(response.json()["OrdenId"])
+        return "POST /ordenes/", response
+
+    async def ver_orden(self):
+        orden_id = self.rng.choice(self.orden_ids)
+        return "GET /ordenes/{orden_id}", await self.client.get(f"/api/v1/ordenes/{orden_id}")
+
+    async def listar_ordenes(self):
+        return "GET /ordenes/", await self.client.get("/api/v1/ordenes/?estado=Abierta&limit=50")
+
+    async def detalles_orden(self):
+        orden_id = self.rng.choice(self.orden_ids)
+        return "GET /detalles-orden/orden/{orden_id}", await self.client.get(f"/api/v1/detalles-orden/orden/{orden_id}")
+
+    async def agregar_detalle(self):
+        response = await self.client.post("/api/v1/detalles-orden/", json={
+            "OrdenId": self.rng.choice(self.orden_ids),
+            "ProductoId": self.rng.choice(self.producto_ids),
+            "Cantidad": self.rng.randint(1, 3),
+            "PrecioUnitario": "50.00",
+        })
+        if response.status_code == 201:
+            self.detalle_ids.append(response.json()["DetalleId"])
+        return "POST /detalles-orden/", response
+
+    async def editar_detalle(self):
+        detalle_id = self.rng.choice(self.detalle_ids)
+        return "PUT /detalles-orden/{detalle_id}", await self.client.put(
+            f"/api/v1/detalles-orden/{detalle_id}",
+            json={"Cantidad": self.rng.randint(1, 4), "Estado": self.rng.choice(["En preparación", "Servido"])},
+        )
+
+    async def eliminar_detalle(self):
+        if len(self.detalle_ids) < 10:
+            return await self.agregar_detalle()
+        detalle_id = self.detalle_ids.pop(self.rng.randrange(len(self.detalle_ids)))
+        return "DELETE /detalles-orden/{detalle_id}", await self.client.delete(f"/api/v1/detalles-orden/{detalle_id}")
+
+    async def cerrar_orden(self):
+        if len(self.orden_ids) < 10:
+            return await self.crear_orden()
+        orden_id = self.orden_ids.pop(self.rng.randrange(len(self.orden_ids)))
+        return "POST /ordenes/{orden_id}/cerrar", await self.client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={})
+
+    async def crear_lote(self):
+        response = await self.client.post("/api/v1/ordenes/batch", json={"Ordenes": [self.nueva_orden() for _ in range(LOTE_SIZE)]})
+        if response.status_code == 200:
+            self.orden_ids.extend(r["Orden"]["OrdenId"] for r in response.json()["Resultados"] if r["Exito"])
+        return "POST /ordenes/batch", response
+
+    async def cerrar_lote(self):
+        if len(self.orden_ids) < LOTE_SIZE * 2:
+            return await self.crear_lote()
+        orden_ids = [self.orden_ids.pop(self.rng.randrange(len(self.orden_ids))) for _ in range(LOTE_SIZE)]
+        return "POST /ordenes/cerrar", await self.client.post("/api/v1/ordenes/cerrar", json={"OrdenIds": orden_ids})
+
+    async def detalles_estado(self):
+        return "POST /detalles-orden/estado", await self.client.post("/api/v1/detalles-orden/estado", json={
+            "OrdenId": self.rng.choice(self.orden_ids),
+            "EstadoActual": "Pendiente",
+            "Estado": "En preparación",
+        })
+
+    async def cola_cocina(self):
+        return "GET /cocina/cola", await self.client.get("/api/v1/cocina/cola?limit=200")
+
+    async def cola_barra(self):
+        return "GET /cocina/cola?estacion", await self.client.get("/api/v1/cocina/cola?estacion=barra&limit=200")
+
+    async def importar_menu(self):
+        filas = [
+            {"ProductoId": producto_id, "Nombre": f"Producto {producto_id}", "Precio": f"{self.rng.randint(20, 300)}.00"}
+            for producto_id in self.rng.sample(self.producto_ids, min(LOTE_SIZE, len(self.producto_ids)))
+        ]
+        return "POST /menu-productos/bulk", await self.client.post("/api/v1/menu-productos/bulk", json=filas)
+
+    async def exportar(self):
+        formato = self.rng.choice(["ndjson", "csv"])
+        hoy = date.today().isoformat()
+        return f"GET /ordenes/export ({formato})", await self.client.get(f"/api/v1/ordenes/export?formato={formato}&desde={hoy}&hasta={hoy}")
+
+    async def ventas(self, reporte, query=""):
+        return f"GET /reportes/ventas/{reporte}", await self.client.get(f"/api/v1/reportes/ventas/{reporte}{query}")
+
+    async def ventas_diarias(self):
+        return await self.ventas("diarias")
+
+    async def ventas_por_hora(self):
+        return await self.ventas("por-hora")
+
+    async def ventas_productos(self):
+        return await self.ventas("productos", "?limit=50")
+
+    async def ventas_categorias(self):
+        return await self.ventas("categorias")
+
+    async def ventas_meseros(self):
+        return await self.ventas("meseros")
+
+
+def load_state(engine, models):
+    """Read the ids the workload acts on from the seeded database."""
+    from sqlalchemy import select
+
+    with engine.connect() as conn:
+        open_ordenes = list(conn.scalars(
+            select(models.Orden.OrdenId).where(models.Orden.Estado == "Abierta").order_by(models.Orden.OrdenId.desc()).limit(5000)
+        ))
+        detalles = list(conn.scalars(
+            select(models.DetalleOrden.DetalleId)
+            .where(models.DetalleOrden.OrdenId.in_(open_ordenes[:2000]))
+        )) if open_ordenes else []
+        productos = list(conn.scalars(select(models.MenuProducto.ProductoId).where(models.MenuProducto.Activo == True)))  # noqa: E712
+        mesas = list(conn.scalars(select(models.Mesa.MesaId)))
+        meseros = list(conn.scalars(select(models.Mesero.MeseroId)))
+    if not (open_ordenes and detalles and productos and mesas and meseros):
+        sys.exit("The database has no open ordenes/productos/mesas/meseros; run benchmarks/seed.py first")
+    return open_ordenes, detalles, productos, mesas, meseros
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import event
+    import models
+    from database import async_engine, engine
+    from main import app
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        counter = current_counter.get()
+        if counter is not None:
+            counter.count += 1
+
+    rng = random.Random(args.seed)
+    state = load_state(engine, models)
+    scenarios, weights = zip(*[(name, weight) for weight, name in PROFILES[args.profile]])
+    samples = defaultdict(list)
+    queries = defaultdict(int)
+    errors = defaultdict(int)
+
+    async def client_loop(workload, budget, measured):
+        while budget[0] > 0:
+            budget[0] -= 1
+            scenario = getattr(workload, rng.choices(scenarios, weights)[0])
+            counter = QueryCounter()
+            token = current_counter.set(counter)
+            started = time.perf_counter()
+            try:
+                route, response = await scenario()
+            finally:
+                current_counter.reset(token)
+            elapsed = time.perf_counter() - started
+            if measured:
+                samples[route].append(elapsed)
+                queries[route] += counter.count
+                if response.status_code >= 400:
+                    errors[route] += 1
+
+    async def phase(requests, measured):
+        budget = [requests]
+        await asyncio.gather(*(client_loop(workload, budget, measured) for _ in range(args.concurrency)))
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            workload = Workload(client, rng, *state)
+            # Warm up first so the measured window starts with a hot pool and caches
+            await phase(args.warmup, measured=False)
+            wall_started = time.perf_counter()
+            await phase(args.requests, measured=True)
+            wall = time.perf_counter() - wall_started
+    return summarize(samples, queries, errors, wall, args)
+
+
+def summarize(samples, queries, errors, wall, args):
+    """Compute per-route statistics in milliseconds."""
+    routes = {}
+    for route, values in sorted(samples.items()):
+        values.sort()
+        routes[route] = {
+            "count": len(values),
+            "errors": errors[route],
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "throughput_rps": len(values) / wall,
+            "queries_per_request": queries[route] / len(values),
+        }
+    total = sum(route["count"] for route in routes.values())
+    return {
+        "profile": args.profile,
+        "concurrency": args.concurrency,
+        "requests": total,
+        "throughput_rps": total / wall,
+        "routes": routes,
+    }
+
+
+def print_report(results, baseline=None):
+    """Print the per-route table, with the p95 change against the baseline if given."""
+    header = f"{'Endpoint':<40} {'n':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in results["routes"].items():
+        line = (
+            f"{route:<40} {stats['count']:>6} {stats['errors']:>5} {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['throughput_rps']:>8.1f} "
+            f"{stats['queries_per_request']:>8.2f}"
+        )
+        base = baseline["routes"].get(route) if baseline else None
+        if base:
+            line += f" {(stats['p95_ms'] / base['p95_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+    print(
+        f"\nProfile {results['profile']}, {results['concurrency']} clients: "
+        f"{results['requests']} requests, {results['throughput_rps']:.1f} req/s"
+    )
+
+
+def find_regressions(results, baseline, max_regression):
+    """Return the endpoints whose p95 grew more than max_regression over the baseline."""
+    regressions = []
+    for route, stats in results["routes"].items():
+        base = baseline["routes"].get(route)
+        if base and stats["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            regressions.append(route)
+    return regressions
+
+
+def main():
+    args = parse_args()
+    use_database(args.db)
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.max_regression)
+        if regressions:
+            print(f"\np95 regressed more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Build a SQLite stand-in of the restaurante database and fill it with synthetic data.
+
+Usage:
+    python benchmarks/seed.py --ordenes 1000000 --mesas 5000
+
+The schema comes from models.Base.metadata, so it always matches the application.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bench_env import DEFAULT_DB_PATH, use_database
+
+CHUNK_SIZE = 10000
+ESTADOS_DETALLE = ["Pendiente", "En preparación", "Servido"]
+NOMBRES_CATEGORIA = [
+    "Entradas", "Sopas", "Ensaladas", "Platos Fuertes", "Pastas", "Mariscos",
+    "Parrilla", "Postres", "Bebidas", "Cafés", "Cervezas", "Vinos",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed a SQLite database with synthetic restaurant data.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite file to (re)create")
+    parser.add_argument("--categorias", type=int, default=12)
+    parser.add_argument("--productos", type=int, default=300)
+    parser.add_argument("--meseros", type=int, default=200)
+    parser.add_argument("--mesas", type=int, default=2000)
+    parser.add_argument("--ordenes", type=int, default=200000)
+    parser.add_argument("--detalles-por-orden", type=int, default=4, help="Average detalles per orden")
+    parser.add_argument("--abiertas", type=float, default=0.05, help="Fraction of ordenes still open")
+    parser.add_argument("--dias", type=int, default=365, help="Days of history to spread ordenes over")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same dataset)")
+    return parser.parse_args()
+
+
+def insert_chunks(conn, table, rows):
+    """Insert rows with executemany in chunks, consuming a generator lazily."""
+    chunk = []
+    count = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            conn.execute(table.insert(), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        conn.execute(table.insert(), chunk)
+        count += len(chunk)
+    return count
+
+
+def main():
+    args = parse_args()
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    use_database(args.db)
+
+    from sqlalchemy import text
+    import models
+    from database import Base, engine
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+
+    categorias = [
+        {"CategoriaId": i, "Nombre": NOMBRES_CATEGORIA[i - 1] if i <= len(NOMBRES_CATEGORIA) else f"Categoría {i}"}
+        for i in range(1, args.categorias + 1)
+    ]
+    precios = {i: Decimal(rng.randrange(1500, 45000)) / 100 for i in range(1, args.productos + 1)}
+    productos = [
+        {
+            "ProductoId": i,
+            "Nombre": f"Producto {i}",
+            "Precio": precios[i],
+            "CategoriaId": rng.randint(1, args.categorias),
+            "Activo": rng.random() > 0.05,
+        }
+        for i in range(1, args.productos + 1)
+    ]
+    meseros = [
+        {"MeseroId": i, "Nombre": f"Mesero {i}", "FechaIngreso": datetime(2020, 1, 1).date()}
+        for i in range(1, args.meseros + 1)
+    ]
+    mesas = [
+        {"MesaId": i, "Numero": i, "Capacidad": rng.choice([2, 4, 4, 6, 8]), "Estado": "Libre"}
+        for i in range(1, args.mesas + 1)
+    ]
+
+    now = datetime.utcnow().replace(microsecond=0)
+    history_seconds = args.dias * 86400
+    primera_abierta = int(args.ordenes * (1 - args.abiertas)) + 1
+    ordenes = []
+    detalles = []
+
+    def generate():
+        """Yield ordenes and, per orden, its detalles, in creation order."""
+        detalle_id = 0
+        for orden_id in range(1, args.ordenes + 1):
+            # Older ordenes are closed, the most recent ones are still open
+            creada = now - timedelta(seconds=history_seconds * (args.ordenes - orden_id) // max(args.ordenes, 1))
+            abierta = orden_id >= primera_abierta
+            lineas = []
+            total = Decimal("0.00")
+            for _ in range(max(1, int(rng.expovariate(1 / args.detalles_por_orden)))):
+                detalle_id += 1
+                producto_id = rng.randint(1, args.productos)
+                cantidad = rng.randint(1, 4)
+                subtotal = precios[producto_id] * cantidad
+                total += subtotal
+                lineas.append({
+                    "DetalleId": detalle_id,
+                    "OrdenId": orden_id,
+                    "ProductoId": producto_id,
+                    "Cantidad": cantidad,
+                    "PrecioUnitario": precios[producto_id],
+                    "Subtotal": subtotal,
+                    "Estado": rng.choice(ESTADOS_DETALLE) if abierta else "Servido",
+                })
+            yield {
+                "OrdenId": orden_id,
+                "MesaId": rng.randint(1, args.mesas),
+                "MeseroId": rng.randint(1, args.meseros),
+                "FechaCreacion": creada,
+                "FechaCierre": None if abierta else creada + timedelta(minutes=rng.randint(20, 150)),
+                "Total": total,
+                "Estado": "Abierta" if abierta else "Cerrada",
+                "Comentarios": None,
+            }, lineas
+
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+        insert_chunks(conn, models.Categoria.__table__, categorias)
+        insert_chunks(conn, models.MenuProducto.__table__, productos)
+        insert_chunks(conn, models.Mesero.__table__, meseros)
+        insert_chunks(conn, models.Mesa.__table__, mesas)
+
+        total_ordenes = 0
+        total_detalles = 0
+        for orden, lineas in generate():
+            ordenes.append(orden)
+            detalles.extend(lineas)
+            if len(ordenes) >= CHUNK_SIZE:
+                total_ordenes += insert_chunks(conn, models.Orden.__table__, ordenes)
+                total_detalles += insert_chunks(conn, models.DetalleOrden.__table__, detalles)
+                ordenes.clear()
+                detalles.clear()
+        total_ordenes += insert_chunks(conn, models.Orden.__table__, ordenes)
+        total_detalles += insert_chunks(conn, models.DetalleOrden.__table__, detalles)
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+
+    print(
+        f"Seeded {args.db} in {time.perf_counter() - started:.1f}s: "
+        f"{args.categorias} categorias, {args.productos} productos, {args.meseros} meseros, "
+        f"{args.mesas} mesas, {total_ordenes} ordenes, {total_detalles} detalles"
+    )
+
+
+if __name__ == "__main__":
+    main()
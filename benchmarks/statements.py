@@ -0,0 +1,141 @@
+"""
+Measure the Python-side cost per call of the crud lookups and list filters:
+the prebuilt statements in crud.py against the equivalent db.query(...)
+built on every call (how crud.py used to run them).
+
+Usage:
+    python benchmarks/seed.py
+    python benchmarks/statements.py --calls 5000
+
+Both variants run the same SQL on the same session against the seeded SQLite
+file, so the difference per call is statement construction and compilation
+cache lookup, not database time.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from bench_env import DEFAULT_DB_PATH, use_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare prebuilt crud statements with per-call db.query construction.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite file created by seed.py")
+    parser.add_argument("--calls", type=int, default=5000, help="Measured calls per scenario and variant")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured calls sent first")
+    parser.add_argument("--rounds", type=int, default=3, help="Alternating rounds; the median is reported")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the ids looked up")
+    return parser.parse_args()
+
+
+def build_scenarios(db, rng):
+    """
+    Return {scenario: (before, after)}: callables taking the session, the
+    first built with db.query on every call, the second the crud function.
+    """
+    import crud
+    import models
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import joinedload
+
+    def ids(column):
+        return db.scalars(select(column).order_by(func.random()).limit(500)).all()
+
+    orden_ids = ids(models.Orden.OrdenId)
+    detalle_ids = ids(models.DetalleOrden.DetalleId)
+    producto_ids = ids(models.MenuProducto.ProductoId)
+    mesa_ids = ids(models.Mesa.MesaId)
+    mesero_ids = ids(models.Mesero.MeseroId)
+
+    def query_page(query, key_column, after_id=None, limit=100):
+        query = query.order_by(key_column)
+        if after_id is not None:
+            return query.filter(key_column > after_id).limit(limit)
+        return query.offset(0).limit(limit)
+
+    return {
+        "get_orden": (
+            lambda db: db.query(models.Orden).options(joinedload(models.Orden.detalles))
+            .filter(models.Orden.OrdenId == rng.choice(orden_ids)).first(),
+            lambda db: crud.get_orden(db, rng.choice(orden_ids)),
+        ),
+        "get_menu_producto": (
+            lambda db: db.query(models.MenuProducto).filter(models.MenuProducto.ProductoId == rng.choice(producto_ids)).first(),
+            lambda db: crud.get_menu_producto(db, rng.choice(producto_ids)),
+        ),
+        "get_mesa": (
+            lambda db: db.query(models.Mesa).filter(models.Mesa.MesaId == rng.choice(mesa_ids)).first(),
+            lambda db: crud.get_mesa(db, rng.choice(mesa_ids)),
+        ),
+        "get_mesero": (
+            lambda db: db.query(models.Mesero).filter(models.Mesero.MeseroId == rng.choice(mesero_ids)).first(),
+            lambda db: crud.get_mesero(db, rng.choice(mesero_ids)),
+        ),
+        "get_detalle_orden": (
+            lambda db: db.query(models.DetalleOrden).filter(models.DetalleOrden.DetalleId == rng.choice(detalle_ids)).first(),
+            lambda db: crud.get_detalle_orden(db, rng.choice(detalle_ids)),
+        ),
+        "get_detalles_orden": (
+            lambda db: db.query(models.DetalleOrden).filter(models.DetalleOrden.OrdenId == rng.choice(orden_ids)).all(),
+            lambda db: crud.get_detalles_orden(db, rng.choice(orden_ids)),
+        ),
+        "get_mesas?estado": (
+            lambda db: query_page(
+                db.query(models.Mesa).filter(models.Mesa.Estado == "Libre"), models.Mesa.MesaId, limit=20
+            ).all(),
+            lambda db: crud.get_mesas(db, limit=20, estado="Libre"),
+        ),
+        "get_menu_productos?activo&cursor": (
+            lambda db: query_page(
+                db.query(models.MenuProducto).filter(models.MenuProducto.Activo == True),  # noqa: E712
+                models.MenuProducto.ProductoId, after_id=rng.choice(producto_ids), limit=20
+            ).all(),
+            lambda db: crud.get_menu_productos(db, limit=20, activo=True, after_id=rng.choice(producto_ids)),
+        ),
+        "get_ordenes?mesa": (
+            lambda db: query_page(
+                db.query(models.Orden).options(joinedload(models.Orden.detalles))
+                .filter(models.Orden.MesaId == rng.choice(mesa_ids)), models.Orden.OrdenId, limit=20
+            ).all(),
+            lambda db: crud.get_ordenes(db, limit=20, mesa_id=rng.choice(mesa_ids)),
+        ),
+    }
+
+
+def time_calls(db, fn, calls):
+    """Microseconds per call; the identity map is cleared so every call hydrates rows like a new request."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(db)
+        db.expunge_all()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    args = parse_args()
+    use_database(args.db)
+
+    from database import SessionLocal
+
+    rng = random.Random(args.seed)
+    results = []
+    with SessionLocal() as db:
+        scenarios = build_scenarios(db, rng)
+        for name, (before, after) in scenarios.items():
+            time_calls(db, before, args.warmup)
+            time_calls(db, after, args.warmup)
+            samples = {"before": [], "after": []}
+            # Alternate the variants so drift (cache, CPU frequency) hits both alike
+            for _ in range(args.rounds):
+                samples["before"].append(time_calls(db, before, args.calls))
+                samples["after"].append(time_calls(db, after, args.calls))
+            results.append((name, statistics.median(samples["before"]), statistics.median(samples["after"])))
+
+    print(f"{'scenario':36s}{'db.query us':>13s}{'prebuilt us':>13s}{'saved us':>10s}{'speedup':>9s}")
+    for name, before, after in results:
+        print(f"{name:36s}{before:13.1f}{after:13.1f}{before - after:10.1f}{before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Shared fixtures. The API runs in process against a temporary SQLite database
+(the offline stand-in for Azure SQL), created once per session; every test
+starts with empty tables and empty caches.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+DB_DIR = tempfile.mkdtemp(prefix="restaurante-tests-")
+
+# Configured before the app modules are imported, since they read the environment at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+os.environ["ROLLUP_CATCHUP_SECONDS"] = "0"
+os.environ["IDEMPOTENCY_PURGE_SECONDS"] = "0"
+os.environ["ARCHIVE_AFTER_DAYS"] = "0"
+sys.path.insert(0, APP_DIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import cache  # noqa: E402
+import database  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+
+# Kept between tests: VersionesTablas holds one row per shared table
+KEPT_TABLES = {"VersionesTablas"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client with the application started (schema created, background jobs running)."""
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def clean_state(client):
+    """Empty every table and in-process cache before each test."""
+    with database.engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            if table.name not in KEPT_TABLES:
+                conn.execute(table.delete())
+    for registered in cache.registry:
+        registered.clear()
+    database.replica_state.update(down_until=0.0, failures=0)
+    yield
+
+
+@pytest.fixture
+def catalogo(client):
+    """One mesa, mesero and categoria with two active productos; returns their IDs."""
+    mesa = client.post("/api/v1/mesas/", json={"Numero": 1, "Capacidad": 4}).json()
+    mesero = client.post("/api/v1/meseros/", json={"Nombre": "Ana"}).json()
+    categoria = client.post("/api/v1/categorias/", json={"Nombre": "Platos"}).json()
+    productos = [
+        client.post("/api/v1/menu-productos/", json={"Nombre": nombre, "Precio": precio, "CategoriaId": categoria["CategoriaId"]}).json()
+        for nombre, precio in (("Sopa", "10.00"), ("Pasta", "25.50"))
+    ]
+    return {
+        "MesaId": mesa["MesaId"],
+        "MeseroId": mesero["MeseroId"],
+        "CategoriaId": categoria["CategoriaId"],
+        "ProductoIds": [producto["ProductoId"] for producto in productos],
+        "Precios": [producto["Precio"] for producto in productos],
+    }
+
+
+@pytest.fixture
+def crear_orden(client, catalogo):
+    """Factory that creates an orden with the given (producto index, cantidad) lines."""
+    def crear(*lineas, headers=None):
+        detalles = [
+            {"ProductoId": catalogo["ProductoIds"][indice], "Cantidad": cantidad, "PrecioUnitario": catalogo["Precios"][indice]}
+            for indice, cantidad in lineas
+        ]
+        response = client.post(
+            "/api/v1/ordenes/",
+            json={"MesaId": catalogo["MesaId"], "MeseroId": catalogo["MeseroId"], "Detalles": detalles},
+            headers=headers or {},
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+    return crear
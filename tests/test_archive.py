@@ -0,0 +1,47 @@
+"""Closed ordenes moved to the archive tables stay readable and keep their references."""
+from datetime import datetime, timedelta
+
+import crud
+import database
+
+
+def archivar(antes_de=None):
+    with database.SessionLocal() as db:
+        return crud.archive_ordenes(db, antes_de=antes_de or datetime.utcnow() + timedelta(minutes=1))
+
+
+def test_only_closed_ordenes_are_archived(client, crear_orden):
+    abierta = crear_orden((0, 1))["OrdenId"]
+    cerrada = crear_orden((0, 1), (1, 2))
+    client.post(f"/api/v1/ordenes/{cerrada['OrdenId']}/cerrar", json={})
+
+    assert archivar(antes_de=datetime.utcnow() - timedelta(days=1)) == 0
+    assert archivar() == 1
+    assert [orden["OrdenId"] for orden in client.get("/api/v1/ordenes/").json()] == [abierta]
+
+
+def test_archived_orden_is_still_readable(client, crear_orden):
+    orden_id = crear_orden((0, 1), (1, 2))["OrdenId"]
+    cerrada = client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={}).json()
+    archivar()
+
+    response = client.get(f"/api/v1/ordenes/{orden_id}")
+    assert response.status_code == 200
+    assert response.json() == cerrada
+
+    exportadas = client.get("/api/v1/ordenes/export").text.splitlines()
+    assert len(exportadas) == 1 and f'"OrdenId":{orden_id}' in exportadas[0]
+
+    # Added to the rollups when archived; the range can no longer be rebuilt
+    [dia] = client.get("/api/v1/reportes/ventas/diarias").json()
+    assert dia["Ordenes"] == 1
+    assert client.post("/api/v1/reportes/rollups/reconstruir").status_code == 400
+
+
+def test_archived_references_block_deletes(client, catalogo, crear_orden):
+    orden_id = crear_orden((0, 1))["OrdenId"]
+    client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={})
+    archivar()
+
+    assert client.delete(f"/api/v1/meseros/{catalogo['MeseroId']}").status_code == 400
+    assert client.get(f"/api/v1/meseros/{catalogo['MeseroId']}").status_code == 200
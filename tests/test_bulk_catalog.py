@@ -0,0 +1,61 @@
+"""Bulk catalog upserts match existing rows by name ignoring case."""
+
+
+def test_categorias_match_ignoring_case(client, catalogo):
+    response = client.post("/api/v1/categorias/bulk", json=[
+        {"Nombre": "platos", "Descripcion": "Platos fuertes"},
+        {"Nombre": "Bebidas"},
+        {"Nombre": "BEBIDAS"},
+    ])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["Creados"], body["Actualizados"], body["Fallidos"]) == (1, 1, 1)
+    platos, bebidas, repetida = body["Resultados"]
+    assert (platos["Accion"], platos["Id"]) == ("actualizado", catalogo["CategoriaId"])
+    assert bebidas["Accion"] == "creado"
+    assert "repetida" in repetida["Error"]
+
+    nombres = sorted(categoria["Nombre"] for categoria in client.get("/api/v1/categorias/").json())
+    assert nombres == ["Bebidas", "platos"]
+
+
+def test_non_ascii_names_match_ignoring_case(client):
+    client.post("/api/v1/categorias/", json={"Nombre": "Cafés"})
+    body = client.post("/api/v1/categorias/bulk", json=[{"Nombre": "CAFÉS", "Descripcion": "Calientes"}]).json()
+    assert body["Actualizados"] == 1
+    assert len(client.get("/api/v1/categorias/").json()) == 1
+
+
+def test_unchanged_rows_are_not_written(client, catalogo):
+    body = client.post("/api/v1/categorias/bulk", json=[{"Nombre": "Platos"}]).json()
+    assert body["SinCambios"] == 1
+    assert body["Resultados"][0]["Id"] == catalogo["CategoriaId"]
+
+
+def test_productos_from_csv(client, catalogo):
+    csv = "Nombre,Precio,CategoriaNombre\nSOPA,12.00,platos\nPan,2.50,Panes\n"
+    response = client.post(
+        "/api/v1/menu-productos/bulk",
+        params={"crear_categorias": "true"},
+        content=csv,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    sopa, pan = response.json()["Resultados"]
+    assert (sopa["Accion"], sopa["Id"]) == ("actualizado", catalogo["ProductoIds"][0])
+    assert pan["Accion"] == "creado"
+
+    productos = {producto["Nombre"]: producto for producto in client.get("/api/v1/menu-productos/").json()}
+    assert sorted(productos) == ["Pan", "Pasta", "SOPA"]
+    assert productos["SOPA"]["Precio"] == "12.00"
+    categorias = {categoria["Nombre"]: categoria["CategoriaId"] for categoria in client.get("/api/v1/categorias/").json()}
+    assert productos["Pan"]["CategoriaId"] == categorias["Panes"]
+
+
+def test_producto_repeated_in_batch_fails(client, catalogo):
+    body = client.post("/api/v1/menu-productos/bulk", json=[
+        {"Nombre": "Pasta", "Precio": "26.00"},
+        {"Nombre": "pasta", "Precio": "27.00"},
+    ]).json()
+    assert (body["Actualizados"], body["Fallidos"]) == (1, 1)
+    assert "repetido" in body["Resultados"][1]["Error"]
@@ -0,0 +1,65 @@
+"""Conditional UPDATEs: closing ordenes and moving detalles between states."""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def cerrar(client, orden_id):
+    return client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={})
+
+
+def test_orden_is_closed_once(client, crear_orden):
+    orden_id = crear_orden((0, 1))["OrdenId"]
+    assert cerrar(client, orden_id).status_code == 200
+    assert cerrar(client, orden_id).status_code == 400
+    assert cerrar(client, 999).status_code == 404
+
+
+def test_concurrent_closes_apply_once(client, crear_orden):
+    orden_id = crear_orden((0, 1))["OrdenId"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(lambda _: cerrar(client, orden_id).status_code, range(8)))
+
+    assert sorted(codes) == [200] + [400] * 7
+    [dia] = client.get("/api/v1/reportes/ventas/diarias").json()
+    assert dia["Ordenes"] == 1
+
+
+def test_bulk_close_skips_closed_and_missing(client, crear_orden):
+    abierta = crear_orden((0, 1))["OrdenId"]
+    cerrada = crear_orden((1, 1))["OrdenId"]
+    cerrar(client, cerrada)
+
+    body = client.post("/api/v1/ordenes/cerrar", json={"OrdenIds": [abierta, cerrada, 999], "Comentarios": "Fin de turno"}).json()
+    assert body["Cerradas"] == 1
+    [orden] = body["Ordenes"]
+    assert (orden["OrdenId"], orden["Estado"], orden["Comentarios"]) == (abierta, "Cerrada", "Fin de turno")
+
+
+def test_detalles_estado_by_ids(client, crear_orden):
+    detalles = crear_orden((0, 1), (1, 1))["Detalles"]
+    primero = detalles[0]["DetalleId"]
+
+    body = client.post("/api/v1/detalles-orden/estado", json={"Estado": "Servido", "DetalleIds": [primero, 999]}).json()
+    assert body["Actualizados"] == 1
+    assert [(detalle["DetalleId"], detalle["Estado"]) for detalle in body["Detalles"]] == [(primero, "Servido")]
+
+
+def test_detalles_estado_by_orden_and_current_state(client, crear_orden):
+    orden = crear_orden((0, 1), (1, 1))
+    primero, segundo = (detalle["DetalleId"] for detalle in orden["Detalles"])
+    client.post("/api/v1/detalles-orden/estado", json={"Estado": "Servido", "DetalleIds": [primero]})
+
+    body = client.post("/api/v1/detalles-orden/estado", json={
+        "Estado": "En preparación", "OrdenId": orden["OrdenId"], "EstadoActual": "Pendiente"
+    }).json()
+    assert [detalle["DetalleId"] for detalle in body["Detalles"]] == [segundo]
+
+    # Nothing left in Pendiente, so a repeat changes nothing
+    repeat = client.post("/api/v1/detalles-orden/estado", json={
+        "Estado": "En preparación", "OrdenId": orden["OrdenId"], "EstadoActual": "Pendiente"
+    }).json()
+    assert repeat == {"Actualizados": 0, "Detalles": []}
+
+
+def test_detalles_estado_requires_a_selection(client):
+    assert client.post("/api/v1/detalles-orden/estado", json={"Estado": "Servido"}).status_code == 422
@@ -0,0 +1,50 @@
+"""In-process catalog cache and its invalidation on writes."""
+from cache import MISSING, TTLCache, catalog_cache
+
+
+def test_list_is_served_from_cache(client, catalogo):
+    client.get("/api/v1/menu-productos/")
+    hits = catalog_cache.hits
+    response = client.get("/api/v1/menu-productos/")
+    assert response.status_code == 200
+    assert catalog_cache.hits == hits + 1
+
+
+def test_write_invalidates_cached_catalog(client, catalogo):
+    producto_id = catalogo["ProductoIds"][0]
+    assert client.get(f"/api/v1/menu-productos/{producto_id}").json()["Precio"] == "10.00"
+
+    client.put(f"/api/v1/menu-productos/{producto_id}", json={"Precio": "12.00"})
+
+    assert client.get(f"/api/v1/menu-productos/{producto_id}").json()["Precio"] == "12.00"
+    precios = {p["ProductoId"]: p["Precio"] for p in client.get("/api/v1/menu-productos/").json()}
+    assert precios[producto_id] == "12.00"
+
+
+def test_categoria_write_invalidates_cached_categorias(client, catalogo):
+    client.get("/api/v1/categorias/")
+    client.post("/api/v1/categorias/", json={"Nombre": "Bebidas"})
+    nombres = [c["Nombre"] for c in client.get("/api/v1/categorias/").json()]
+    assert nombres == ["Platos", "Bebidas"]
+
+
+def test_value_loaded_before_a_clear_is_not_cached():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    generation = cache.generation
+    # A write commits and clears the cache while the reader is still loading
+    cache.clear()
+    cache.set("key", "stale", generation)
+    assert cache.get("key") is MISSING
+
+    cache.set("key", "fresh", cache.generation)
+    assert cache.get("key") == "fresh"
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
@@ -0,0 +1,68 @@
+"""Negotiated compression, and caching of compressed bodies per ETag."""
+import pytest
+
+import compression
+from cache import compressed_cache
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def catalogo_grande(client, catalogo):
+    """Enough productos for the list to pass COMPRESSION_MIN_SIZE."""
+    client.post("/api/v1/menu-productos/bulk", json=[
+        {"Nombre": f"Producto {numero}", "Precio": "5.00", "CategoriaId": catalogo["CategoriaId"], "Descripcion": "x" * 40}
+        for numero in range(30)
+    ])
+    return catalogo
+
+
+def test_large_responses_are_gzipped(client, catalogo_grande):
+    response = client.get("/api/v1/menu-productos/", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["etag"].endswith('-gzip"')
+    assert int(response.headers["content-length"]) < compression.COMPRESSION_MIN_SIZE
+    assert len(response.json()) == 32
+
+
+def test_compressed_body_is_reused_per_version(client, catalogo_grande):
+    first = client.get("/api/v1/menu-productos/", headers=GZIP)
+    hits = compressed_cache.hits
+    second = client.get("/api/v1/menu-productos/", headers=GZIP)
+    assert compressed_cache.hits == hits + 1
+    assert second.content == first.content
+
+
+def test_compressed_etag_revalidates(client, catalogo_grande):
+    etag = client.get("/api/v1/menu-productos/", headers=GZIP).headers["etag"]
+    response = client.get("/api/v1/menu-productos/", headers={**GZIP, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert "Accept-Encoding" in response.headers["vary"]
+
+
+def test_small_and_unaccepted_responses_are_not_compressed(client, catalogo_grande):
+    small = client.get("/api/v1/mesas/", headers=GZIP)
+    assert "content-encoding" not in small.headers
+
+    identity = client.get("/api/v1/menu-productos/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert not identity.headers["etag"].endswith('-gzip"')
+
+
+def test_streamed_export_is_gzipped(client, crear_orden):
+    for _ in range(3):
+        crear_orden((0, 1), (1, 1))
+    response = client.get("/api/v1/ordenes/export", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 3
+
+
+@pytest.mark.parametrize("accept, esperado", [
+    ("gzip;q=0, identity", None),
+    ("*", compression.SUPPORTED_ENCODINGS[0]),
+    ("deflate, gzip;q=0.5", "gzip"),
+])
+def test_negotiate(accept, esperado):
+    assert compression.negotiate(accept) == esperado
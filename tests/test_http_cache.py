@@ -0,0 +1,54 @@
+"""ETag / If-None-Match on the catalog and mesa endpoints."""
+from fastapi import Response
+from starlette.requests import Request
+
+import http_cache
+import versions
+
+
+def test_matching_etag_returns_304(client, catalogo):
+    first = client.get("/api/v1/menu-productos/")
+    etag = first.headers["etag"]
+
+    second = client.get("/api/v1/menu-productos/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_write_changes_the_etag(client, catalogo):
+    etag = client.get("/api/v1/mesas/").headers["etag"]
+    client.put(f"/api/v1/mesas/{catalogo['MesaId']}", json={"Estado": "Ocupada"})
+
+    response = client.get("/api/v1/mesas/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["Estado"] == "Ocupada"
+
+
+def test_etag_depends_on_the_query(client, catalogo):
+    todos = client.get("/api/v1/menu-productos/").headers["etag"]
+    activos = client.get("/api/v1/menu-productos/", params={"activo": "true"}).headers["etag"]
+    assert todos != activos
+
+
+def test_weak_and_listed_etags_match(client, catalogo):
+    etag = client.get("/api/v1/categorias/").headers["etag"]
+    response = client.get("/api/v1/categorias/", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+
+
+def test_no_etag_when_the_table_changed_during_the_read():
+    request = Request({"type": "http", "method": "GET", "path": "/api/v1/ordenes/", "query_string": b"", "headers": []})
+    etag = http_cache.make_etag(request, "Ordenes")
+
+    unchanged = Response()
+    http_cache.set_cache_headers(request, unchanged, etag, "Ordenes")
+    assert unchanged.headers["etag"] == etag
+
+    # A write lands between computing the ETag and reading the body
+    versions.bump("Ordenes")
+    moved = Response()
+    http_cache.set_cache_headers(request, moved, etag, "Ordenes")
+    assert "etag" not in moved.headers
+    assert moved.headers["cache-control"] == http_cache.HTTP_CACHE_CONTROL
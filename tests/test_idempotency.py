@@ -0,0 +1,97 @@
+"""Idempotency-Key on POST /ordenes: one orden per key, replays and releases."""
+from concurrent.futures import ThreadPoolExecutor
+
+import crud
+import crud_async
+import database
+import idempotency
+from cache import MISSING, idempotency_cache
+
+CLAVE = {idempotency.IDEMPOTENCY_KEY_HEADER: "tablet-1-0001"}
+
+
+def orden_payload(catalogo, mesa_id=None):
+    return {
+        "MesaId": mesa_id or catalogo["MesaId"],
+        "MeseroId": catalogo["MeseroId"],
+        "Detalles": [{"ProductoId": catalogo["ProductoIds"][0], "Cantidad": 1, "PrecioUnitario": catalogo["Precios"][0]}],
+    }
+
+
+def count_ordenes(client):
+    return len(client.get("/api/v1/ordenes/").json())
+
+
+def test_retry_replays_the_first_response(client, catalogo):
+    first = client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE)
+    assert first.status_code == 201
+    assert idempotency.REPLAYED_HEADER not in first.headers
+
+    replay = client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE)
+    assert replay.status_code == 201
+    assert replay.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert replay.json() == first.json()
+
+    # Also replayed from the database once the in-process copy is gone
+    idempotency_cache.clear()
+    assert client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE).json() == first.json()
+    assert count_ordenes(client) == 1
+
+
+def test_key_reused_with_another_payload(client, catalogo):
+    client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE)
+    payload = orden_payload(catalogo)
+    payload["Comentarios"] = "Otra"
+    assert client.post("/api/v1/ordenes/", json=payload, headers=CLAVE).status_code == 422
+
+
+def test_failed_request_releases_the_key(client, catalogo):
+    assert client.post("/api/v1/ordenes/", json=orden_payload(catalogo, mesa_id=999), headers=CLAVE).status_code == 400
+    assert client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE).status_code == 201
+
+
+def test_concurrent_retries_create_one_orden(client, catalogo):
+    def enviar(_):
+        return client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(enviar, range(8)))
+
+    assert set(codes) <= {201, 409}
+    assert count_ordenes(client) == 1
+
+
+def test_lost_reservation_race_answers_409(client, catalogo, monkeypatch):
+    async def ocupada(db, **kwargs):
+        return crud.IDEMPOTENCY_OCUPADA
+
+    monkeypatch.setattr(crud_async, "reserve_idempotency_key", ocupada)
+    assert client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE).status_code == 409
+    assert count_ordenes(client) == 0
+
+
+def test_unstored_response_is_not_cached(client, catalogo, monkeypatch):
+    async def falla(db, **kwargs):
+        raise RuntimeError("conexión perdida")
+
+    monkeypatch.setattr(crud_async, "complete_idempotency_key", falla)
+    assert client.post("/api/v1/ordenes/", json=orden_payload(catalogo), headers=CLAVE).status_code == 201
+    assert idempotency_cache.get(CLAVE[idempotency.IDEMPOTENCY_KEY_HEADER]) is MISSING
+    with database.SessionLocal() as db:
+        assert crud.get_idempotency_key(db, CLAVE[idempotency.IDEMPOTENCY_KEY_HEADER]) is None
+
+
+def test_reserve_replaces_expired_keys():
+    with database.SessionLocal() as db:
+        assert crud.reserve_idempotency_key(db, clave="k", huella="a", ttl_seconds=-1) is None
+        assert crud.reserve_idempotency_key(db, clave="k", huella="b", ttl_seconds=60) is None
+        existente = crud.reserve_idempotency_key(db, clave="k", huella="b", ttl_seconds=60)
+        assert (existente["Huella"], existente["Estado"]) == ("b", crud.IDEMPOTENCY_EN_PROCESO)
+
+
+def test_reserve_gives_up_after_losing_every_race(monkeypatch):
+    with database.SessionLocal() as db:
+        crud.reserve_idempotency_key(db, clave="k", huella="a", ttl_seconds=60)
+        # Each attempt sees the row vanish before it can be read, as if released meanwhile
+        monkeypatch.setattr(crud, "get_idempotency_key", lambda db, clave: None)
+        assert crud.reserve_idempotency_key(db, clave="k", huella="a", ttl_seconds=60) is crud.IDEMPOTENCY_OCUPADA
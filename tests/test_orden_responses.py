@@ -0,0 +1,42 @@
+"""Orden write endpoints answer with the same shape as GET /ordenes/{id}."""
+
+
+def detalle(catalogo, indice, cantidad):
+    return {"ProductoId": catalogo["ProductoIds"][indice], "Cantidad": cantidad, "PrecioUnitario": catalogo["Precios"][indice]}
+
+
+def get_orden(client, orden_id):
+    return client.get(f"/api/v1/ordenes/{orden_id}").json()
+
+
+def test_create_returns_detalles(client, crear_orden):
+    orden = crear_orden((0, 2), (1, 1))
+    assert len(orden["Detalles"]) == 2
+    assert orden == get_orden(client, orden["OrdenId"])
+
+
+def test_update_and_close_return_detalles(client, crear_orden):
+    orden_id = crear_orden((0, 1))["OrdenId"]
+
+    actualizada = client.put(f"/api/v1/ordenes/{orden_id}", json={"Comentarios": "Sin sal"}).json()
+    assert actualizada["Detalles"] and actualizada == get_orden(client, orden_id)
+
+    cerrada = client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={}).json()
+    assert cerrada["Estado"] == "Cerrada"
+    assert cerrada["Detalles"] and cerrada == get_orden(client, orden_id)
+
+
+def test_batch_and_bulk_close_return_detalles(client, catalogo):
+    base = {"MesaId": catalogo["MesaId"], "MeseroId": catalogo["MeseroId"]}
+    batch = client.post("/api/v1/ordenes/batch", json={"Ordenes": [
+        {**base, "Detalles": [detalle(catalogo, 0, 1)]},
+        {**base, "Detalles": [detalle(catalogo, 0, 1), detalle(catalogo, 1, 3)]},
+    ]}).json()
+    assert batch["Creadas"] == 2
+    creadas = [resultado["Orden"] for resultado in batch["Resultados"]]
+    assert [len(orden["Detalles"]) for orden in creadas] == [1, 2]
+    assert creadas == [get_orden(client, orden["OrdenId"]) for orden in creadas]
+
+    cerradas = client.post("/api/v1/ordenes/cerrar", json={"OrdenIds": [orden["OrdenId"] for orden in creadas]}).json()
+    assert cerradas["Cerradas"] == 2
+    assert cerradas["Ordenes"] == [get_orden(client, orden["OrdenId"]) for orden in creadas]
@@ -0,0 +1,45 @@
+"""Orden.Total kept in step with its detalles by in-database increments."""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+
+def total(client, orden_id):
+    return Decimal(client.get(f"/api/v1/ordenes/{orden_id}").json()["Total"])
+
+
+def test_total_on_create(crear_orden):
+    orden = crear_orden((0, 2), (1, 1))
+    assert Decimal(orden["Total"]) == Decimal("45.50")
+
+
+def test_total_follows_detalle_writes(client, catalogo, crear_orden):
+    orden = crear_orden((0, 1))
+    orden_id = orden["OrdenId"]
+
+    nuevo = client.post("/api/v1/detalles-orden/", json={
+        "OrdenId": orden_id, "ProductoId": catalogo["ProductoIds"][1], "Cantidad": 2, "PrecioUnitario": "25.50"
+    })
+    assert nuevo.status_code == 201, nuevo.text
+    assert total(client, orden_id) == Decimal("61.00")
+
+    detalle_id = nuevo.json()["DetalleId"]
+    client.put(f"/api/v1/detalles-orden/{detalle_id}", json={"Cantidad": 1})
+    assert total(client, orden_id) == Decimal("35.50")
+
+    client.delete(f"/api/v1/detalles-orden/{detalle_id}")
+    assert total(client, orden_id) == Decimal("10.00")
+
+
+def test_concurrent_detalles_do_not_lose_updates(client, catalogo, crear_orden):
+    orden_id = crear_orden()["OrdenId"]
+
+    def agregar(_):
+        return client.post("/api/v1/detalles-orden/", json={
+            "OrdenId": orden_id, "ProductoId": catalogo["ProductoIds"][0], "Cantidad": 1, "PrecioUnitario": "10.00"
+        }).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(agregar, range(16)))
+
+    assert codes == [201] * 16
+    assert total(client, orden_id) == Decimal("160.00")
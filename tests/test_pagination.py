@@ -0,0 +1,51 @@
+"""Keyset (cursor) pagination of the list endpoints."""
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def crear_mesas(client, cantidad):
+    return [
+        client.post("/api/v1/mesas/", json={"Numero": numero, "Capacidad": 2}).json()["MesaId"]
+        for numero in range(1, cantidad + 1)
+    ]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+def test_cursor_walks_every_row_once(client):
+    mesa_ids = crear_mesas(client, 7)
+
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/v1/mesas/", params=params)
+        assert response.status_code == 200
+        vistos += [mesa["MesaId"] for mesa in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert vistos == sorted(mesa_ids)
+
+
+def test_cursor_is_stable_when_rows_are_inserted(client):
+    mesa_ids = crear_mesas(client, 4)
+    primera = client.get("/api/v1/mesas/", params={"limit": 2})
+    cursor = primera.headers[NEXT_CURSOR_HEADER]
+    # Deleting a row of the first page must not shift the next one, as it would with OFFSET
+    assert client.delete(f"/api/v1/mesas/{mesa_ids[0]}").status_code == 200
+
+    segunda = client.get("/api/v1/mesas/", params={"limit": 2, "cursor": cursor}).json()
+    assert [mesa["MesaId"] for mesa in segunda] == mesa_ids[2:4]
+
+
+def test_no_next_cursor_on_last_page(client):
+    crear_mesas(client, 2)
+    response = client.get("/api/v1/mesas/", params={"limit": 5})
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/v1/mesas/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
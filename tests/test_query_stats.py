@@ -0,0 +1,45 @@
+"""N+1 detection: repeated statements are reported, chunked reads are not."""
+import logging
+
+import crud
+import query_stats
+from routes import ordenes as ordenes_routes
+
+
+def n1_warnings(caplog):
+    return [record for record in caplog.records if "Possible N+1" in record.getMessage()]
+
+
+def test_repeated_shapes_ignore_in_list_length_and_chunked_reads():
+    stats = query_stats.RequestQueryStats()
+    for largo in range(1, 8):
+        stats.record(f"SELECT a FROM t WHERE id IN ({', '.join('?' * largo)})", 0.001)
+    with query_stats.chunked_reads():
+        for _ in range(7):
+            stats.record("SELECT b FROM u WHERE id = ?", 0.001, query_stats.in_chunked_read.get())
+
+    assert stats.queries == 14
+    assert stats.repeated_shapes(5) == [("SELECT a FROM t WHERE id IN (?)", 7)]
+
+
+def test_export_chunks_are_not_reported(client, crear_orden, monkeypatch, caplog):
+    for _ in range(8):
+        crear_orden((0, 1))
+    monkeypatch.setattr(ordenes_routes, "EXPORT_CHUNK_SIZE", 1)
+
+    with caplog.at_level(logging.WARNING, logger=query_stats.logger.name):
+        response = client.get("/api/v1/ordenes/export")
+    assert len(response.text.splitlines()) == 8
+    assert n1_warnings(caplog) == []
+
+
+def test_chunked_bulk_lookups_are_not_reported(client, monkeypatch, caplog):
+    nombres = [{"Nombre": f"Categoria {numero}"} for numero in range(12)]
+    client.post("/api/v1/categorias/bulk", json=nombres)
+    monkeypatch.setattr(crud, "IN_CHUNK_SIZE", 2)
+    caplog.clear()
+
+    with caplog.at_level(logging.WARNING, logger=query_stats.logger.name):
+        body = client.post("/api/v1/categorias/bulk", json=[{**fila, "Descripcion": "Nueva"} for fila in nombres]).json()
+    assert body["Actualizados"] == 12
+    assert n1_warnings(caplog) == []
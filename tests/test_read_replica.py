@@ -0,0 +1,69 @@
+"""Read-only routes use the replica when it is reachable and fall back to the primary."""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+import database
+
+
+def use_replica(monkeypatch, url):
+    """Point the read engine and sessions at url for this test."""
+    engine = create_async_engine(url, **database.get_engine_options(use_async=True))
+    monkeypatch.setattr(database, "read_async_engine", engine)
+    monkeypatch.setattr(database, "ReadAsyncSessionLocal", async_sessionmaker(
+        bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    ))
+    return engine
+
+
+def make_request(headers=()):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": list(headers)})
+
+
+@pytest.fixture
+def replica_caida(monkeypatch):
+    return use_replica(monkeypatch, "sqlite+aiosqlite:////nonexistent/replica/test.db")
+
+
+def test_unreachable_replica_falls_back_to_primary(client, catalogo, replica_caida):
+    response = client.get("/api/v1/meseros/")
+    assert response.status_code == 200
+    assert [mesero["MeseroId"] for mesero in response.json()] == [catalogo["MeseroId"]]
+
+    assert database.replica_state["down_until"] > time.monotonic()
+    assert database.replica_state["failures"] == 1
+    replica = client.get("/health/pool").json()["replica"]
+    assert replica["configured"] is True and replica["available"] is False
+
+    # While marked down, reads go straight to the primary without retrying it
+    assert client.get("/api/v1/meseros/").status_code == 200
+    assert database.replica_state["failures"] == 1
+
+
+def test_streamed_reads_fall_back_to_primary(client, crear_orden, replica_caida):
+    crear_orden((0, 1))
+    response = client.get("/api/v1/ordenes/export")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 1
+    assert database.replica_state["failures"] == 1
+
+
+def test_reachable_replica_is_used(monkeypatch):
+    engine = use_replica(monkeypatch, database.ASYNC_DATABASE_URL)
+
+    async def factories():
+        try:
+            return (
+                await database.get_read_session_factory(make_request()),
+                await database.get_read_session_factory(make_request([(b"x-read-your-writes", b"true")])),
+            )
+        finally:
+            await engine.dispose()
+
+    replica, propia = asyncio.run(factories())
+    assert replica is database.ReadAsyncSessionLocal
+    assert propia is database.AsyncSessionLocal
+    assert database.replica_state["failures"] == 0
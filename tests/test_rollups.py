@@ -0,0 +1,77 @@
+"""Sales rollups: each closed orden is added once, on close or by the catch-up."""
+import asyncio
+import logging
+from datetime import datetime
+from decimal import Decimal
+
+import crud
+import crud_async
+import database
+import jobs
+
+
+def ventas_diarias(client):
+    return client.get("/api/v1/reportes/ventas/diarias").json()
+
+
+def catch_up(client):
+    response = client.post("/api/v1/reportes/rollups/actualizar")
+    assert response.status_code == 200, response.text
+    return response.json()["OrdenesAplicadas"]
+
+
+def test_close_adds_the_orden_once(client, crear_orden):
+    orden_id = crear_orden((0, 2), (1, 1))["OrdenId"]
+    client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={})
+
+    [dia] = ventas_diarias(client)
+    assert dia["Ordenes"] == 1
+    assert Decimal(dia["Ingresos"]) == Decimal("45.50")
+    assert dia["Articulos"] == 3
+
+    # Already in the ledger, so the catch-up must not add it again
+    assert catch_up(client) == 0
+    assert ventas_diarias(client) == [dia]
+
+
+def test_catch_up_adds_ordenes_closed_elsewhere(client, crear_orden):
+    orden_id = crear_orden((1, 2))["OrdenId"]
+    client.put(f"/api/v1/ordenes/{orden_id}", json={"Estado": "Cerrada", "FechaCierre": datetime.utcnow().isoformat()})
+    assert ventas_diarias(client) == []
+
+    assert catch_up(client) == 1
+    assert catch_up(client) == 0
+    [dia] = ventas_diarias(client)
+    assert dia["Ordenes"] == 1
+    assert Decimal(dia["Ingresos"]) == Decimal("51.00")
+
+    productos = client.get("/api/v1/reportes/ventas/productos").json()
+    assert [(producto["Nombre"], producto["Cantidad"]) for producto in productos] == [("Pasta", 2)]
+
+
+def test_rebuild_matches_incremental_rollups(client, crear_orden):
+    for lineas in (((0, 1),), ((0, 1), (1, 2))):
+        orden_id = crear_orden(*lineas)["OrdenId"]
+        client.post(f"/api/v1/ordenes/{orden_id}/cerrar", json={})
+    incremental = ventas_diarias(client)
+
+    response = client.post("/api/v1/reportes/rollups/reconstruir")
+    assert response.json()["OrdenesAplicadas"] == 2
+    assert ventas_diarias(client) == incremental
+
+
+def test_missing_tables_disable_the_catch_up(monkeypatch, caplog):
+    with database.SessionLocal() as db:
+        assert crud.get_missing_rollup_tables(db) == []
+
+    async def faltantes(db):
+        return ["VentasPorHora", "RollupOrdenesAplicadas"]
+
+    monkeypatch.setattr(crud_async, "get_missing_rollup_tables", faltantes)
+    monkeypatch.setitem(jobs.rollup_state, "available", None)
+    with caplog.at_level(logging.WARNING, logger=jobs.logger.name):
+        asyncio.run(jobs.check_rollup_tables())
+
+    assert jobs.rollup_state["available"] is False
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
+    assert "VentasPorHora" in caplog.records[0].getMessage()